@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'CoreRoot.settings')
+# Turns on the database pool of the async views, see ASYNC_DB_THREADS. WSGI processes keep it off.
+os.environ['DJANGO_ASGI'] = '1'
 
 application = get_asgi_application()
@@ -0,0 +1,62 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.views import View
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Thread pool of ASYNC_DB_THREADS threads that runs the database work of async views.
+    Its size caps the database connections the async views open per process."""
+    global _executor
+    # Two pools created by concurrent first calls would exceed the connection cap.
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.ASYNC_DB_THREADS, thread_name_prefix='async-db')
+        return _executor
+
+
+def database_sync_to_async(func):
+    """sync_to_async() on the bounded database pool. The pool threads outlive requests, so stale
+    connections are closed around each call, as request_started/request_finished do for sync views.
+
+    With ASYNC_DB_THREADS = 0 func runs thread sensitive instead: in the thread of the outer sync code,
+    which keeps the test client and TestCase transactions on a single connection."""
+    if not settings.ASYNC_DB_THREADS:
+        return sync_to_async(func, thread_sensitive=True)
+
+    @functools.wraps(func)
+    def run(*args, **kwargs):
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    return sync_to_async(run, thread_sensitive=False, executor=get_executor())
+
+
+class AsyncView(View):
+    """Base for class-based views with `async def` handlers, which Django 3.2's as_view() does not
+    recognise: the returned view function is a coroutine function, so ASGI runs it on the event loop."""
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+
+        async def async_view(request, *args, **kwargs):
+            response = view(request, *args, **kwargs)
+            # http_method_not_allowed() and options() stay synchronous.
+            if asyncio.iscoroutine(response):
+                response = await response
+            return response
+
+        functools.update_wrapper(async_view, view)
+        return async_view
@@ -0,0 +1,81 @@
+from django.conf import settings
+from django.core import checks
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, models, transaction
+from django.db.models.signals import post_delete, post_save
+
+_MISSING = object()
+
+PER_PROCESS_CACHE_BACKENDS = ('django.core.cache.backends.locmem.LocMemCache',)
+
+
+@checks.register(checks.Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """Cached rows, counts and sessions are invalidated by deleting the cache entry, which only reaches the
+    other worker processes through a shared cache. Outside DEBUG a per process cache would serve them stale."""
+    if settings.DEBUG or settings.CACHES['default']['BACKEND'] not in PER_PROCESS_CACHE_BACKENDS:
+        return []
+    return [checks.Error(
+        'The default cache is kept separately by every worker process, invalidations do not reach the others.',
+        hint='Set CACHE_URL to a shared cache, e.g. pylibmc://127.0.0.1:11211.',
+        id='CoreRoot.E001',
+    )]
+
+
+class UserCacheManager(models.Manager):
+    """Manager of a model with a one-to-one `user` field, adding a cache-aside get_for_user().
+
+    Lookups are memoized on the user instance, which lives as long as the request for request.user,
+    and kept in the shared cache for MODEL_CACHE_TIMEOUT seconds, missing rows included. Saving or
+    deleting a row invalidates its entry; queryset.update() does not, call invalidate() after it."""
+
+    def contribute_to_class(self, model, name):
+        super().contribute_to_class(model, name)
+        if not model._meta.abstract:
+            uid = f'{model._meta.label_lower}.cache_invalidation'
+            post_save.connect(self._invalidate_instance, sender=model, weak=False, dispatch_uid=uid)
+            post_delete.connect(self._invalidate_instance, sender=model, weak=False, dispatch_uid=uid)
+
+    def cache_key(self, user_id):
+        return f'{self.model._meta.label_lower}:user:{user_id}'
+
+    def get_for_user(self, user):
+        """The user's row, or DoesNotExist. Anonymous users never hit the database."""
+        if getattr(user, 'pk', None) is None:
+            raise self.model.DoesNotExist(f'{self.model._meta.object_name} matching query does not exist.')
+        label = self.model._meta.label_lower
+        memo = getattr(user, '_cached_rows', None)
+        if memo is None:
+            memo = user._cached_rows = {}
+        if label not in memo:
+            memo[label] = self._fetch(user.pk)
+        if memo[label] is None:
+            raise self.model.DoesNotExist(f'{self.model._meta.object_name} matching query does not exist.')
+        return memo[label]
+
+    def _fetch(self, user_id):
+        key = self.cache_key(user_id)
+        instance = cache.get(key, _MISSING)
+        if instance is _MISSING:
+            # Filled from the primary, a row read from a lagging replica would stay cached until the next write.
+            try:
+                instance = self.get_queryset().using(DEFAULT_DB_ALIAS).get(user_id=user_id)
+            except self.model.DoesNotExist:
+                instance = None
+            cache.set(key, instance, settings.MODEL_CACHE_TIMEOUT)
+        return instance
+
+    def invalidate(self, user_ids, using=DEFAULT_DB_ALIAS):
+        keys = [self.cache_key(user_id) for user_id in user_ids if user_id is not None]
+        if not keys:
+            return
+        cache.delete_many(keys)
+        # Again after commit: a concurrent request may have cached the old row before the transaction committed.
+        transaction.on_commit(lambda: cache.delete_many(keys), using=using)
+
+    def _invalidate_instance(self, sender, instance, using, **kwargs):
+        self.invalidate([instance.user_id], using=using)
+        # Drop the memo too when the row was saved through the user it is memoized on.
+        user = instance._state.fields_cache.get('user')
+        if user is not None:
+            getattr(user, '_cached_rows', {}).pop(self.model._meta.label_lower, None)
@@ -1,52 +1,30 @@
-import os
-from functools import wraps
+from functools import partial, wraps
+
+from django.db import transaction
+
+
+def delete_old_files_on_save(*field_names):
+    """Decorator factory for model save methods: once the transaction commits, delete the files that were
+    replaced in the given file fields. The model must use LoadedValuesMixin and track these fields."""
+    def decorator(original_save_func):
+        @wraps(original_save_func)
+        def wrapper(self, *args, **kwargs):
+            """Wrapper function that handles the save operation."""
+            # Collected before saving, the save takes a new snapshot of the loaded values.
+            replaced = []
+            if not self._state.adding:
+                for field_name in field_names:
+                    old_name = self.get_loaded_value(field_name)
+                    if old_name and self.has_changed(field_name):
+                        replaced.append((getattr(self, field_name).storage, old_name))
+            # Register the deletes only once the row points at the new files, a failed save keeps the old ones.
+            with transaction.atomic(using=kwargs.get('using')):
+                result = original_save_func(self, *args, **kwargs)
+                for storage, old_name in replaced:
+                    transaction.on_commit(partial(storage.delete, old_name))
+            return result
+
+        return wrapper
+
+    return decorator
 
-
-def delete_old_photo(photo_path):
-    """Delete the old photo file if it exists."""
-    if os.path.exists(photo_path):
-        os.remove(photo_path)
-
-
-def delete_old_photo_on_save(original_save_func):
-    """Decorator function to delete the old profile picture on save."""
-    @wraps(original_save_func)
-    def wrapper(self, *args, **kwargs):
-        """Wrapper function that handles the save operation."""
-        if self.pk:
-            UserProfile = self.__class__
-            old_instance = UserProfile.objects.get(pk=self.pk)
-            if old_instance.profile_picture != self.profile_picture:
-                delete_old_photo(old_instance.profile_picture.path)
-        return original_save_func(self, *args, **kwargs)
-
-    return wrapper
-
-
-def delete_old_cover_on_save(original_save_func):
-    """Decorator function to delete the old cover photo on save."""
-    @wraps(original_save_func)
-    def wrapper(self, *args, **kwargs):
-        """Wrapper function that handles the save operation."""
-        if self.pk:
-            UserProfile = self.__class__
-            old_instance = UserProfile.objects.get(pk=self.pk)
-            if old_instance.cover_photo != self.cover_photo:
-                delete_old_photo(old_instance.cover_photo.path)
-        return original_save_func(self, *args, **kwargs)
-
-    return wrapper
-
-
-# def delete_old_license_on_save(original_save_func):
-#     """Decorator function to delete the old cover photo on save."""
-#     @wraps(original_save_func)
-#     def wrapper(self, *args, **kwargs):
-#         """Wrapper function that handles the save operation."""
-#         if self.pk:
-#             Vendor = self.__class__
-#             old_instance = Vendor.objects.get(pk=self.pk)
-#             if old_instance.vendor_license != self.vendor_license:
-#                 delete_old_photo(old_instance.vendor_license.path)
-#
-#     return wrapper
@@ -0,0 +1,203 @@
+import hashlib
+import io
+import logging
+import posixpath
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, router, transaction
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Fixed variant boxes (width, height). Sized at 2x the largest CSS size they are displayed at.
+VARIANT_SIZES = {
+    'thumb': (160, 160),
+    'card': (480, 360),
+    'cover': (1600, 500),
+}
+
+# Format name -> (Pillow format, file extension, encoder options).
+VARIANT_FORMATS = {
+    'jpeg': ('JPEG', '.jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+    'webp': ('WEBP', '.webp', {'quality': 80, 'method': 6}),
+}
+
+
+def _to_rgb(image):
+    """Flatten transparency onto a white background, JPEG has no alpha channel."""
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.split()[-1])
+        return background
+    if image.mode != 'RGB':
+        return image.convert('RGB')
+    return image
+
+
+def variant_name(source_name, size, digest, extension):
+    """Storage name of a variant: '<dir>/variants/<stem>-<size>-<content hash><ext>'."""
+    directory, filename = posixpath.split(source_name)
+    stem = posixpath.splitext(filename)[0]
+    return posixpath.join(directory, 'variants', f'{stem}-{size}-{digest}{extension}')
+
+
+def build_variants(source_name, sizes, storage=default_storage):
+    """Generate the JPEG/WebP variants of a stored image and return {size: {format: name}}.
+    Names contain a hash of the source content, so unchanged images map to files that already exist."""
+    with storage.open(source_name, 'rb') as source:
+        data = source.read()
+    digest = hashlib.sha256(data).hexdigest()[:12]
+
+    variants = {}
+    with Image.open(io.BytesIO(data)) as original:
+        image = _to_rgb(ImageOps.exif_transpose(original))
+        for size in sizes:
+            resized = ImageOps.fit(image, VARIANT_SIZES[size], Image.Resampling.LANCZOS)
+            variants[size] = {}
+            for fmt, (pil_format, extension, options) in VARIANT_FORMATS.items():
+                name = variant_name(source_name, size, digest, extension)
+                if not storage.exists(name):
+                    buffer = io.BytesIO()
+                    resized.save(buffer, pil_format, **options)
+                    name = storage.save(name, ContentFile(buffer.getvalue()))
+                variants[size][fmt] = name
+    return variants
+
+
+def delete_variants(variants, keep=(), storage=default_storage):
+    """Delete the variant files of a {size: {format: name}} mapping, except names listed in keep."""
+    for formats in variants.values():
+        for name in formats.values():
+            if name not in keep:
+                storage.delete(name)
+
+
+def pending_image_fields(instance):
+    """Names of the instance's variant image fields whose variants are out of date: holding a new, not yet
+    stored upload or an image without variants, or emptied while variants of the old image are recorded."""
+    variants = instance.image_variants or {}
+    pending = []
+    for field_name in instance.IMAGE_VARIANTS:
+        field_file = getattr(instance, field_name)
+        if field_file:
+            if not field_file._committed or field_name not in variants:
+                pending.append(field_name)
+        elif field_name in variants:
+            pending.append(field_name)
+    return pending
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Thread pool of IMAGE_VARIANT_THREADS threads, created once per process."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.IMAGE_VARIANT_THREADS,
+                                           thread_name_prefix='image-variants')
+        return _executor
+
+
+def update_image_variants(model, pk, field_names):
+    """Build the variants of the stored images in the given fields of the row and record them in its
+    image_variants, see record_image_variants(). Returns the new mapping, None when the row is gone."""
+    # The primary, a replica may not have the row that was just committed yet.
+    using = router.db_for_write(model)
+    row = model._base_manager.db_manager(using).filter(pk=pk).values(*field_names).first()
+    if row is None:
+        return None
+    # Built before taking the row lock, this is the slow part.
+    built = {
+        field_name: build_variants(source_name, model.IMAGE_VARIANTS[field_name]) if source_name else None
+        for field_name, source_name in row.items()
+    }
+    return record_image_variants(model, pk, row, built, using=using)
+
+
+def record_image_variants(model, pk, sources, built, using=None):
+    """Record the variants built from the source names ({field: name}, empty for a cleared image) in the
+    row's image_variants under a row lock, deleting the variants they replace once committed. Fields whose
+    image changed since are left to the job of that later save, the variants built here for them are
+    deleted. Returns the new mapping, None when the row is gone."""
+    using = using or router.db_for_write(model)
+    rows = model._base_manager.db_manager(using).filter(pk=pk)
+    with transaction.atomic(using=using):
+        current = rows.select_for_update().values(*built, 'image_variants').first()
+        if current is None:
+            return None
+        image_variants = dict(current['image_variants'] or {})
+        stale = []
+        for field_name, variants in built.items():
+            if current[field_name] != sources[field_name]:
+                stale.append(variants or {})
+                continue
+            old = image_variants.pop(field_name, {})
+            if variants:
+                image_variants[field_name] = variants
+            keep = {name for formats in (variants or {}).values() for name in formats.values()}
+            transaction.on_commit(partial(delete_variants, old, keep=keep), using=using)
+        rows.update(image_variants=image_variants)
+        # Unchanged content maps to the same names, the recorded ones are kept.
+        recorded = {name for variants in image_variants.values() for formats in variants.values()
+                    for name in formats.values()}
+        for variants in stale:
+            transaction.on_commit(partial(delete_variants, variants, keep=recorded), using=using)
+    return image_variants
+
+
+def _run_update(model, pk, field_names, on_done):
+    try:
+        update_image_variants(model, pk, field_names)
+        if on_done is not None:
+            on_done()
+    except Exception:
+        logger.exception('Building the image variants of %s %s failed', model._meta.label, pk)
+
+
+def _run_in_pool(job):
+    # The pool threads outlive requests, stale connections are closed around each job.
+    close_old_connections()
+    try:
+        job()
+    finally:
+        close_old_connections()
+
+
+def refresh_image_variants(instance, field_names, on_done=None):
+    """Update the variants of the given image fields once the save commits, off the request thread in the
+    IMAGE_VARIANT_THREADS pool; with 0 threads in the committing thread. Until then pages show the original
+    upload, see get_variant_url(). on_done runs after the mapping is stored, e.g. to invalidate a cache."""
+    if not field_names:
+        return
+    field_names = list(field_names)
+    # Out of date either way; a later full save() must not write them back.
+    instance.image_variants = {
+        field_name: variants for field_name, variants in (instance.image_variants or {}).items()
+        if field_name not in field_names
+    }
+    job = partial(_run_update, type(instance), instance.pk, field_names, on_done)
+    if settings.IMAGE_VARIANT_THREADS:
+        transaction.on_commit(lambda: get_executor().submit(_run_in_pool, job))
+    else:
+        transaction.on_commit(job)
+
+
+def get_variant_url(instance, field_name, size, fmt='jpeg'):
+    """URL of the requested variant, falling back to the original upload when it has not been generated."""
+    field_file = getattr(instance, field_name, None)
+    if not field_file:
+        return ''
+    variants = getattr(instance, 'image_variants', None) or {}
+    name = variants.get(field_name, {}).get(size, {}).get(fmt)
+    if name:
+        return default_storage.url(name)
+    return field_file.url
@@ -0,0 +1,262 @@
+import asyncio
+import glob
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+import simplejson as json
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.decorators import sync_and_async_middleware
+
+from CoreRoot.queries import observe_queries
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+QUERY_DURATION_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+
+
+class FileStore:
+    """Counter values of this process, written to METRICS_DIR/<pid>-<token>.json at most every
+    METRICS_FLUSH_SECONDS. Every worker writes only its own file and the endpoint sums all files,
+    so workers share nothing but the directory. Files of exited workers are kept so counters stay monotonic."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.pid = os.getpid()
+        # A new token per process, a reused pid must not overwrite the file of an exited worker.
+        self.token = uuid.uuid4().hex[:8]
+        self.values = defaultdict(float)
+        self.last_flush = 0.0
+
+    @property
+    def path(self):
+        return os.path.join(settings.METRICS_DIR, f'{self.pid}-{self.token}.json')
+
+    def inc(self, samples):
+        """Add to several (name, labels) samples at once, labels being a tuple of (name, value) pairs."""
+        if not settings.METRICS_ENABLED:
+            return
+        with self.lock:
+            if os.getpid() != self.pid:
+                # Forked after the parent counted something, start from zero.
+                self.reset()
+            for key, amount in samples:
+                self.values[key] += amount
+        self.flush()
+
+    def flush(self, force=False):
+        if not force and time.monotonic() - self.last_flush < settings.METRICS_FLUSH_SECONDS:
+            return
+        # Another thread is already writing the file.
+        if not self.flush_lock.acquire(blocking=force):
+            return
+        try:
+            with self.lock:
+                self.last_flush = time.monotonic()
+                snapshot = [[name, labels, value] for (name, labels), value in self.values.items()]
+            os.makedirs(settings.METRICS_DIR, exist_ok=True)
+            path = self.path
+            with open(f'{path}.tmp', 'w') as file:
+                json.dump(snapshot, file)
+            os.replace(f'{path}.tmp', path)
+        finally:
+            self.flush_lock.release()
+
+    def collect(self):
+        """Sum of the samples of all processes, {(name, labels): value}."""
+        self.flush(force=True)
+        totals = defaultdict(float)
+        for path in glob.glob(os.path.join(settings.METRICS_DIR, '*.json')):
+            try:
+                with open(path) as file:
+                    samples = json.load(file)
+            except (OSError, ValueError):
+                continue
+            for name, labels, value in samples:
+                totals[(name, tuple(tuple(pair) for pair in labels))] += value
+        return totals
+
+
+store = FileStore()
+REGISTRY = []
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        REGISTRY.append(self)
+
+    def label_values(self, labels):
+        return tuple((name, str(labels[name])) for name in self.labelnames)
+
+    @property
+    def sample_names(self):
+        return {self.name}
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        store.inc([((self.name, self.label_values(labels)), amount)])
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name, documentation, buckets, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = buckets
+
+    @property
+    def sample_names(self):
+        return {f'{self.name}_bucket', f'{self.name}_sum', f'{self.name}_count'}
+
+    def observe(self, value, **labels):
+        labels = self.label_values(labels)
+        # Buckets are stored cumulatively, as the exposition format expects them. Adding 0 to the buckets
+        # below the value makes every bucket appear in the output.
+        samples = [((f'{self.name}_bucket', labels + (('le', str(bound)),)), int(value <= bound))
+                   for bound in self.buckets]
+        samples += [
+            ((f'{self.name}_bucket', labels + (('le', '+Inf'),)), 1),
+            ((f'{self.name}_sum', labels), value),
+            ((f'{self.name}_count', labels), 1),
+        ]
+        store.inc(samples)
+
+
+class Gauge(Metric):
+    """Value computed when the metrics are scraped. The callback returns a number, or
+    {label values tuple: number} when the gauge has labels."""
+
+    type = 'gauge'
+
+    def __init__(self, name, documentation, callback, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+
+    def collect(self):
+        values = self.callback()
+        if not self.labelnames:
+            return {(self.name, ()): values}
+        return {(self.name, tuple(zip(self.labelnames, map(str, key)))): value for key, value in values.items()}
+
+
+def _orders_awaiting_vendor():
+    # Imported lazily: the app views import this module, importing their models at the top could cycle.
+    from orders.models import Order
+    return Order.objects.filter(is_ordered=True, status='New').count()
+
+
+def _images_pending_variants():
+    from accounts.models import UserProfile
+    from catalog.models import FoodItem
+    return {
+        ('fooditem',): FoodItem.objects.exclude(image='').filter(image_variants={}).count(),
+        ('userprofile',): UserProfile.objects.exclude(profile_picture='').exclude(profile_picture__isnull=True)
+                                          .filter(image_variants={}).count(),
+    }
+
+
+request_duration = Histogram('http_request_duration_seconds', 'Request latency by URL name.', LATENCY_BUCKETS,
+                             ('url_name', 'method'))
+requests_total = Counter('http_requests_total', 'Responses by URL name and status code.',
+                         ('url_name', 'method', 'status'))
+request_queries = Histogram('db_queries_per_request', 'Database queries per request by URL name.',
+                            QUERY_COUNT_BUCKETS, ('url_name',))
+query_duration = Histogram('db_query_duration_seconds', 'Duration of single database queries.',
+                           QUERY_DURATION_BUCKETS)
+cart_operations = Counter('cart_operations_total', 'Cart changes by action.', ('action',))
+checkouts = Counter('checkouts_total', 'Checkout funnel: checkout page, order placed, order paid.', ('stage',))
+payments = Counter('payments_total', 'Recorded payments by method and status.', ('payment_method', 'status'))
+# Capture statuses PayPal reports, anything else the client posts is counted as 'other'.
+PAYMENT_STATUSES = ('COMPLETED', 'PENDING', 'DECLINED', 'FAILED')
+HTTP_METHODS = ('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS')
+Gauge('orders_awaiting_vendor', 'Paid orders still in the New status.', _orders_awaiting_vendor)
+Gauge('images_pending_variants', 'Images without generated variants, by model.', _images_pending_variants,
+      ('model',))
+
+
+def bounded(value, allowed):
+    """value when it is one of allowed, else 'other'. Keeps client supplied label values from growing without bound."""
+    return value if value in allowed else 'other'
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _sort_key(sample):
+    (name, labels), _ = sample
+    # Numeric order for bucket bounds, '+Inf' last.
+    return name, [(key, float(value) if key == 'le' else value) for key, value in labels]
+
+
+def render():
+    """All metrics of all workers in the Prometheus text exposition format."""
+    samples = store.collect()
+    lines = []
+    for metric in REGISTRY:
+        if isinstance(metric, Gauge):
+            try:
+                values = metric.collect()
+            except Exception:  # A failing gauge must not hide the other metrics.
+                continue
+        else:
+            values = {key: value for key, value in samples.items() if key[0] in metric.sample_names}
+        lines.append(f'# HELP {metric.name} {metric.documentation}')
+        lines.append(f'# TYPE {metric.name} {metric.type}')
+        for (name, labels), value in sorted(values.items(), key=_sort_key):
+            label_text = ','.join(f'{key}="{_escape(value)}"' for key, value in labels)
+            lines.append(f'{name}{{{label_text}}} {value!r}' if label_text else f'{name} {value!r}')
+    return '\n'.join(lines) + '\n'
+
+
+def _record_request(request, response, duration, query_durations):
+    # URL names rather than paths keep the number of label values bounded, as do known methods.
+    resolver_match = request.resolver_match
+    url_name = (resolver_match.url_name if resolver_match else None) or 'unresolved'
+    method = bounded(request.method, HTTP_METHODS)
+    request_duration.observe(duration, url_name=url_name, method=method)
+    requests_total.inc(url_name=url_name, method=method, status=response.status_code)
+    request_queries.observe(len(query_durations), url_name=url_name)
+    for query in query_durations:
+        query_duration.observe(query)
+
+
+@sync_and_async_middleware
+def metrics_middleware(get_response):
+    """Record latency, status and query count per URL name, and the duration of every query."""
+    if not settings.METRICS_ENABLED:
+        raise MiddlewareNotUsed
+
+    if asyncio.iscoroutinefunction(get_response):
+        async def middleware(request):
+            query_durations = []
+            started = time.perf_counter()
+            with observe_queries(lambda *query: query_durations.append(query[-1])):
+                response = await get_response(request)
+            _record_request(request, response, time.perf_counter() - started, query_durations)
+            return response
+    else:
+        def middleware(request):
+            query_durations = []
+            started = time.perf_counter()
+            with observe_queries(lambda *query: query_durations.append(query[-1])):
+                response = get_response(request)
+            _record_request(request, response, time.perf_counter() - started, query_durations)
+            return response
+
+    return middleware
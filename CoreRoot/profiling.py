@@ -0,0 +1,248 @@
+import asyncio
+import functools
+import logging
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import simplejson as json
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template import engines
+from django.template.base import Template
+from django.utils.decorators import sync_and_async_middleware
+
+from CoreRoot.queries import observe_queries
+
+logger = logging.getLogger(__name__)
+
+# Profile of the current request, None when the request is not sampled.
+_current_profile = ContextVar('request_profile', default=None)
+_MISSING = object()
+_installed = False
+
+
+class RequestProfile:
+    """Timings collected for one sampled request. Durations are in seconds."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = []
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.context_processor_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    @property
+    def sql_time(self):
+        return sum(query['duration'] for query in self.queries)
+
+    def record_query(self, sql, params, many, context, duration):
+        self.queries.append({
+            'alias': context['connection'].alias,
+            'sql': sql,
+            'params': params,
+            'many': many,
+            'duration': duration,
+        })
+
+    def slow_queries(self):
+        """The slowest queries above PROFILING_SLOW_QUERY_MS, at most PROFILING_SLOW_QUERY_LIMIT of them."""
+        threshold = settings.PROFILING_SLOW_QUERY_MS / 1000
+        slow = sorted((query for query in self.queries if query['duration'] >= threshold),
+                      key=lambda query: query['duration'], reverse=True)
+        return slow[:settings.PROFILING_SLOW_QUERY_LIMIT]
+
+    def server_timing(self, total):
+        """Server-Timing header value, durations in milliseconds."""
+        return ', '.join([
+            f'db;dur={self.sql_time * 1000:.1f};desc="{len(self.queries)} queries"',
+            f'tpl;dur={(self.template_time - self.context_processor_time) * 1000:.1f}',
+            f'cp;dur={self.context_processor_time * 1000:.1f}',
+            f'cache;desc="{self.cache_hits} hits {self.cache_misses} misses"',
+            f'total;dur={total * 1000:.1f}',
+        ])
+
+
+def is_select(query):
+    return not query['many'] and query['sql'].lstrip().upper().startswith('SELECT')
+
+
+def loggable_params(query):
+    """Parameters of a captured query as they may be logged. Only SELECTs outside the session table keep
+    them: writes carry password hashes, emails and session data, session reads the session key."""
+    if not is_select(query) or 'django_session' in query['sql']:
+        return '<redacted>'
+    return query['params']
+
+
+def explain(query):
+    """EXPLAIN output of a captured query, only for plain SELECTs so nothing is executed twice."""
+    if not is_select(query):
+        return None
+    try:
+        with connections[query['alias']].cursor() as cursor:
+            cursor.execute(f'EXPLAIN {query["sql"]}', query['params'])
+            return '\n'.join(row[0] for row in cursor.fetchall())
+    except Exception as error:  # A failed EXPLAIN must not break the response.
+        return f'EXPLAIN failed: {error}'
+
+
+def _timed_render(render):
+    """Template.render timed at the outermost template; includes run nested inside it."""
+
+    @functools.wraps(render)
+    def wrapper(self, context):
+        profile = _current_profile.get()
+        if profile is None:
+            return render(self, context)
+        profile.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            profile.template_depth -= 1
+            if not profile.template_depth:
+                profile.template_time += time.perf_counter() - started
+
+    return wrapper
+
+
+def _timed_context_processor(processor):
+    @functools.wraps(processor)
+    def wrapper(request):
+        profile = _current_profile.get()
+        if profile is None:
+            return processor(request)
+        started = time.perf_counter()
+        try:
+            return processor(request)
+        finally:
+            profile.context_processor_time += time.perf_counter() - started
+
+    return wrapper
+
+
+def _counted_cache_get(get):
+    @functools.wraps(get)
+    def wrapper(self, key, default=None, version=None):
+        profile = _current_profile.get()
+        if profile is None:
+            return get(self, key, default, version)
+        value = get(self, key, _MISSING, version)
+        if value is _MISSING:
+            profile.cache_misses += 1
+            return default
+        profile.cache_hits += 1
+        return value
+
+    return wrapper
+
+
+def _counted_cache_get_many(get_many):
+    @functools.wraps(get_many)
+    def wrapper(self, keys, version=None):
+        found = get_many(self, keys, version)
+        profile = _current_profile.get()
+        if profile is not None:
+            keys = list(keys)
+            profile.cache_hits += len(found)
+            profile.cache_misses += len(keys) - len(found)
+        return found
+
+    return wrapper
+
+
+def install():
+    """Wrap template rendering, the configured context processors and the cache backends once.
+    Outside a sampled request the wrappers cost a single context variable lookup."""
+    global _installed
+    if _installed:
+        return
+    _installed = True
+    Template.render = _timed_render(Template.render)
+    for engine in engines.all():
+        django_engine = getattr(engine, 'engine', None)
+        if django_engine is not None:
+            django_engine.template_context_processors = tuple(
+                _timed_context_processor(processor) for processor in django_engine.template_context_processors
+            )
+    for backend in {type(caches[alias]) for alias in settings.CACHES}:
+        backend.get = _counted_cache_get(backend.get)
+        backend.get_many = _counted_cache_get_many(backend.get_many)
+
+
+def _report(request, response, profile):
+    """Add the Server-Timing header and log the profile. Runs the EXPLAINs, so it is synchronous."""
+    total = time.perf_counter() - profile.started
+    response['Server-Timing'] = profile.server_timing(total)
+    resolver_match = request.resolver_match
+    logger.info(json.dumps({
+        'method': request.method,
+        'path': request.path,
+        'url_name': resolver_match.url_name if resolver_match else None,
+        'status': response.status_code,
+        'total_ms': round(total * 1000, 2),
+        'queries': len(profile.queries),
+        'sql_ms': round(profile.sql_time * 1000, 2),
+        'template_ms': round((profile.template_time - profile.context_processor_time) * 1000, 2),
+        'context_processors_ms': round(profile.context_processor_time * 1000, 2),
+        'cache_hits': profile.cache_hits,
+        'cache_misses': profile.cache_misses,
+    }))
+    for query in profile.slow_queries():
+        logger.warning(json.dumps({
+            'path': request.path,
+            'duration_ms': round(query['duration'] * 1000, 2),
+            'alias': query['alias'],
+            'sql': query['sql'],
+            'params': loggable_params(query),
+            'explain': explain(query),
+        }, default=str))
+
+
+@contextmanager
+def _profiling(profile):
+    token = _current_profile.set(profile)
+    try:
+        with observe_queries(profile.record_query):
+            yield
+    finally:
+        _current_profile.reset(token)
+
+
+@sync_and_async_middleware
+def profiling_middleware(get_response):
+    """Profile a PROFILING_SAMPLE_RATE fraction of requests: SQL count and time, template and context
+    processor time and cache hits/misses, sent as a Server-Timing header and logged as one JSON line.
+    Queries slower than PROFILING_SLOW_QUERY_MS are logged with their EXPLAIN output.
+    Not installed at all when the sample rate is 0."""
+    if not settings.PROFILING_SAMPLE_RATE:
+        raise MiddlewareNotUsed
+    install()
+
+    if asyncio.iscoroutinefunction(get_response):
+        async def middleware(request):
+            if random.random() >= settings.PROFILING_SAMPLE_RATE:
+                return await get_response(request)
+            profile = RequestProfile()
+            with _profiling(profile):
+                response = await get_response(request)
+            await sync_to_async(_report)(request, response, profile)
+            return response
+    else:
+        def middleware(request):
+            if random.random() >= settings.PROFILING_SAMPLE_RATE:
+                return get_response(request)
+            profile = RequestProfile()
+            with _profiling(profile):
+                response = get_response(request)
+            _report(request, response, profile)
+            return response
+
+    return middleware
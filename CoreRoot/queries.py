@@ -0,0 +1,48 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+# Callbacks for the queries of the current request or task, see observe_queries().
+_observers = ContextVar('query_observers', default=())
+
+
+def _notify_observers(execute, sql, params, many, context):
+    observers = _observers.get()
+    if not observers:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - started
+        for observer in observers:
+            observer(sql, params, many, context, duration)
+
+
+def _install(connection):
+    if _notify_observers not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_notify_observers)
+
+
+@receiver(connection_created)
+def install_on_new_connection(sender, connection, **kwargs):
+    _install(connection)
+
+
+@contextmanager
+def observe_queries(observer):
+    """Call observer(sql, params, many, context, duration) for every query run in this context.
+
+    Unlike connection.execute_wrapper(), which only covers the current thread's connections, this also
+    sees queries run through sync_to_async() in other threads, since context variables are copied there."""
+    for connection in connections.all():
+        _install(connection)
+    token = _observers.set(_observers.get() + (observer,))
+    try:
+        yield
+    finally:
+        _observers.reset(token)
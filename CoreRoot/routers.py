@@ -0,0 +1,99 @@
+import asyncio
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.utils.decorators import sync_and_async_middleware
+
+# True while the current request must read from the primary database.
+_pinned_to_primary = ContextVar('pinned_to_primary', default=False)
+# True once the current request has written to the primary database.
+_wrote_to_primary = ContextVar('wrote_to_primary', default=False)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class PrimaryReplicaRouter:
+    """Send reads of the browse-only catalog models to a random replica from DATABASE_REPLICAS.
+    Everything else, all writes, reads inside transactions and reads of a pinned request go to 'default'."""
+
+    replica_models = {
+        'accounts.userprofile',
+        'catalog.category',
+        'catalog.fooditem',
+        'vendor.openinghour',
+        'vendor.vendor',
+    }
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas or _pinned_to_primary.get():
+            return 'default'
+        if model._meta.label_lower not in self.replica_models:
+            return 'default'
+        # Reads inside a transaction must see its own writes.
+        if connections['default'].in_atomic_block:
+            return 'default'
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        _wrote_to_primary.set(True)
+        _pinned_to_primary.set(True)
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {'default', *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
+
+
+def _pin_request(request):
+    pinned = (
+        request.method not in SAFE_METHODS
+        or settings.REPLICA_PIN_COOKIE_NAME in request.COOKIES
+        or request.path.startswith(settings.PRIMARY_ONLY_PATHS)
+    )
+    return _pinned_to_primary.set(pinned), _wrote_to_primary.set(False)
+
+
+def _set_pin_cookie(response):
+    if _wrote_to_primary.get():
+        response.set_cookie(settings.REPLICA_PIN_COOKIE_NAME, '1', max_age=settings.REPLICA_PIN_SECONDS,
+                            httponly=True, samesite='Lax')
+
+
+def _unpin_request(tokens):
+    pinned_token, wrote_token = tokens
+    _pinned_to_primary.reset(pinned_token)
+    _wrote_to_primary.reset(wrote_token)
+
+
+@sync_and_async_middleware
+def replica_pinning_middleware(get_response):
+    """Pin requests to the primary database for unsafe methods, primary-only paths (cart, checkout, orders)
+    and for REPLICA_PIN_SECONDS after a write by the same client, so users read their own writes."""
+    if asyncio.iscoroutinefunction(get_response):
+        async def middleware(request):
+            tokens = _pin_request(request)
+            try:
+                response = await get_response(request)
+                _set_pin_cookie(response)
+            finally:
+                _unpin_request(tokens)
+            return response
+    else:
+        def middleware(request):
+            tokens = _pin_request(request)
+            try:
+                response = get_response(request)
+                _set_pin_cookie(response)
+            finally:
+                _unpin_request(tokens)
+            return response
+
+    return middleware
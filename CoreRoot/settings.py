@@ -71,10 +71,15 @@ INSTALLED_APPS = [
     'marketplace',
     'vendor',
     'orders',
+    'benchmarks',
 ]
 
 MIDDLEWARE = [
+    # first, so its total covers the other middleware
+    'CoreRoot.profiling.profiling_middleware',
+    'CoreRoot.metrics.metrics_middleware',
     'django.middleware.security.SecurityMiddleware',
+    'CoreRoot.routers.replica_pinning_middleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -108,6 +113,10 @@ TEMPLATES = [
                 'marketplace.context_processors.get_cart_counter',
                 'marketplace.context_processors.get_cart_amounts',
             ],
+            # project-wide tag libraries, CoreRoot is not an app
+            'libraries': {
+                'image_variants': 'CoreRoot.templatetags.image_variants',
+            },
         },
     },
 ]
@@ -129,6 +138,80 @@ DATABASES = {
     }
 }
 
+# Read replicas of the default database, used for browse traffic by CoreRoot.routers.PrimaryReplicaRouter
+DATABASE_REPLICAS = []
+for index, replica_host in enumerate(env.list('REPLICA_HOSTS_DB', default=[]), start=1):
+    DATABASES[f'replica{index}'] = {
+        **DATABASES['default'],
+        'HOST': replica_host,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica{index}')
+
+DATABASE_ROUTERS = ['CoreRoot.routers.PrimaryReplicaRouter']
+# Clients read from the primary for this many seconds after a write (replication lag window)
+REPLICA_PIN_SECONDS = env.int('REPLICA_PIN_SECONDS', default=5)
+REPLICA_PIN_COOKIE_NAME = 'db_pin'
+# Requests below these paths always use the primary database
+PRIMARY_ONLY_PATHS = ('/cart/', '/checkout', '/orders/', '/marketplace/add-to-cart/',
+                      '/marketplace/decrease-cart/', '/marketplace/delete-cart/', '/admin/')
+
+# Threads per process running the database work of the async views (cart AJAX, search) under ASGI.
+# Each one holds its own connection. 0 runs that work in the request thread instead, as the tests and
+# WSGI deployments need: it is the default unless the process was started from CoreRoot/asgi.py.
+ASYNC_DB_THREADS = env.int('ASYNC_DB_THREADS', default=8 if env.bool('DJANGO_ASGI', default=False) else 0)
+
+# Shared cache, required with DEBUG off (system check CoreRoot.E001) so every worker sees the same entries
+# and invalidations, e.g. CACHE_URL=pylibmc://127.0.0.1:11211 (with pylibmc installed)
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
+}
+# Seconds rows looked up through UserCacheManager.get_for_user() stay cached
+MODEL_CACHE_TIMEOUT = 60 * 60
+# Seconds the menu on the vendor page stays cached. Keyed by Vendor.catalog_version, so menu changes show at once
+MENU_CACHE_TIMEOUT = 60 * 60 * 24
+# Seconds a checkout price quote stays valid, from the checkout page to the payment
+CHECKOUT_QUOTE_MAX_AGE = env.int('CHECKOUT_QUOTE_MAX_AGE', default=60 * 30)
+# Rows from which unfiltered admin changelists of big tables (orders) show the pg_class estimate instead of a COUNT(*)
+ESTIMATED_COUNT_THRESHOLD = env.int('ESTIMATED_COUNT_THRESHOLD', default=100000)
+
+# Sessions are read from the cache and written through to the database. With more than one worker
+# this needs the shared CACHE_URL, a per-process cache would serve stale sessions.
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+# Signed cookie remembering the home page location of a visitor
+LOCATION_COOKIE_NAME = 'location'
+LOCATION_COOKIE_MAX_AGE = 60 * 60 * 24 * 30
+
+# Request profiling: fraction of requests sampled (0 disables the middleware), and queries slower than
+# PROFILING_SLOW_QUERY_MS in a sampled request are logged with their EXPLAIN output
+PROFILING_SAMPLE_RATE = env.float('PROFILING_SAMPLE_RATE', default=0.0)
+PROFILING_SLOW_QUERY_MS = env.float('PROFILING_SLOW_QUERY_MS', default=100)
+PROFILING_SLOW_QUERY_LIMIT = 5
+
+# Prometheus metrics: every worker process writes its counters to a file in METRICS_DIR,
+# /metrics sums them. Clear the directory when the server is restarted.
+METRICS_ENABLED = env.bool('METRICS_ENABLED', default=False)
+METRICS_DIR = env('METRICS_DIR', default=str(BASE_DIR / '.metrics'))
+METRICS_FLUSH_SECONDS = 1
+# bearer token the scraper sends, /metrics answers 404 without it; behind a reverse proxy every
+# request comes from 127.0.0.1, so the client address cannot be used to restrict access
+METRICS_TOKEN = env('METRICS_TOKEN', default='')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'CoreRoot.profiling': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+        # image variants built in the background, see IMAGE_VARIANT_THREADS
+        'CoreRoot.images': {'handlers': ['console'], 'level': 'ERROR', 'propagate': False},
+        # emails sent in the background, see NOTIFICATION_THREADS
+        'accounts.utils': {'handlers': ['console'], 'level': 'ERROR', 'propagate': False},
+    },
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -165,13 +248,35 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'static'
-# STATICFILES_DIRS = [
-#     'CoreRoot/static',
-# ]
+STATICFILES_DIRS = [
+    BASE_DIR / 'CoreRoot' / 'static',
+]
+# Hashed file names, minified CSS/JS and .gz/.br siblings written by collectstatic
+STATICFILES_STORAGE = 'CoreRoot.storage.CompressedManifestStaticFilesStorage'
+# Fail on files missing from the collectstatic manifest, as a deploy without collectstatic should. Local
+# development renders templates without collected files, there the plain names are served (tests/settings.py too).
+STATIC_MANIFEST_STRICT = env.bool('STATIC_MANIFEST_STRICT', default=not DEBUG)
+# Serve STATIC_ROOT from the WSGI application (precompressed, immutable caching) when no web server does it
+SERVE_STATIC_FILES = env.bool('SERVE_STATIC_FILES', default=False)
 
 # Media files configurations
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# Serve media from Django (MediaView) with DEBUG off too, e.g. offloaded through MEDIA_SENDFILE_BACKEND.
+# Off, the web server serves the public directories itself.
+SERVE_MEDIA_FILES = env.bool('SERVE_MEDIA_FILES', default=False)
+# Media directories anyone may download. Other uploads (vendor licenses) are only served to staff and their vendor.
+MEDIA_PUBLIC_DIRS = ('food_images/', 'users/profile_pictures/', 'users/cover_photos/')
+# Hand media transfers to the web server: '' (serve from Django), 'nginx' (X-Accel-Redirect) or 'xsendfile'
+MEDIA_SENDFILE_BACKEND = env('MEDIA_SENDFILE_BACKEND', default='')
+# Internal nginx location aliased to MEDIA_ROOT, used with the 'nginx' backend
+MEDIA_ACCEL_REDIRECT_PREFIX = '/protected-media/'
+MEDIA_CACHE_MAX_AGE = 60 * 60 * 24 * 7
+# Threads per process building image variants after an upload is saved, off the request thread.
+# 0 builds them in the thread committing the save instead, as the tests need.
+IMAGE_VARIANT_THREADS = env.int('IMAGE_VARIANT_THREADS', default=2)
+# Threads storing images and building their variants during a bulk menu import
+MENU_IMPORT_WORKERS = env.int('MENU_IMPORT_WORKERS', default=4)
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
@@ -193,6 +298,9 @@ EMAIL_HOST_USER = env('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = env('EMAIL_HOST_PASSWORD')
 EMAIL_USE_SSL = env('EMAIL_USE_SSL')
 DEFAULT_FROM_EMAIL = env('DEFAULT_FROM_EMAIL')
+# Threads per process sending batched notification emails (bulk vendor approval) after the response.
+# 0 sends them in the request thread instead.
+NOTIFICATION_THREADS = env.int('NOTIFICATION_THREADS', default=1)
 
 # Google API
 GOOGLE_API_KEY = env('GOOGLE_API_KEY')
@@ -0,0 +1,93 @@
+import mimetypes
+import os
+import re
+from email.utils import formatdate
+
+from django.core.exceptions import SuspiciousFileOperation
+from django.utils._os import safe_join
+
+# Names produced by ManifestStaticFilesStorage: 'css/style.0a1b2c3d4e5f.css'.
+HASHED_NAME_RE = re.compile(r'\.[0-9a-f]{12}\.[^./]+$')
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+DEFAULT_CACHE_CONTROL = 'public, max-age=300'
+CHUNK_SIZE = 64 * 1024
+
+
+def read_chunks(path):
+    with open(path, 'rb') as file:
+        while True:
+            chunk = file.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+
+def accepted_encodings(header):
+    """Content codings the client accepts, ignoring those explicitly refused with q=0."""
+    accepted = set()
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        params = params.replace(' ', '')
+        if coding and params not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            accepted.add(coding.lower())
+    return accepted
+
+
+class PrecompressedStaticFiles:
+    """WSGI middleware that serves STATIC_ROOT directly, picking the .br/.gz sibling written by
+    CompressedManifestStaticFilesStorage when the client accepts it. Hashed names get immutable caching.
+    Requests outside the static prefix, or for files that do not exist, go to the wrapped application."""
+
+    encodings = (('br', '.br'), ('gzip', '.gz'))
+
+    def __init__(self, application, root, prefix):
+        self.application = application
+        self.root = str(root)
+        self.prefix = prefix
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        if not path.startswith(self.prefix) or environ.get('REQUEST_METHOD') not in ('GET', 'HEAD'):
+            return self.application(environ, start_response)
+        try:
+            full_path = safe_join(self.root, path[len(self.prefix):])
+        except SuspiciousFileOperation:
+            return self.application(environ, start_response)
+        if not os.path.isfile(full_path):
+            return self.application(environ, start_response)
+        return self.serve(environ, start_response, full_path)
+
+    def serve(self, environ, start_response, full_path):
+        content_type, _ = mimetypes.guess_type(full_path)
+        headers = [
+            ('Content-Type', content_type or 'application/octet-stream'),
+            ('Vary', 'Accept-Encoding'),
+            ('Cache-Control', IMMUTABLE_CACHE_CONTROL if HASHED_NAME_RE.search(full_path) else DEFAULT_CACHE_CONTROL),
+        ]
+
+        served_path = full_path
+        accepted = accepted_encodings(environ.get('HTTP_ACCEPT_ENCODING', ''))
+        for coding, suffix in self.encodings:
+            if coding in accepted and os.path.isfile(full_path + suffix):
+                served_path = full_path + suffix
+                headers.append(('Content-Encoding', coding))
+                break
+
+        stat = os.stat(served_path)
+        etag = '"%x-%x"' % (int(stat.st_mtime), stat.st_size)
+        headers.append(('ETag', etag))
+        headers.append(('Last-Modified', formatdate(stat.st_mtime, usegmt=True)))
+
+        if etag in environ.get('HTTP_IF_NONE_MATCH', ''):
+            start_response('304 Not Modified', headers)
+            return []
+
+        headers.append(('Content-Length', str(stat.st_size)))
+        start_response('200 OK', headers)
+        if environ['REQUEST_METHOD'] == 'HEAD':
+            return []
+        file_wrapper = environ.get('wsgi.file_wrapper')
+        if file_wrapper is not None:
+            return file_wrapper(open(served_path, 'rb'), CHUNK_SIZE)
+        return read_chunks(served_path)
@@ -0,0 +1,118 @@
+import gzip
+import os
+import re
+from urllib.parse import unquote, urlsplit
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import rjsmin
+except ImportError:
+    rjsmin = None
+
+try:
+    import rcssmin
+except ImportError:
+    rcssmin = None
+
+# Conservative fallback CSS minifier: drops comments (except /*! licence */) and collapses whitespace.
+CSS_COMMENT_RE = re.compile(r'/\*(?!!).*?\*/', re.S)
+CSS_SPACE_RE = re.compile(r'\s+')
+CSS_PUNCTUATION_RE = re.compile(r'\s*([{};])\s*')
+
+
+def minify_css(text):
+    if rcssmin is not None:
+        return rcssmin.cssmin(text, keep_bang_comments=True)
+    text = CSS_COMMENT_RE.sub('', text)
+    text = CSS_SPACE_RE.sub(' ', text)
+    return CSS_PUNCTUATION_RE.sub(r'\1', text).strip()
+
+
+def minify_js(text):
+    # JavaScript is only minified with rjsmin, a regex based minifier is not safe for it.
+    if rjsmin is not None:
+        return rjsmin.jsmin(text)
+    return text
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Manifest storage that minifies CSS/JS while collecting and writes .gz/.br siblings of every
+    hashed file, so the web server can send precompressed assets with far-future cache headers."""
+
+    minifiers = {
+        '.css': minify_css,
+        '.js': minify_js,
+    }
+    compressible_extensions = ('.css', '.js', '.svg', '.json', '.map', '.txt', '.html', '.xml',
+                               '.ico', '.eot', '.ttf', '.otf')
+    # Compressed siblings that do not save at least this share of the original are skipped.
+    min_compression_ratio = 0.95
+
+    def _save(self, name, content):
+        """Minify CSS/JS on the way into STATIC_ROOT, so the hash is computed over the minified content."""
+        root, extension = os.path.splitext(name)
+        minifier = self.minifiers.get(extension.lower())
+        if minifier is not None and not root.endswith('.min'):
+            content.seek(0)
+            try:
+                text = content.read().decode('utf-8')
+            except UnicodeDecodeError:
+                content.seek(0)
+            else:
+                content = ContentFile(minifier(text).encode('utf-8'))
+        return super()._save(name, content)
+
+    @property
+    def manifest_strict(self):
+        return settings.STATIC_MANIFEST_STRICT
+
+    def stored_name(self, name):
+        """The hashed name from the manifest. Outside strict mode names missing from it, the files were never
+        collected, are served as they are instead of hashing the file again on every {% static %} call."""
+        if not self.manifest_strict:
+            if self.hash_key(urlsplit(unquote(name)).path.strip()) not in self.hashed_files:
+                return name
+        return super().stored_name(name)
+
+    def url_converter(self, name, hashed_files, template=None):
+        """Leave url() references to files missing from the theme untouched instead of aborting collectstatic."""
+        converter = super().url_converter(name, hashed_files, template)
+
+        def safe_converter(matchobj):
+            try:
+                return converter(matchobj)
+            except ValueError:
+                return matchobj.group(0)
+
+        return safe_converter
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        for hashed_name in set(self.hashed_files.values()):
+            if hashed_name.lower().endswith(self.compressible_extensions):
+                self.write_compressed(hashed_name)
+
+    def write_compressed(self, name):
+        """Write name.gz and, when brotli is installed, name.br next to the file."""
+        with self.open(name) as original:
+            data = original.read()
+        variants = [('.gz', lambda raw: gzip.compress(raw, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            variants.append(('.br', lambda raw: brotli.compress(raw, quality=11)))
+        for suffix, compress in variants:
+            compressed = compress(data)
+            if len(compressed) >= len(data) * self.min_compression_ratio:
+                continue
+            if self.exists(name + suffix):
+                self.delete(name + suffix)
+            super()._save(name + suffix, ContentFile(compressed))
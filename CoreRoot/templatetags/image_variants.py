@@ -0,0 +1,31 @@
+from django import template
+from django.utils.html import format_html
+
+from CoreRoot.images import get_variant_url
+
+register = template.Library()
+
+
+@register.simple_tag
+def variant_url(instance, field_name, size, fmt='jpeg'):
+    """Return the URL of an image variant, e.g. {% variant_url product 'image' 'thumb' %}."""
+    return get_variant_url(instance, field_name, size, fmt)
+
+
+@register.simple_tag
+def picture(instance, field_name, size, alt='', css_class='', width='', fallback=''):
+    """Render a <picture> with a WebP source and a JPEG <img> for the requested variant,
+    e.g. {% picture product 'image' 'thumb' width=60 %}. The fallback URL is used when the field is empty."""
+    jpeg_url = get_variant_url(instance, field_name, size, 'jpeg') or fallback
+    if not jpeg_url:
+        return ''
+    webp_url = get_variant_url(instance, field_name, size, 'webp')
+    if width:
+        img = format_html('<img src="{}" class="{}" width="{}" alt="{}" loading="lazy">',
+                          jpeg_url, css_class, width, alt)
+    else:
+        img = format_html('<img src="{}" class="{}" alt="{}" loading="lazy">', jpeg_url, css_class, alt)
+    # Without a generated variant both lookups return the original upload, so skip the WebP source.
+    if not webp_url or webp_url == jpeg_url:
+        return img
+    return format_html('<picture><source srcset="{}" type="image/webp">{}</picture>', webp_url, img)
@@ -0,0 +1,66 @@
+from django.db.models.fields.files import FieldFile
+
+
+class LoadedValuesMixin:
+    """Model mixin that snapshots the values of `tracked_fields` when an instance is loaded or saved,
+    so save paths can detect changes without re-fetching the row."""
+
+    tracked_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Create the instance and remember the tracked values it was loaded with."""
+        instance = super().from_db(db, field_names, values)
+        loaded = dict(zip(field_names, values))
+        instance._loaded_values = {
+            attname: loaded[attname] for attname in instance._tracked_attnames() if attname in loaded
+        }
+        return instance
+
+    def _tracked_attnames(self):
+        return [self._meta.get_field(name).attname for name in self.tracked_fields]
+
+    def _current_value(self, attname):
+        """Current value in the same shape as the database returns it (file fields as names)."""
+        value = getattr(self, attname)
+        if isinstance(value, FieldFile):
+            return value.name
+        return value
+
+    def _snapshot(self, attnames):
+        loaded = self.__dict__.setdefault('_loaded_values', {})
+        for attname in attnames:
+            if attname in self.__dict__:
+                loaded[attname] = self._current_value(attname)
+
+    def get_loaded_value(self, field_name):
+        """Value the field had when the instance was loaded or last saved.
+        Falls back to a single query when the field was deferred or the instance was built by hand."""
+        attname = self._meta.get_field(field_name).attname
+        loaded = self.__dict__.setdefault('_loaded_values', {})
+        if attname not in loaded:
+            loaded[attname] = type(self)._base_manager.filter(pk=self.pk).values_list(attname, flat=True).first()
+        return loaded[attname]
+
+    def has_changed(self, field_name):
+        """Whether the field differs from its loaded value. Always true for unsaved instances."""
+        if self._state.adding:
+            return True
+        attname = self._meta.get_field(field_name).attname
+        return self._current_value(attname) != self.get_loaded_value(field_name)
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._snapshot(self._limit_attnames(kwargs.get('update_fields')))
+
+    def _limit_attnames(self, field_names):
+        """Tracked attnames, restricted to field_names when given."""
+        attnames = self._tracked_attnames()
+        if field_names is None:
+            return attnames
+        limited = {self._meta.get_field(name).attname for name in field_names}
+        return [attname for attname in attnames if attname in limited]
+
+    def refresh_from_db(self, using=None, fields=None):
+        super().refresh_from_db(using=using, fields=fields)
+        self._snapshot(self._limit_attnames(fields))
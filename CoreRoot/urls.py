@@ -1,9 +1,10 @@
 from django.contrib import admin
-from django.urls import path, include
+import re
+
+from django.urls import path, include, re_path
 from django.conf import settings
-from django.conf.urls.static import static
 
-from CoreRoot.views import HomeView
+from CoreRoot.views import HomeView, MediaView, MetricsView
 from marketplace.views import CartListView, SearchView, CheckoutView
 
 urlpatterns = [
@@ -28,6 +29,11 @@ urlpatterns = [
 
     # ORDERS
     path('orders/', include('orders.urls')),
+
+    # Prometheus metrics
+    path('metrics', MetricsView.as_view(), name='metrics'),
 ]
 
-urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+urlpatterns += [
+    re_path(r'^%s(?P<path>.*)$' % re.escape(settings.MEDIA_URL.lstrip('/')), MediaView.as_view(), name='media'),
+]
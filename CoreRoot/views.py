@@ -1,9 +1,21 @@
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
 from django.contrib.gis.db.models.functions import Distance
-from django.contrib.gis.geos import GEOSGeometry
+from django.contrib.gis.geos import Point
 from django.contrib.gis.measure import D
+from django.core.exceptions import ImproperlyConfigured, SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
 from django.shortcuts import render
+from django.utils._os import safe_join
+from django.utils.crypto import constant_time_compare
+from django.utils.http import http_date, parse_http_date_safe
 from django.views import View
 
+from CoreRoot import metrics
 from vendor.models import Vendor
 
 
@@ -11,42 +23,209 @@ class HomeView(View):
     """View for main page representation."""
 
     template_name = 'home.html'
+    location_salt = 'home.location'
 
     @staticmethod
-    def get_or_set_current_location(request):
-        """Get or set the current location coordinates from the request."""
-        if 'lat' in request.session:
-            lat = request.session['lat']
-            lng = request.session['lng']
-            return lng, lat
-        elif 'lat' in request.GET:
-            lat = request.GET.get('lat')
-            lng = request.GET.get('lng')
-            request.session['lat'] = lat
-            request.session['lng'] = lng
-            return lng, lat
-        else:
+    def parse_location(lat, lng):
+        """(lng, lat) as floats when both are valid coordinates, else None."""
+        try:
+            lat, lng = float(lat), float(lng)
+        except (TypeError, ValueError):
             return None
+        if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+            return None
+        return lng, lat
+
+    def get_cookie_location(self, request):
+        """Location remembered from an earlier visit, kept in a signed cookie rather than the session
+        so anonymous visitors never need a session row."""
+        value = request.get_signed_cookie(settings.LOCATION_COOKIE_NAME, default='', salt=self.location_salt)
+        return self.parse_location(*value.split(',')) if value.count(',') == 1 else None
 
     def get(self, request):
         """Handle GET requests to the home page."""
-        if self.get_or_set_current_location(request) is not None:
+        query_location = self.parse_location(request.GET.get('lat'), request.GET.get('lng'))
+        location = query_location or self.get_cookie_location(request)
+        if location is not None:
             # Get the current location coordinates
-            pnt = GEOSGeometry('POINT(%s %s)' % (self.get_or_set_current_location(request)))
+            pnt = Point(*location, srid=4326)
 
             # Filter vendors within a certain distance from the current location
             vendors = Vendor.objects.filter(
                 user_profile__location__distance_lte=(pnt, D(km=1000))
-            ).annotate(distance=Distance("user_profile__location", pnt)).order_by("distance")
+            ).annotate(distance=Distance("user_profile__location", pnt)).order_by("distance").for_listing()
 
             for vendor in vendors:
                 # Calculate the distance in kilometers and round to one decimal place.
                 vendor.kms = round(vendor.distance.km, 1)
         else:
             # If the current location is not available, retrieve a default list of vendors.
-            vendors = Vendor.objects.filter(is_approved=True, user__is_active=True)[:8]
+            vendors = Vendor.objects.listed().for_listing()[:8]
 
         context = {
             'vendors': vendors,
         }
-        return render(request, self.template_name, context)
+        response = render(request, self.template_name, context)
+        if query_location is not None:
+            lng, lat = query_location
+            response.set_signed_cookie(settings.LOCATION_COOKIE_NAME, f'{lat:.6f},{lng:.6f}', salt=self.location_salt,
+                                       max_age=settings.LOCATION_COOKIE_MAX_AGE, httponly=True, samesite='Lax')
+        return response
+
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def parse_range(header, size):
+    """Parse a single 'bytes=start-end' range. Returns (start, end) inclusive, None for no usable range,
+    or False when the range cannot be satisfied."""
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    start, end = match.groups()
+    if start == '':
+        # Suffix range: the last N bytes, of which an empty file has none.
+        length = int(end)
+        if length == 0 or size == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def read_range(file, length, chunk_size=64 * 1024):
+    """Yield length bytes from the current position of file, then close it."""
+    with file:
+        while length > 0:
+            chunk = file.read(min(chunk_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+class MediaView(View):
+    """Serve uploaded media with ETag/Last-Modified validation and byte ranges, with DEBUG or SERVE_MEDIA_FILES on.
+    Files outside MEDIA_PUBLIC_DIRS are only served to staff and to the vendor whose license they are.
+    With MEDIA_SENDFILE_BACKEND set, the transfer is handed off to the web server via X-Accel-Redirect
+    (nginx) or X-Sendfile (Apache, lighttpd); otherwise FileResponse lets the WSGI server use sendfile()."""
+
+    def get(self, request, path):
+        """Handle GET and HEAD requests for a file below MEDIA_ROOT."""
+        if not (settings.DEBUG or settings.SERVE_MEDIA_FILES):
+            raise Http404
+        try:
+            full_path = safe_join(settings.MEDIA_ROOT, path)
+        except SuspiciousFileOperation:
+            raise Http404
+        if not os.path.isfile(full_path):
+            raise Http404
+        # Checked on the resolved name, 'food_images/../vendor/license/...' is not public.
+        name = os.path.relpath(full_path, settings.MEDIA_ROOT).replace(os.sep, '/')
+        public = name.startswith(settings.MEDIA_PUBLIC_DIRS)
+        if not public and not self.can_view_private(request, name):
+            raise Http404
+
+        stat = os.stat(full_path)
+        etag = '"%x-%x"' % (int(stat.st_mtime), stat.st_size)
+        if self.not_modified(request, etag, stat.st_mtime):
+            response = HttpResponseNotModified()
+            self.set_cache_headers(response, etag, stat.st_mtime, public)
+            return response
+
+        content_type = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+        backend = settings.MEDIA_SENDFILE_BACKEND
+        if backend:
+            # The web server handles ranges itself, only validation headers are added here.
+            response = HttpResponse(content_type=content_type)
+            if backend == 'nginx':
+                response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_REDIRECT_PREFIX + quote(path)
+            elif backend == 'xsendfile':
+                response['X-Sendfile'] = full_path
+            else:
+                raise ImproperlyConfigured(
+                    f'Unknown MEDIA_SENDFILE_BACKEND {backend!r}, use "", "nginx" or "xsendfile".'
+                )
+        else:
+            response = self.file_response(request, full_path, stat.st_size, content_type, etag)
+        self.set_cache_headers(response, etag, stat.st_mtime, public)
+        return response
+
+    @staticmethod
+    def can_view_private(request, name):
+        """Staff, and a vendor its own license."""
+        user = request.user
+        if not user.is_authenticated:
+            return False
+        if user.is_staff:
+            return True
+        try:
+            vendor = Vendor.objects.get_for_user(user)
+        except Vendor.DoesNotExist:
+            return False
+        return vendor.vendor_license.name == name
+
+    @staticmethod
+    def not_modified(request, etag, mtime):
+        """Evaluate If-None-Match, falling back to If-Modified-Since."""
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match is not None:
+            return if_none_match.strip() == '*' or etag in if_none_match
+        if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+        return if_modified_since is not None and int(mtime) <= if_modified_since
+
+    @staticmethod
+    def file_response(request, full_path, size, content_type, etag):
+        """Full or partial (206) response for the file."""
+        byte_range = None
+        range_header = request.META.get('HTTP_RANGE')
+        # A stale If-Range means the client's partial copy is outdated, so the whole file is sent.
+        if range_header and request.META.get('HTTP_IF_RANGE', etag) == etag:
+            byte_range = parse_range(range_header, size)
+
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+        file = open(full_path, 'rb')
+        if byte_range is None:
+            response = FileResponse(file, content_type=content_type)
+        else:
+            start, end = byte_range
+            length = end - start + 1
+            file.seek(start)
+            if end == size - 1:
+                # Open-ended ranges keep the real file object, so the server can still sendfile() from the offset.
+                response = FileResponse(file, content_type=content_type, status=206)
+            else:
+                response = StreamingHttpResponse(read_range(file, length), content_type=content_type, status=206)
+            response['Content-Length'] = str(length)
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        return response
+
+    @staticmethod
+    def set_cache_headers(response, etag, mtime, public=True):
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(mtime)
+        response['Accept-Ranges'] = 'bytes'
+        if public:
+            response['Cache-Control'] = f'public, max-age={settings.MEDIA_CACHE_MAX_AGE}'
+        else:
+            # Shared caches must not keep it, browsers revalidate with the ETag.
+            response['Cache-Control'] = 'private, no-cache'
+
+
+class MetricsView(View):
+    """Prometheus scrape endpoint with the metrics of all workers. Only answers requests carrying
+    METRICS_TOKEN as a bearer token, and nothing while metrics are disabled or no token is set."""
+
+    def get(self, request):
+        token = settings.METRICS_TOKEN
+        authorization = request.META.get('HTTP_AUTHORIZATION', '')
+        if not (settings.METRICS_ENABLED and token and constant_time_compare(authorization, f'Bearer {token}')):
+            raise Http404
+        return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
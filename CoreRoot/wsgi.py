@@ -9,8 +9,15 @@ https://docs.djangoproject.com/en/3.2/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'CoreRoot.settings')
 
 application = get_wsgi_application()
+
+if settings.SERVE_STATIC_FILES:
+    # Serve collected, precompressed static files without going through the Django request cycle.
+    from CoreRoot.static_serving import PrecompressedStaticFiles
+
+    application = PrecompressedStaticFiles(application, settings.STATIC_ROOT, settings.STATIC_URL)
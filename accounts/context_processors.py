@@ -5,7 +5,11 @@ from django.conf import settings
 
 def get_vendor(request):
     try:
-        vendor = Vendor.objects.get(user=request.user)
+        vendor = Vendor.objects.get_for_user(request.user)
+        # Templates show the vendor's profile pictures, attach the cached profile instead of querying it.
+        user_profile = UserProfile.objects.get_for_user(request.user)
+        if user_profile.pk == vendor.user_profile_id:
+            vendor.user_profile = user_profile
     except:
         vendor = None
     return dict(vendor=vendor)
@@ -13,7 +17,7 @@ def get_vendor(request):
 
 def get_user_profile(request):
     try:
-        user_profile = UserProfile.objects.get(user=request.user)
+        user_profile = UserProfile.objects.get_for_user(request.user)
     except:
         user_profile = None
     return dict(user_profile=user_profile)
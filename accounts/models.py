@@ -1,9 +1,14 @@
+from functools import partial
+
 from django.contrib.auth.base_user import AbstractBaseUser, BaseUserManager
 from django.db import models
 from django.contrib.gis.db import models as gismodels
 from django.contrib.gis.geos import Point
 
-from CoreRoot.decorators import delete_old_photo_on_save, delete_old_cover_on_save
+from CoreRoot.caching import UserCacheManager
+from CoreRoot.decorators import delete_old_files_on_save
+from CoreRoot.images import pending_image_fields, refresh_image_variants
+from CoreRoot.tracking import LoadedValuesMixin
 
 
 class UserManager(BaseUserManager):
@@ -107,11 +112,12 @@ class User(AbstractBaseUser):
             return user_role
 
 
-class UserProfile(models.Model):
+class UserProfile(LoadedValuesMixin, models.Model):
     """Model representing the user's profile information."""
     user = models.OneToOneField(User, on_delete=models.CASCADE, blank=True, null=True)
     profile_picture = models.ImageField(upload_to='users/profile_pictures', blank=True, null=True)
     cover_photo = models.ImageField(upload_to='users/cover_photos', blank=True, null=True)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     address = models.CharField(max_length=250, blank=True, null=True)
     country = models.CharField(max_length=30, blank=True, null=True)
     state = models.CharField(max_length=30, blank=True, null=True)
@@ -123,14 +129,25 @@ class UserProfile(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     modified_at = models.DateTimeField(auto_now=True)
 
+    # Resized variants generated for each image field, see CoreRoot.images.VARIANT_SIZES.
+    IMAGE_VARIANTS = {
+        'profile_picture': ('thumb', 'card'),
+        'cover_photo': ('cover',),
+    }
+    tracked_fields = ('profile_picture', 'cover_photo')
+
+    objects = UserCacheManager()
+
     def __str__(self):
         """String representation of the UserProfile object."""
         return self.user.email
 
-    @delete_old_photo_on_save
-    @delete_old_cover_on_save
+    @delete_old_files_on_save('profile_picture', 'cover_photo')
     def save(self, *args, **kwargs):
         if self.latitude and self.longitude:
             self.location = Point(float(self.longitude), float(self.latitude))
-            return super(UserProfile, self).save(*args, **kwargs)
-        return super(UserProfile, self).save(*args, **kwargs)
+        pending_images = pending_image_fields(self)
+        super(UserProfile, self).save(*args, **kwargs)
+        # The variants are written with update() after post_save invalidated the cached row.
+        refresh_image_variants(self, pending_images,
+                               on_done=partial(UserProfile.objects.invalidate, [self.user_id]))
@@ -7,17 +7,13 @@ from accounts.models import User, UserProfile
 def post_save_create_profile_receiver(sender, instance, created, **kwargs):
     """Signal receiver function that gets triggered after a User model instance is saved.
      It creates a UserProfile instance associated with the saved user if it was just created,
-     otherwise it updates the existing UserProfile instance."""
-    print(created)
+     and makes sure the profile exists after a full save of an existing user. Partial saves
+     (e.g. last_login on login) do not touch the profile."""
     if created:
         UserProfile.objects.create(user=instance)
-    else:
-        try:
-            profile = UserProfile.objects.get(user=instance)
-            profile.save()
-        except UserProfile.DoesNotExist:
-            # Create the userprofile if not exist
-            UserProfile.objects.create(user=instance)
+    elif kwargs.get('update_fields') is None:
+        # Create the userprofile if not exist
+        UserProfile.objects.get_or_create(user=instance)
 
 
 @receiver(pre_save, sender=User)
@@ -1,11 +1,17 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 from django.conf import settings
 from django.contrib.auth.tokens import default_token_generator
 from django.contrib.sites.shortcuts import get_current_site
-from django.core.mail import EmailMessage
+from django.core.mail import EmailMessage, get_connection
 from django.template.loader import render_to_string
 from django.utils.encoding import force_bytes
 from django.utils.http import urlsafe_base64_encode
 
+logger = logging.getLogger(__name__)
+
 
 def detect_user(user):
     if user.role == 1:
@@ -34,7 +40,11 @@ def send_verification_email(request, user, mail_subject, email_template):
     mail.send()
 
 
-def send_notification(mail_subject, email_template, context):
+_notification_executor = None
+_notification_executor_lock = threading.Lock()
+
+
+def build_notification(mail_subject, email_template, context):
     from_email = settings.DEFAULT_FROM_EMAIL
     message = render_to_string(email_template, context)
     if isinstance(context['to_email'], str):
@@ -44,4 +54,46 @@ def send_notification(mail_subject, email_template, context):
         to_email = context['to_email']
     mail = EmailMessage(mail_subject, message, from_email, to=to_email)
     mail.content_subtype = "html"
-    mail.send()
+    return mail
+
+
+def send_notification(mail_subject, email_template, context):
+    build_notification(mail_subject, email_template, context).send()
+
+
+def send_notifications(notifications):
+    """Send (mail_subject, email_template, context) notifications over a single SMTP connection."""
+    messages = [build_notification(*notification) for notification in notifications]
+    if messages:
+        get_connection().send_messages(messages)
+
+
+def get_notification_executor():
+    """Thread pool of NOTIFICATION_THREADS threads, created once per process."""
+    global _notification_executor
+    with _notification_executor_lock:
+        if _notification_executor is None:
+            _notification_executor = ThreadPoolExecutor(max_workers=settings.NOTIFICATION_THREADS,
+                                                        thread_name_prefix='notifications')
+        return _notification_executor
+
+
+def _log_failed_notifications(future):
+    # Nobody waits for the future, a failed send would otherwise go unnoticed.
+    exception = future.exception()
+    if exception is not None:
+        logger.error('Sending notifications failed', exc_info=exception)
+
+
+def send_notifications_in_background(notifications):
+    """send_notifications() off the request thread, in a pool of NOTIFICATION_THREADS threads.
+    With NOTIFICATION_THREADS = 0 they are sent in the calling thread instead, as the tests need.
+    The notifications must not need the database to render. Failures are logged to this module's logger.
+    Returns the future, or None."""
+    notifications = list(notifications)
+    if not settings.NOTIFICATION_THREADS:
+        send_notifications(notifications)
+        return None
+    future = get_notification_executor().submit(send_notifications, notifications)
+    future.add_done_callback(_log_failed_notifications)
+    return future
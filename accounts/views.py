@@ -17,7 +17,7 @@ from accounts.utils import detect_user, send_verification_email
 from common.views import CustomerUserPassesTestMixin, VendorUserPassesTestMixin
 from orders.models import Order
 from vendor.forms import VendorForm
-from vendor.models import Vendor
+from vendor.views import get_vendor
 
 
 class RegisterUserView(View):
@@ -242,7 +242,7 @@ class VendorDashboardView(LoginRequiredMixin, VendorUserPassesTestMixin, Templat
         revenue for the vendor. The orders and revenue data are added to the context."""
         context = super().get_context_data(**kwargs)
         # Retrieve the vendor for the current user
-        vendor = Vendor.objects.get(user=self.request.user)
+        vendor = get_vendor(self.request)
         # Retrieve orders for the vendor
         orders = Order.objects.filter(vendors__in=[vendor.id], is_ordered=True).order_by('-created_at')
         recent_orders = orders[:10]
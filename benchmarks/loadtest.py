@@ -0,0 +1,248 @@
+import random
+import re
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from http.cookiejar import CookieJar
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode, urljoin
+from urllib.request import HTTPCookieProcessor, Request, build_opener
+
+import simplejson as json
+from django.db import connection
+
+from benchmarks.stats import summarize
+
+ORDER_NUMBER_RE = re.compile(r'var order_number = "(\d+)"')
+# Tables whose row locks the load test watches for waiters.
+WATCHED_TABLES = ('marketplace_cart', 'orders_order')
+
+
+class PayPalStub:
+    """Stands in for the PayPal capture done in the browser: returns a completed capture after a simulated
+    network delay, so payments can be replayed without the PayPal sandbox."""
+
+    def __init__(self, latency=0.2, failure_rate=0.0, rng=None):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.rng = rng or random.Random()
+
+    def capture(self, order_number):
+        time.sleep(self.rng.uniform(0, 2 * self.latency))
+        status = 'FAILED' if self.rng.random() < self.failure_rate else 'COMPLETED'
+        return {'id': f'STUB-{order_number}-{uuid.uuid4().hex[:8].upper()}', 'status': status}
+
+
+class StepFailed(Exception):
+    pass
+
+
+class StepStats:
+    """Thread-safe per-step durations and errors."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.durations = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.error_samples = []
+
+    def record(self, step, duration, error=None):
+        with self.lock:
+            self.durations[step].append(duration)
+            if error is not None:
+                self.errors[step] += 1
+                if len(self.error_samples) < 20:
+                    self.error_samples.append(f'{step}: {error}')
+
+    def report(self, elapsed):
+        steps = {}
+        for step, durations in self.durations.items():
+            steps[step] = {
+                **summarize(durations),
+                'errors': self.errors[step],
+                'error_rate': round(self.errors[step] / len(durations), 4),
+                'throughput_rps': round(len(durations) / elapsed, 2),
+            }
+        return steps
+
+
+class Journey:
+    """One simulated customer going home -> search -> vendor detail -> add to cart xN -> checkout ->
+    place_order -> PayPal (stub) -> payments -> order_complete against a running server."""
+
+    def __init__(self, base_url, email, password, vendors, location, paypal, stats, cart_items=3, timeout=30,
+                 rng=None):
+        self.base_url = base_url
+        self.email = email
+        self.password = password
+        self.vendors = vendors
+        self.location = location
+        self.paypal = paypal
+        self.stats = stats
+        self.cart_items = cart_items
+        self.timeout = timeout
+        self.rng = rng or random.Random()
+        self.cookies = CookieJar()
+        self.opener = build_opener(HTTPCookieProcessor(self.cookies))
+
+    @property
+    def csrf_token(self):
+        for cookie in self.cookies:
+            if cookie.name == 'csrftoken':
+                return cookie.value
+        return ''
+
+    def request(self, path, params=None, data=None, ajax=False):
+        url = urljoin(self.base_url, path)
+        if params:
+            url = f'{url}?{urlencode(params)}'
+        headers = {'Referer': self.base_url}
+        if ajax:
+            headers['X-Requested-With'] = 'XMLHttpRequest'
+        body = None
+        if data is not None:
+            body = urlencode({**data, 'csrfmiddlewaretoken': self.csrf_token}).encode()
+            headers['X-CSRFToken'] = self.csrf_token
+        try:
+            with self.opener.open(Request(url, data=body, headers=headers), timeout=self.timeout) as response:
+                return response.read().decode()
+        except HTTPError as error:
+            raise StepFailed(f'HTTP {error.code} {path}')
+        except URLError as error:
+            raise StepFailed(f'{error.reason} {path}')
+
+    def step(self, name, func):
+        """Run func, timing it as step name. A failed step aborts the rest of the journey."""
+        started = time.perf_counter()
+        try:
+            result = func()
+        except (StepFailed, OSError, ValueError) as error:
+            self.stats.record(name, time.perf_counter() - started, error)
+            raise StepFailed(name)
+        self.stats.record(name, time.perf_counter() - started)
+        return result
+
+    def add_to_cart(self, item_id):
+        response = json.loads(self.request(f'/marketplace/add-to-cart/{item_id}/', ajax=True))
+        if response.get('status') != 'Success':
+            raise StepFailed(response.get('message'))
+
+    def place_order(self, data):
+        html = self.request('/orders/place-order/', data=data)
+        match = ORDER_NUMBER_RE.search(html)
+        if not match:
+            raise StepFailed('no order number in the response')
+        return match.group(1)
+
+    def pay(self, order_number):
+        capture = self.paypal.capture(order_number)
+        if capture['status'] != 'COMPLETED':
+            raise StepFailed('payment declined')
+        return capture
+
+    def record_payment(self, order_number, capture):
+        response = json.loads(self.request('/orders/payments/', ajax=True, data={
+            'order_number': order_number,
+            'transaction_id': capture['id'],
+            'payment_method': 'PayPal',
+            'status': capture['status'],
+        }))
+        if response.get('order_number') != order_number:
+            raise StepFailed('unexpected payments response')
+        return response
+
+    def run(self):
+        self.step('login_page', lambda: self.request('/login/'))
+        self.step('login', lambda: self.request('/login/', data={'email': self.email, 'password': self.password}))
+        self.step('home', lambda: self.request('/', params=self.location))
+        self.step('search', lambda: self.request('/search/', params={
+            'address': 'Madrid', 'radius': '25', 'keyword': '', **self.location,
+        }))
+        vendor_slug, item_ids = self.rng.choice(self.vendors)
+        self.step('vendor_detail', lambda: self.request(f'/marketplace/{vendor_slug}/'))
+        for item_id in self.rng.sample(item_ids, min(self.cart_items, len(item_ids))):
+            self.step('add_to_cart', lambda: self.add_to_cart(item_id))
+        self.step('checkout', lambda: self.request('/checkout'))
+        order_number = self.step('place_order', lambda: self.place_order({
+            'first_name': 'Load', 'last_name': 'Test', 'phone': '600000000', 'email': self.email,
+            'address': 'Calle 1', 'country': 'Spain', 'state': 'Madrid', 'city': 'Madrid', 'pin_code': '28001',
+            'payment_method': 'PayPal',
+        }))
+        capture = self.step('paypal_stub', lambda: self.pay(order_number))
+        self.step('payments', lambda: self.record_payment(order_number, capture))
+        self.step('order_complete', lambda: self.request('/orders/order-complete/', params={
+            'order_no': order_number, 'trans_id': capture['id'],
+        }))
+
+
+class LockMonitor(threading.Thread):
+    """Samples pg_stat_activity for sessions waiting on a lock and attributes them to the watched tables
+    by their query text. Row lock waits show up as 'transactionid'/'tuple' locks, not as table locks."""
+
+    def __init__(self, interval=0.1):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.samples = 0
+        self.waiting = {table: {'samples_with_waiters': 0, 'max_waiters': 0, 'waiter_samples': 0}
+                        for table in WATCHED_TABLES}
+        self.deadlocks = None
+
+    def count_deadlocks(self, cursor):
+        cursor.execute('SELECT deadlocks FROM pg_stat_database WHERE datname = current_database()')
+        return cursor.fetchone()[0]
+
+    def run(self):
+        try:
+            with connection.cursor() as cursor:
+                deadlocks_before = self.count_deadlocks(cursor)
+                while not self.stopped.wait(self.interval):
+                    cursor.execute(
+                        "SELECT query FROM pg_stat_activity "
+                        "WHERE wait_event_type = 'Lock' AND datname = current_database()"
+                    )
+                    queries = [row[0] for row in cursor.fetchall()]
+                    self.samples += 1
+                    for table, counts in self.waiting.items():
+                        waiters = sum(table in query for query in queries)
+                        counts['waiter_samples'] += waiters
+                        counts['max_waiters'] = max(counts['max_waiters'], waiters)
+                        counts['samples_with_waiters'] += waiters > 0
+                self.deadlocks = self.count_deadlocks(cursor) - deadlocks_before
+        finally:
+            connection.close()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+    def report(self):
+        return {
+            'samples': self.samples,
+            'interval_seconds': self.interval,
+            'tables': self.waiting,
+            'deadlocks': self.deadlocks,
+        }
+
+
+def run_load(journeys, concurrency, monitor=None):
+    """Run the journeys on a thread pool. Returns (elapsed seconds, completed journeys)."""
+    if monitor:
+        monitor.start()
+    started = time.perf_counter()
+
+    def run(journey):
+        try:
+            journey.run()
+        except StepFailed:
+            return False
+        return True
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        completed = sum(pool.map(run, journeys))
+    elapsed = time.perf_counter() - started
+    if monitor:
+        monitor.stop()
+    return elapsed, completed
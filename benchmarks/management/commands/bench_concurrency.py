@@ -0,0 +1,130 @@
+import json
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import User
+from benchmarks.loadtest import Journey, StepFailed, StepStats
+from benchmarks.seed import BENCH_PASSWORD
+from benchmarks.stats import current_commit, summarize
+from catalog.models import FoodItem
+
+
+class Command(BaseCommand):
+    help = ('Compare concurrent-request throughput of running servers, e.g. gunicorn (WSGI) against uvicorn (ASGI), '
+            'on the cart AJAX and search endpoints. Every simulated customer logs in, then sends a mix of add to '
+            'cart, decrease cart and search requests. Reports requests per second and latency percentiles per '
+            'target and concurrency level as JSON.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', action='append', required=True, metavar='NAME=URL',
+                            help='Server to benchmark, repeatable, e.g. --target wsgi=http://127.0.0.1:8000 '
+                                 '--target asgi=http://127.0.0.1:8001.')
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 10, 50],
+                            help='Concurrent customers, one run per level.')
+        parser.add_argument('--requests', type=int, default=20, help='Requests per customer after logging in.')
+        parser.add_argument('--timeout', type=float, default=30, help='Per request timeout in seconds.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--prefix', default='bench', help='Prefix used by seed_bench.')
+        parser.add_argument('--output', help='Write the JSON report to this file instead of stdout.')
+
+    def handle(self, *args, **options):
+        targets = []
+        for target in options['target']:
+            name, sep, url = target.partition('=')
+            if not sep or not url:
+                raise CommandError(f'--target must be NAME=URL, got "{target}".')
+            targets.append((name, url))
+
+        accounts = list(
+            User.objects.filter(username__startswith=f'{options["prefix"]}-customer-', role=User.CUSTOMER)
+            .select_related('userprofile').order_by('pk')[:max(options['concurrency'])]
+        )
+        item_ids = list(FoodItem.objects.filter(
+            vendor__vendor_slug__startswith=f'{options["prefix"]}-vendor-', vendor__is_approved=True,
+            vendor__user__is_active=True, is_available=True,
+        ).values_list('id', flat=True))
+        if not accounts or not item_ids:
+            raise CommandError(f'No seeded data with prefix "{options["prefix"]}", run seed_bench first.')
+
+        results = {}
+        for name, url in targets:
+            results[name] = {}
+            for concurrency in options['concurrency']:
+                self.stderr.write(f'{name}: {concurrency} concurrent customers against {url}')
+                results[name][concurrency] = self.run_level(url, accounts, item_ids, concurrency, options)
+
+        report = {
+            'commit': current_commit(),
+            'requests_per_customer': options['requests'],
+            'targets': dict(targets),
+            'results': results,
+        }
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                file.write(output)
+        else:
+            self.stdout.write(output)
+
+    def run_level(self, base_url, accounts, item_ids, concurrency, options):
+        login_stats, stats = StepStats(), StepStats()
+        rng = random.Random(options['seed'])
+        journeys = []
+        for index in range(concurrency):
+            # Customers beyond the seeded accounts share carts, which only adds row contention.
+            account = accounts[index % len(accounts)]
+            journeys.append(Journey(
+                base_url, account.email, BENCH_PASSWORD, [],
+                {'lat': account.userprofile.latitude, 'lng': account.userprofile.longitude},
+                None, login_stats, timeout=options['timeout'], rng=random.Random(rng.random()),
+            ))
+
+        def login(journey):
+            try:
+                journey.step('login_page', lambda: journey.request('/login/'))
+                journey.step('login', lambda: journey.request(
+                    '/login/', data={'email': journey.email, 'password': journey.password}
+                ))
+            except StepFailed:
+                return False
+            journey.stats = stats
+            return True
+
+        def run(journey):
+            for _ in range(options['requests']):
+                item_id = journey.rng.choice(item_ids)
+                action = journey.rng.choice(('add_to_cart', 'decrease_cart', 'search'))
+                try:
+                    if action == 'search':
+                        journey.step(action, lambda: journey.request('/search/', params={
+                            'address': 'Madrid', 'radius': '25', 'keyword': '', **journey.location,
+                        }))
+                    else:
+                        path = f'/marketplace/{action.replace("_", "-")}/{item_id}/'
+                        journey.step(action, lambda: journey.request(path, ajax=True))
+                except StepFailed:
+                    pass
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            # Logging in is not measured, every customer starts with a session.
+            journeys = [journey for journey, logged_in in zip(journeys, pool.map(login, journeys)) if logged_in]
+            if not journeys:
+                raise CommandError(f'No customer could log in to {base_url}: {login_stats.error_samples}')
+            started = time.perf_counter()
+            list(pool.map(run, journeys))
+            elapsed = time.perf_counter() - started
+
+        durations = [duration for step_durations in stats.durations.values() for duration in step_durations]
+        errors = sum(stats.errors.values())
+        return {
+            'seconds': round(elapsed, 2),
+            'customers': len(journeys),
+            'throughput_rps': round(len(durations) / elapsed, 2),
+            'errors': errors,
+            'requests': summarize(durations),
+            'steps': stats.report(elapsed),
+            'error_samples': stats.error_samples,
+        }
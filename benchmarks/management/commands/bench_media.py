@@ -0,0 +1,82 @@
+import json
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory, override_settings
+from django.views.static import serve
+
+from CoreRoot.views import MediaView
+
+
+def consume(response):
+    """Read the whole body and return its size in bytes."""
+    if response.streaming:
+        size = sum(len(chunk) for chunk in response.streaming_content)
+    else:
+        size = len(response.content)
+    response.close()
+    return size
+
+
+class Command(BaseCommand):
+    help = ('Compare media throughput of django.views.static.serve (the previous static() route) with MediaView, '
+            'in process. Zero-copy sendfile() and X-Accel-Redirect only apply behind a real WSGI/web server, '
+            'so these numbers are a lower bound for MediaView.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', help='File below MEDIA_PUBLIC_DIRS. Defaults to the largest public media file.')
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--range', dest='byte_range', default='bytes=0-65535',
+                            help='Range header used for the partial-content run.')
+
+    @override_settings(SERVE_MEDIA_FILES=True)
+    def handle(self, *args, **options):
+        path = options['path'] or self.largest_media_file()
+        factory = RequestFactory()
+        media_view = MediaView.as_view()
+        runs = {
+            'static_serve': lambda request: serve(request, path, document_root=settings.MEDIA_ROOT),
+            'media_view': lambda request: media_view(request, path=path),
+        }
+
+        results = {'path': path, 'requests': options['requests'], 'runs': {}}
+        for name, view in runs.items():
+            results['runs'][name] = self.measure(view, factory.get('/media/' + path), options['requests'])
+        # The previous route has no range support and always sends the full file.
+        range_request = factory.get('/media/' + path, HTTP_RANGE=options['byte_range'])
+        results['runs']['media_view_range'] = self.measure(runs['media_view'], range_request, options['requests'])
+        etag = media_view(factory.get('/media/' + path), path=path)['ETag']
+        conditional_request = factory.get('/media/' + path, HTTP_IF_NONE_MATCH=etag)
+        results['runs']['media_view_not_modified'] = self.measure(runs['media_view'], conditional_request,
+                                                                  options['requests'])
+        self.stdout.write(json.dumps(results, indent=2))
+
+    @staticmethod
+    def measure(view, request, count):
+        total_bytes = 0
+        started = time.perf_counter()
+        for _ in range(count):
+            total_bytes += consume(view(request))
+        elapsed = time.perf_counter() - started
+        return {
+            'seconds': round(elapsed, 4),
+            'requests_per_second': round(count / elapsed, 1),
+            'megabytes_per_second': round(total_bytes / elapsed / 1024 / 1024, 1),
+            'bytes_per_response': total_bytes // count,
+        }
+
+    @staticmethod
+    def largest_media_file():
+        largest, largest_size = None, -1
+        for directory in settings.MEDIA_PUBLIC_DIRS:
+            for root, _, files in os.walk(os.path.join(settings.MEDIA_ROOT, directory)):
+                for filename in files:
+                    full_path = os.path.join(root, filename)
+                    size = os.path.getsize(full_path)
+                    if size > largest_size:
+                        largest, largest_size = full_path, size
+        if largest is None:
+            raise CommandError('MEDIA_PUBLIC_DIRS contain no files')
+        return os.path.relpath(largest, settings.MEDIA_ROOT).replace(os.sep, '/')
@@ -0,0 +1,126 @@
+import json
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounts.models import User
+from benchmarks.seed import DISHES
+from benchmarks.stats import current_commit, summarize
+from catalog.models import FoodItem
+from orders.models import Order
+from vendor.models import Vendor
+
+
+class Command(BaseCommand):
+    help = ('Request each view through the test client against the current database (seeded with seed_bench) '
+            'and report p50/p95/p99 latency and query counts as JSON, to compare runs across commits.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50, help='Measured requests per view.')
+        parser.add_argument('--warmup', type=int, default=5, help='Unmeasured requests per view.')
+        parser.add_argument('--prefix', default='bench', help='Prefix used by seed_bench.')
+        parser.add_argument('--views', nargs='*', help='Only run these benchmark names.')
+        parser.add_argument('--output', help='Write the JSON report to this file instead of stdout.')
+
+    def handle(self, *args, **options):
+        # The test client sends Host: testserver.
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            clients, views = self.build_views(options['prefix'])
+            if options['views']:
+                unknown = set(options['views']) - {view[0] for view in views}
+                if unknown:
+                    raise CommandError(f'Unknown views: {", ".join(sorted(unknown))}')
+                views = [view for view in views if view[0] in options['views']]
+
+            results = {}
+            for name, role, url, params in views:
+                results[name] = self.measure(clients[role], url, params, options['warmup'], options['requests'])
+                self.stderr.write(f'{name}: p50 {results[name]["p50_ms"]} ms, {results[name]["queries"]} queries')
+
+        report = {
+            'commit': current_commit(),
+            'database': connection.vendor,
+            'dataset': {
+                'vendors': Vendor.objects.count(),
+                'food_items': FoodItem.objects.count(),
+                'orders': Order.objects.count(),
+            },
+            'requests': options['requests'],
+            'views': results,
+        }
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                file.write(output)
+        else:
+            self.stdout.write(output)
+
+    @staticmethod
+    def build_views(prefix):
+        """Logged in clients and the (name, role, url, params) list, using seeded rows as URL arguments."""
+        customer = User.objects.filter(username__startswith=f'{prefix}-customer-', cart__isnull=False,
+                                       order__is_ordered=True).first()
+        vendor = Vendor.objects.filter(vendor_slug__startswith=f'{prefix}-vendor-', is_approved=True,
+                                       order__is_ordered=True).select_related('user').first()
+        if customer is None or vendor is None:
+            raise CommandError(f'No seeded data with prefix "{prefix}", run seed_bench first.')
+        customer_order = Order.objects.filter(user=customer, is_ordered=True).select_related('payment').first()
+        vendor_order = Order.objects.filter(vendors=vendor, is_ordered=True).first()
+        category = vendor.category_set.first()
+        product = FoodItem.objects.filter(vendor=vendor).first()
+        location = {'lat': vendor.user_profile.latitude, 'lng': vendor.user_profile.longitude}
+
+        clients = {'anonymous': Client(), 'customer': Client(), 'vendor': Client()}
+        clients['customer'].force_login(customer)
+        clients['vendor'].force_login(vendor.user)
+
+        views = [
+            ('home', 'anonymous', reverse('home'), {}),
+            ('marketplace', 'anonymous', reverse('marketplace'), {}),
+            ('vendor_detail', 'anonymous', reverse('vendor_detail', args=[vendor.vendor_slug]), {}),
+            ('search', 'anonymous', reverse('search'),
+             {'address': 'Madrid', 'radius': '10', 'keyword': DISHES[0], **location}),
+            ('customer_dashboard', 'customer', reverse('customer_dashboard'), {}),
+            ('customer_my_orders', 'customer', reverse('customer_my_orders'), {}),
+            ('customer_order_detail', 'customer',
+             reverse('customer_order_detail', args=[customer_order.order_number]), {}),
+            ('customer_profile', 'customer', reverse('customer_profile'), {}),
+            ('vendor_detail_logged_in', 'customer', reverse('vendor_detail', args=[vendor.vendor_slug]), {}),
+            ('cart', 'customer', reverse('cart'), {}),
+            ('checkout', 'customer', reverse('checkout'), {}),
+            ('place_order', 'customer', reverse('place_order'), {}),
+            ('order_complete', 'customer', reverse('order_complete'),
+             {'order_no': customer_order.order_number, 'trans_id': customer_order.payment.transaction_id}),
+            ('vendor_dashboard', 'vendor', reverse('vendor_dashboard'), {}),
+            ('vendor_my_orders', 'vendor', reverse('vendor_my_orders'), {}),
+            ('vendor_order_detail', 'vendor', reverse('vendor_order_detail', args=[vendor_order.order_number]), {}),
+            ('vendor_orders_export', 'vendor', reverse('vendor_orders_export'), {'format': 'csv'}),
+            ('vendor_profile', 'vendor', reverse('vendor_profile'), {}),
+            ('catalog_builder', 'vendor', reverse('catalog_builder'), {}),
+            ('product_items_by_category', 'vendor', reverse('product_items_by_category', args=[category.id]), {}),
+            ('product_edit', 'vendor', reverse('product_edit', args=[product.id]), {}),
+            ('opening_hours', 'vendor', reverse('opening_hours'), {}),
+        ]
+        return clients, views
+
+    @staticmethod
+    def measure(client, url, params, warmup, count):
+        durations, query_counts, errors = [], [], 0
+        for run in range(warmup + count):
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                response = client.get(url, params)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                elapsed = time.perf_counter() - started
+            if run < warmup:
+                continue
+            durations.append(elapsed)
+            query_counts.append(len(queries))
+            errors += response.status_code >= 400
+        return {**summarize(durations), 'queries': max(query_counts, default=0), 'errors': errors}
@@ -0,0 +1,93 @@
+import json
+import random
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from accounts.models import User
+from benchmarks.loadtest import Journey, LockMonitor, PayPalStub, StepStats, run_load
+from benchmarks.seed import BENCH_PASSWORD
+from benchmarks.stats import current_commit, summarize
+from catalog.models import FoodItem
+
+
+class Command(BaseCommand):
+    help = ('Replay the customer purchase journey (home, search, vendor detail, add to cart, checkout, place order, '
+            'PayPal stub, payments, order complete) with concurrent simulated customers against a running server '
+            'using data from seed_bench, and report throughput, latency percentiles, error rates per step and '
+            'lock waits on the cart and order tables as JSON.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000', help='Server to replay against.')
+        parser.add_argument('--customers', type=int, default=50, help='Simulated customers (journeys).')
+        parser.add_argument('--concurrency', type=int, default=10, help='Journeys running at the same time.')
+        parser.add_argument('--accounts', type=int,
+                            help='Seeded accounts the customers are spread over. Fewer accounts than customers '
+                                 'makes journeys share carts and orders, to provoke lock contention.')
+        parser.add_argument('--cart-items', type=int, default=3, help='Add-to-cart requests per journey.')
+        parser.add_argument('--paypal-latency', type=float, default=0.2, help='Mean PayPal stub delay in seconds.')
+        parser.add_argument('--paypal-failure-rate', type=float, default=0.0)
+        parser.add_argument('--lock-interval', type=float, default=0.1, help='Lock sampling interval in seconds.')
+        parser.add_argument('--timeout', type=float, default=30, help='Per request timeout in seconds.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--prefix', default='bench', help='Prefix used by seed_bench.')
+        parser.add_argument('--output', help='Write the JSON report to this file instead of stdout.')
+
+    def handle(self, *args, **options):
+        accounts = list(
+            User.objects.filter(username__startswith=f'{options["prefix"]}-customer-', role=User.CUSTOMER)
+            .select_related('userprofile').order_by('pk')[:options['accounts'] or options['customers']]
+        )
+        vendors = {}
+        for vendor_slug, item_id in FoodItem.objects.filter(
+            vendor__vendor_slug__startswith=f'{options["prefix"]}-vendor-', vendor__is_approved=True,
+            vendor__user__is_active=True, is_available=True,
+        ).values_list('vendor__vendor_slug', 'id'):
+            vendors.setdefault(vendor_slug, []).append(item_id)
+        if not accounts or not vendors:
+            raise CommandError(f'No seeded data with prefix "{options["prefix"]}", run seed_bench first.')
+
+        rng = random.Random(options['seed'])
+        paypal = PayPalStub(options['paypal_latency'], options['paypal_failure_rate'], random.Random(options['seed']))
+        stats = StepStats()
+        vendors = sorted(vendors.items())
+        journeys = []
+        for index in range(options['customers']):
+            account = accounts[index % len(accounts)]
+            journeys.append(Journey(
+                options['base_url'], account.email, BENCH_PASSWORD, vendors,
+                {'lat': account.userprofile.latitude, 'lng': account.userprofile.longitude},
+                paypal, stats, cart_items=options['cart_items'], timeout=options['timeout'],
+                rng=random.Random(rng.random()),
+            ))
+
+        monitor = LockMonitor(options['lock_interval']) if connection.vendor == 'postgresql' else None
+        self.stderr.write(f'Replaying {len(journeys)} journeys over {len(accounts)} accounts '
+                          f'with concurrency {options["concurrency"]} against {options["base_url"]}')
+        elapsed, completed = run_load(journeys, options['concurrency'], monitor)
+
+        report = {
+            'commit': current_commit(),
+            'base_url': options['base_url'],
+            'customers': len(journeys),
+            'accounts': len(accounts),
+            'concurrency': options['concurrency'],
+            'seconds': round(elapsed, 2),
+            'journeys': {
+                'completed': completed,
+                'failed': len(journeys) - completed,
+                'throughput_per_second': round(completed / elapsed, 2),
+            },
+            # The PayPal stub is not a request to the server.
+            'requests': summarize([duration for step, durations in stats.durations.items() if step != 'paypal_stub'
+                                   for duration in durations]),
+            'steps': stats.report(elapsed),
+            'lock_contention': monitor.report() if monitor else None,
+            'error_samples': stats.error_samples,
+        }
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                file.write(output)
+        else:
+            self.stdout.write(output)
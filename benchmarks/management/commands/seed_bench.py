@@ -0,0 +1,51 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from benchmarks.seed import MarketplaceSeeder
+
+
+class Command(BaseCommand):
+    help = ('Bulk-generate a synthetic marketplace for benchmarks: customers, vendors with geo-distributed '
+            'profiles, opening hours, categories, food items, carts and historical orders. '
+            'All users are named <prefix>-customer-N / <prefix>-vendor-N and share the password "bench-password".')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--customers', type=int, default=1000)
+        parser.add_argument('--vendors', type=int, default=100)
+        parser.add_argument('--categories', type=int, default=4, help='Categories per vendor.')
+        parser.add_argument('--items', type=int, default=8, help='Food items per category.')
+        parser.add_argument('--cart-items', type=int, default=3, help='Cart lines per customer.')
+        parser.add_argument('--orders', type=int, default=5, help='Historical orders per customer.')
+        parser.add_argument('--history-days', type=int, default=365, help='Spread orders over this many days.')
+        parser.add_argument('--center', default='40.4168,-3.7038', help='lat,lng the vendors are spread around.')
+        parser.add_argument('--spread-km', type=float, default=50)
+        parser.add_argument('--seed', type=int, default=0, help='Random seed, the same seed gives the same data.')
+        parser.add_argument('--prefix', default='bench', help='Username/slug prefix of the generated rows.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--flush', action='store_true', help='Delete rows of a previous run with this prefix.')
+
+    def handle(self, *args, **options):
+        try:
+            center = tuple(float(value) for value in options['center'].split(','))
+        except ValueError:
+            center = ()
+        if len(center) != 2:
+            raise CommandError('--center must be "lat,lng"')
+
+        seeder = MarketplaceSeeder(
+            prefix=options['prefix'], customers=options['customers'], vendors=options['vendors'],
+            categories=options['categories'], items=options['items'], cart_items=options['cart_items'],
+            orders=options['orders'], history_days=options['history_days'], center=center,
+            spread_km=options['spread_km'], seed=options['seed'], batch_size=options['batch_size'],
+        )
+        started = time.perf_counter()
+        with transaction.atomic():
+            if options['flush']:
+                deleted = seeder.flush()
+                self.stderr.write(f'Deleted {deleted} rows of the previous "{options["prefix"]}" run.')
+            counts = seeder.run()
+        counts['seconds'] = round(time.perf_counter() - started, 2)
+        self.stdout.write(json.dumps(counts, indent=2))
@@ -0,0 +1,217 @@
+import math
+import random
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import simplejson as json
+from django.contrib.auth.hashers import make_password
+from django.contrib.gis.geos import Point
+from django.db.models.expressions import RawSQL
+
+from accounts.models import User, UserProfile
+from catalog.models import Category, FoodItem
+from marketplace.models import Cart, Tax
+from orders.models import Order, OrderedProduct, Payment
+from vendor.models import HOUR_OF_DAY_24, OpeningHour, Vendor
+
+BENCH_PASSWORD = 'bench-password'
+KM_PER_DEGREE = 111.32
+DISHES = ['Pizza', 'Burger', 'Paella', 'Tacos', 'Sushi', 'Salad', 'Curry', 'Noodles', 'Tortilla', 'Ramen']
+CITIES = ['Madrid', 'Getafe', 'Alcorcon', 'Mostoles', 'Leganes', 'Alcobendas']
+HOURS = [hour for hour, _ in HOUR_OF_DAY_24]
+
+
+def random_location(rng, center, spread_km):
+    """Uniformly distributed (lat, lng) within spread_km of center."""
+    distance = spread_km * math.sqrt(rng.random())
+    bearing = rng.uniform(0, 2 * math.pi)
+    lat = center[0] + distance * math.cos(bearing) / KM_PER_DEGREE
+    lng = center[1] + distance * math.sin(bearing) / (KM_PER_DEGREE * math.cos(math.radians(center[0])))
+    return round(lat, 6), round(lng, 6)
+
+
+class MarketplaceSeeder:
+    """Bulk-create a synthetic marketplace: customers and vendors with located profiles, opening hours,
+    categories, food items, carts and a paid order history. All rows are named after prefix so a later
+    run can remove them with flush()."""
+
+    def __init__(self, prefix='bench', customers=1000, vendors=100, categories=4, items=8, cart_items=3,
+                 orders=5, history_days=365, center=(40.4168, -3.7038), spread_km=50, seed=0, batch_size=1000):
+        self.prefix = prefix
+        self.customers = customers
+        self.vendors = vendors
+        self.categories = categories
+        self.items = items
+        self.cart_items = cart_items
+        self.orders = orders
+        self.history_days = history_days
+        self.center = center
+        self.spread_km = spread_km
+        self.batch_size = batch_size
+        self.rng = random.Random(seed)
+        # Hashing once keeps user creation from being dominated by the password hasher.
+        self.password = make_password(BENCH_PASSWORD)
+
+    def bulk_create(self, model, objs):
+        return model.objects.bulk_create(objs, batch_size=self.batch_size)
+
+    def flush(self):
+        """Delete everything created by previous runs with the same prefix."""
+        users = User.objects.filter(username__startswith=f'{self.prefix}-')
+        # Orders keep their rows when the user goes away (SET_NULL), remove them explicitly.
+        Order.objects.filter(user__in=users).delete()
+        return users.delete()[0]
+
+    def run(self):
+        taxes = list(Tax.objects.filter(is_active=True))
+        if not taxes:
+            taxes = [Tax.objects.create(tax_type='VAT', tax_percentage=Decimal('21.00'), is_active=True)]
+
+        customers = self.create_users(User.CUSTOMER, 'customer', self.customers)
+        vendor_users = self.create_users(User.VENDOR, 'vendor', self.vendors)
+        vendors = self.create_vendors(vendor_users)
+        hours = self.create_opening_hours(vendors)
+        items = self.create_catalog(vendors)
+        carts = self.create_carts(customers, items)
+        orders = self.create_orders(customers, items, taxes)
+        return {
+            'customers': len(customers),
+            'vendors': len(vendors),
+            'opening_hours': hours,
+            'food_items': sum(len(vendor_items) for vendor_items in items.values()),
+            'cart_items': carts,
+            'orders': orders,
+        }
+
+    def create_users(self, role, label, count):
+        """Users with the given role and their located profiles. bulk_create skips the post_save signal,
+        so the profiles are created here as well."""
+        users = self.bulk_create(User, [
+            User(first_name=label.title(), last_name=str(index), username=f'{self.prefix}-{label}-{index}',
+                 email=f'{self.prefix}-{label}-{index}@example.com', role=role, is_active=True,
+                 password=self.password)
+            for index in range(count)
+        ])
+        profiles = []
+        for user in users:
+            lat, lng = random_location(self.rng, self.center, self.spread_km)
+            profiles.append(UserProfile(
+                user=user, address=f'Calle {self.rng.randint(1, 200)}', country='Spain', state='Madrid',
+                city=self.rng.choice(CITIES), pin_code=f'28{self.rng.randint(0, 999):03d}',
+                latitude=str(lat), longitude=str(lng), location=Point(lng, lat, srid=4326),
+            ))
+        for user, profile in zip(users, self.bulk_create(UserProfile, profiles)):
+            user.profile = profile
+        return users
+
+    def create_vendors(self, users):
+        return self.bulk_create(Vendor, [
+            Vendor(user=user, user_profile=user.profile, vendor_name=f'{self.rng.choice(DISHES)} House {index}',
+                   vendor_slug=f'{self.prefix}-vendor-{index}', vendor_license='vendor/license/bench.pdf',
+                   is_approved=self.rng.random() < 0.95)
+            for index, user in enumerate(users)
+        ])
+
+    def create_opening_hours(self, vendors):
+        """A lunch and a dinner slot per day, with one random day closed."""
+        hours = []
+        for vendor in vendors:
+            closed_day = self.rng.randint(1, 7)
+            for day in range(1, 8):
+                if day == closed_day:
+                    hours.append(OpeningHour(vendor=vendor, day=day, is_closed=True))
+                    continue
+                lunch = self.rng.randint(HOURS.index('11:00 AM'), HOURS.index('01:00 PM'))
+                dinner = self.rng.randint(HOURS.index('07:00 PM'), HOURS.index('08:30 PM'))
+                hours.append(OpeningHour(vendor=vendor, day=day, from_hour=HOURS[lunch], to_hour=HOURS[lunch + 8]))
+                hours.append(OpeningHour(vendor=vendor, day=day, from_hour=HOURS[dinner],
+                                         to_hour=HOURS[min(dinner + 7, len(HOURS) - 1)]))
+        return len(self.bulk_create(OpeningHour, hours))
+
+    def create_catalog(self, vendors):
+        """Categories and food items per vendor. Returns {vendor id: [food items]}."""
+        categories = self.bulk_create(Category, [
+            Category(vendor=vendor, category_name=f'{self.rng.choice(DISHES)} {index}',
+                     slug=f'{self.prefix}-category-{vendor.pk}-{index}')
+            for vendor in vendors for index in range(self.categories)
+        ])
+        food_items = self.bulk_create(FoodItem, [
+            FoodItem(vendor_id=category.vendor_id, category=category,
+                     food_title=f'{self.rng.choice(DISHES)} {category.pk}-{index}',
+                     slug=f'{self.prefix}-food-{category.pk}-{index}', description='Synthetic benchmark item',
+                     price=Decimal(self.rng.randint(300, 3000)) / 100, image='food_images/bench.jpg',
+                     is_available=self.rng.random() < 0.9)
+            for category in categories for index in range(self.items)
+        ])
+        items = {vendor.pk: [] for vendor in vendors}
+        for item in food_items:
+            items[item.vendor_id].append(item)
+        return items
+
+    def create_carts(self, customers, items):
+        """Open carts with items from one or two vendors, like a customer mid-checkout."""
+        vendor_ids = [vendor_id for vendor_id, vendor_items in items.items() if vendor_items]
+        carts = []
+        for customer in customers:
+            candidates = [item for vendor_id in self.rng.sample(vendor_ids, min(2, len(vendor_ids)))
+                          for item in items[vendor_id]]
+            for item in self.rng.sample(candidates, min(self.cart_items, len(candidates))):
+                carts.append(Cart(user=customer, product_item=item, quantity=self.rng.randint(1, 3)))
+        return len(self.bulk_create(Cart, carts))
+
+    def create_orders(self, customers, items, taxes):
+        """Paid single-vendor orders with total_data/tax_data in the format place_order stores, spread over
+        the last history_days days."""
+        vendor_ids = [vendor_id for vendor_id, vendor_items in items.items() if vendor_items]
+        started = datetime.now().strftime('%Y%m%d%H%M%S')
+        payments, orders, lines = [], [], []
+        for customer in customers:
+            for _ in range(self.orders):
+                number = len(orders)
+                vendor_id = self.rng.choice(vendor_ids)
+                chosen = self.rng.sample(items[vendor_id], min(self.rng.randint(1, 4), len(items[vendor_id])))
+                quantities = [self.rng.randint(1, 3) for _ in chosen]
+                subtotal = sum(item.price * quantity for item, quantity in zip(chosen, quantities))
+                tax_dict = {
+                    tax.tax_type: {str(tax.tax_percentage): round(tax.tax_percentage * subtotal / 100, 2)}
+                    for tax in taxes
+                }
+                total_tax = sum(amount for rates in tax_dict.values() for amount in rates.values())
+                vendor_taxes = {tax_type: {rate: str(amount) for rate, amount in rates.items()}
+                                for tax_type, rates in tax_dict.items()}
+                payment = Payment(user=customer, transaction_id=f'{self.prefix.upper()}-{started}-{number}',
+                                  payment_method='PayPal', amount=str(subtotal + total_tax), status='COMPLETED')
+                profile = customer.profile
+                payments.append(payment)
+                orders.append(Order(
+                    user=customer, payment=payment, order_number=f'{started}{number}',
+                    first_name=customer.first_name, last_name=customer.last_name, email=customer.email,
+                    address=profile.address, country=profile.country, state=profile.state, city=profile.city,
+                    pin_code=profile.pin_code, total=float(subtotal + total_tax), total_tax=float(total_tax),
+                    tax_data=json.dumps(tax_dict),
+                    total_data=json.dumps({vendor_id: {str(subtotal): str(vendor_taxes)}}),
+                    payment_method='PayPal', status=self.rng.choice(['New', 'Accepted', 'Completed']),
+                    is_ordered=True,
+                ))
+                lines.append((vendor_id, chosen, quantities))
+
+        self.bulk_create(Payment, payments)
+        # bulk_create fills payment_id from the payments saved above.
+        self.bulk_create(Order, orders)
+
+        order_vendors, ordered_products = [], []
+        for order, (vendor_id, chosen, quantities) in zip(orders, lines):
+            order_vendors.append(Order.vendors.through(order_id=order.pk, vendor_id=vendor_id))
+            for item, quantity in zip(chosen, quantities):
+                ordered_products.append(OrderedProduct(
+                    order=order, payment=order.payment, user_id=order.user_id, product_item=item,
+                    quantity=quantity, price=float(item.price), amount=float(item.price * quantity),
+                ))
+        self.bulk_create(Order.vendors.through, order_vendors)
+        self.bulk_create(OrderedProduct, ordered_products)
+
+        # auto_now_add overwrites created_at on insert, so the history is spread out afterwards.
+        Order.objects.filter(pk__in=[order.pk for order in orders]).update(
+            created_at=RawSQL('now() - random() * %s', (timedelta(days=self.history_days),))
+        )
+        return len(orders)
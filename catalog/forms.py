@@ -1,7 +1,15 @@
+from decimal import ROUND_HALF_UP, Decimal
+
 from django import forms
+from django.core.exceptions import ValidationError
+from django.core.validators import FileExtensionValidator
+from django.db.models import DecimalField, F, Max
+from django.db.models.functions import Cast
 
 from accounts.validators import allow_only_images_validator
+from catalog.menu import MENU_FORMATS
 from catalog.models import Category, FoodItem
+from vendor.models import bump_catalog_version
 
 
 class CategoryForm(forms.ModelForm):
@@ -17,3 +25,100 @@ class FoodItemForm(forms.ModelForm):
     class Meta:
         model = FoodItem
         fields = ['category', 'food_title', 'description', 'price', 'image', 'is_available']
+
+
+class MenuImportForm(forms.Form):
+    menu_file = forms.FileField(widget=forms.FileInput(attrs={'class': 'btn btn-info w-100'}),
+                                validators=[FileExtensionValidator(MENU_FORMATS)])
+    images = forms.FileField(required=False, widget=forms.FileInput(attrs={'class': 'btn btn-info w-100'}),
+                             validators=[FileExtensionValidator(['zip'])])
+
+
+class ItemIdsField(forms.Field):
+    """List of ids posted as repeated values, e.g. one checkbox per item."""
+    widget = forms.MultipleHiddenInput
+
+    def to_python(self, value):
+        try:
+            return sorted({int(item_id) for item_id in value or []})
+        except (TypeError, ValueError):
+            raise ValidationError('Invalid product item selection.')
+
+    def validate(self, value):
+        if self.required and not value:
+            raise ValidationError('Select at least one product item.')
+
+
+class FoodItemBulkForm(forms.Form):
+    """Apply one change to many of the vendor's food items in a single UPDATE."""
+
+    MAKE_AVAILABLE = 'make_available'
+    MAKE_UNAVAILABLE = 'make_unavailable'
+    ADJUST_PRICE = 'adjust_price'
+    MOVE = 'move'
+    ACTIONS = (
+        (MAKE_AVAILABLE, 'Mark available'),
+        (MAKE_UNAVAILABLE, 'Mark not available'),
+        (ADJUST_PRICE, 'Change price by %'),
+        (MOVE, 'Move to category'),
+    )
+
+    items = ItemIdsField()
+    action = forms.ChoiceField(choices=ACTIONS)
+    percent = forms.DecimalField(required=False, min_value=-90, max_value=1000, decimal_places=2)
+    category = forms.ModelChoiceField(queryset=Category.objects.none(), required=False)
+
+    def __init__(self, *args, vendor, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.vendor = vendor
+        self.fields['category'].queryset = Category.objects.filter(vendor=vendor)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        action = cleaned_data.get('action')
+        if action == self.ADJUST_PRICE:
+            if cleaned_data.get('percent') is None:
+                self.add_error('percent', 'Enter the price change in percent.')
+            elif cleaned_data.get('items'):
+                self.validate_price_limit(cleaned_data)
+        if action == self.MOVE and cleaned_data.get('category') is None:
+            self.add_error('category', 'Choose the category to move the product items to.')
+        return cleaned_data
+
+    @staticmethod
+    def price_factor(percent):
+        return (Decimal(100) + percent) / Decimal(100)
+
+    def validate_price_limit(self, cleaned_data):
+        """The highest selected price after the change must fit the price column, or the UPDATE fails."""
+        highest = FoodItem.objects.filter(vendor=self.vendor, id__in=cleaned_data['items']).aggregate(
+            highest=Max('price'))['highest']
+        if highest is None:
+            return
+        price_field = FoodItem._meta.get_field('price')
+        cent = Decimal(1).scaleb(-price_field.decimal_places)
+        limit = Decimal(10) ** (price_field.max_digits - price_field.decimal_places) - cent
+        new_highest = (highest * self.price_factor(cleaned_data['percent'])).quantize(cent, ROUND_HALF_UP)
+        if new_highest > limit:
+            self.add_error('percent', f'The change would raise a price to {new_highest}, above the maximum of {limit}.')
+
+    def get_changes(self):
+        action = self.cleaned_data['action']
+        if action == self.ADJUST_PRICE:
+            factor = self.price_factor(self.cleaned_data['percent'])
+            # The cast to the column type rounds to cents.
+            price_field = FoodItem._meta.get_field('price')
+            return {'price': Cast(F('price') * factor, DecimalField(max_digits=price_field.max_digits,
+                                                                    decimal_places=price_field.decimal_places))}
+        if action == self.MOVE:
+            return {'category': self.cleaned_data['category']}
+        return {'is_available': action == self.MAKE_AVAILABLE}
+
+    def save(self):
+        """Update the selected items of the vendor and bump its catalog version. Returns the number of items updated."""
+        updated = FoodItem.objects.filter(vendor=self.vendor, id__in=self.cleaned_data['items']).update(
+            **self.get_changes()
+        )
+        if updated:
+            bump_catalog_version([self.vendor.pk])
+        return updated
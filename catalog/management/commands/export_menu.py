@@ -0,0 +1,23 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from catalog.management.commands.import_menu import resolve_vendor
+from catalog.menu import MENU_FORMATS, iter_menu
+
+
+class Command(BaseCommand):
+    help = 'Write the categories and food items of a vendor as a CSV or JSON menu that import_menu reads back.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('vendor', help='Vendor id or slug.')
+        parser.add_argument('--format', choices=MENU_FORMATS, default='csv')
+        parser.add_argument('--output', help='File to write to. Defaults to stdout.')
+
+    def handle(self, *args, **options):
+        chunks = iter_menu(resolve_vendor(options['vendor']), options['format'])
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as output:
+                output.writelines(chunks)
+        else:
+            sys.stdout.writelines(chunks)
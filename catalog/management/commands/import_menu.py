@@ -0,0 +1,49 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from catalog.menu import MENU_FORMATS, ImageSource, MenuImportError, guess_format, import_menu, read_menu
+from vendor.models import Vendor
+
+
+class Command(BaseCommand):
+    help = ('Import categories and food items for a vendor from a CSV or JSON menu file, in the format written by '
+            'export_menu. Existing items are matched by category and title and updated.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('vendor', help='Vendor id or slug.')
+        parser.add_argument('menu_file', help='CSV or JSON menu file.')
+        parser.add_argument('--format', choices=MENU_FORMATS, help='Defaults to the file extension.')
+        parser.add_argument('--images-dir', help='Directory the image names in the menu are relative to.')
+        parser.add_argument('--images-zip', help='ZIP archive holding the images named in the menu.')
+        parser.add_argument('--workers', type=int, default=settings.MENU_IMPORT_WORKERS,
+                            help='Threads storing images and building their variants.')
+
+    def handle(self, *args, **options):
+        vendor = resolve_vendor(options['vendor'])
+        started = time.perf_counter()
+        try:
+            with open(options['menu_file'], encoding='utf-8-sig') as menu_file:
+                rows = read_menu(menu_file, options['format'] or guess_format(options['menu_file']))
+            image_source = ImageSource(archive=options['images_zip'], directory=options['images_dir'])
+            result = import_menu(vendor, rows, image_source, workers=options['workers'])
+        except MenuImportError as exc:
+            raise CommandError('Nothing was imported:\n' + '\n'.join(exc.errors))
+        except OSError as exc:
+            raise CommandError(exc)
+
+        self.stdout.write(self.style.SUCCESS(
+            'Imported {rows} rows in {seconds:.2f}s: {categories_created} categories created, {categories_updated} '
+            'updated; {items_created} food items created, {items_updated} updated.'.format(
+                rows=len(rows), seconds=time.perf_counter() - started, **result)
+        ))
+
+
+def resolve_vendor(value):
+    """Return the vendor with the given id or slug."""
+    lookup = {'pk': value} if value.isdigit() else {'vendor_slug': value}
+    try:
+        return Vendor.objects.get(**lookup)
+    except Vendor.DoesNotExist:
+        raise CommandError(f'Vendor "{value}" does not exist')
@@ -0,0 +1,86 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from accounts.models import UserProfile
+from catalog.models import FoodItem
+from CoreRoot.images import build_variants, record_image_variants
+from vendor.models import bump_catalog_version
+
+MODELS = {
+    'fooditem': FoodItem,
+    'userprofile': UserProfile,
+}
+
+
+def _build(model_name, pk, field_name, source_name, sizes):
+    """Worker entry point: generate the variants of one image file."""
+    return model_name, pk, field_name, source_name, build_variants(source_name, sizes)
+
+
+class Command(BaseCommand):
+    help = 'Generate the JPEG/WebP variants of existing food item and profile images in parallel.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', choices=sorted(MODELS), action='append',
+                            help='Limit to a model. Can be passed more than once.')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--missing-only', action='store_true',
+                            help='Skip images that already have variants.')
+
+    def handle(self, *args, **options):
+        model_names = options['model'] or sorted(MODELS)
+        jobs = list(self.collect_jobs(model_names, options['missing_only']))
+        if not jobs:
+            self.stdout.write('Nothing to do.')
+            return
+
+        # Forked workers must not share the parent's database connections.
+        connections.close_all()
+
+        results = {}
+        failed = 0
+        with ProcessPoolExecutor(max_workers=options['workers']) as executor:
+            futures = [executor.submit(_build, *job) for job in jobs]
+            for future in as_completed(futures):
+                try:
+                    model_name, pk, field_name, source_name, variants = future.result()
+                except Exception as exc:
+                    failed += 1
+                    self.stderr.write(f'Failed: {exc}')
+                    continue
+                sources, built = results.setdefault((model_name, pk), ({}, {}))
+                sources[field_name] = source_name
+                built[field_name] = variants
+
+        for (model_name, pk), (sources, built) in results.items():
+            self.save_variants(MODELS[model_name], pk, sources, built)
+
+        self.stdout.write(self.style.SUCCESS(f'Generated variants for {len(jobs) - failed} images ({failed} failed).'))
+
+    @staticmethod
+    def collect_jobs(model_names, missing_only):
+        """Yield (model name, pk, field name, source name, sizes) for every stored image."""
+        for model_name in model_names:
+            model = MODELS[model_name]
+            field_names = list(model.IMAGE_VARIANTS)
+            rows = model.objects.values_list('pk', 'image_variants', *field_names).iterator()
+            for pk, image_variants, *names in rows:
+                for field_name, source_name in zip(field_names, names):
+                    if not source_name or (missing_only and field_name in (image_variants or {})):
+                        continue
+                    yield model_name, pk, field_name, source_name, model.IMAGE_VARIANTS[field_name]
+
+    @staticmethod
+    def save_variants(model, pk, sources, built):
+        """Record the generated variants, unless the image was replaced while they were built, and drop
+        the cached copies of the row."""
+        if record_image_variants(model, pk, sources, built) is None:
+            return
+        if model is UserProfile:
+            UserProfile.objects.invalidate(model.objects.filter(pk=pk).values_list('user_id', flat=True))
+        else:
+            # Cached menus link to the variants that were just replaced.
+            bump_catalog_version(model.objects.filter(pk=pk).values_list('vendor_id', flat=True))
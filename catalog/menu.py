@@ -0,0 +1,325 @@
+import csv
+import io
+import os
+import posixpath
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal, InvalidOperation
+from functools import partial
+
+import simplejson as json
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.template.defaultfilters import slugify
+
+from catalog.models import Category, FoodItem
+from CoreRoot.images import build_variants, delete_variants
+from orders.exports import Echo
+from vendor.models import bump_catalog_version
+
+MENU_FORMATS = ('csv', 'json')
+# One row per food item. A row with an empty food_title only declares its category.
+MENU_COLUMNS = ('category', 'category_description', 'food_title', 'description', 'price', 'is_available', 'image')
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+TRUE_VALUES = ('1', 'true', 'yes', 'y')
+FALSE_VALUES = ('0', 'false', 'no', 'n')
+
+
+class MenuImportError(Exception):
+    """The menu file is invalid. Nothing was imported, `errors` lists the problems by row."""
+
+    def __init__(self, errors):
+        super().__init__('; '.join(errors))
+        self.errors = errors
+
+
+def allocate_ids(model, count):
+    """Reserve count primary keys from the model's sequence, so slugs containing the id can be set before
+    the rows are inserted, in a single bulk_create() instead of an INSERT and an UPDATE per row."""
+    if not count:
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT nextval(pg_get_serial_sequence(%s, %s)) FROM generate_series(1, %s)',
+            [model._meta.db_table, model._meta.pk.column, count],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def make_slug(title, pk):
+    return f'{slugify(title)}-{pk}'
+
+
+def guess_format(filename):
+    extension = os.path.splitext(filename or '')[1].lower().lstrip('.')
+    return extension if extension in MENU_FORMATS else 'csv'
+
+
+def read_menu(file, menu_format):
+    """Rows of a CSV or JSON (a list of objects) menu file as dicts of stripped strings."""
+    data = file.read()
+    try:
+        if isinstance(data, bytes):
+            data = data.decode('utf-8-sig')
+        if menu_format == 'json':
+            rows = json.loads(data)
+            if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+                raise MenuImportError(['The JSON menu must be a list of objects.'])
+        else:
+            rows = list(csv.DictReader(io.StringIO(data)))
+    except UnicodeDecodeError:
+        raise MenuImportError(['The menu must be UTF-8 encoded, save it as "CSV UTF-8" in Excel.'])
+    except (ValueError, csv.Error) as exc:
+        raise MenuImportError([f'Could not read the menu: {exc}'])
+    return [
+        {column: '' if row.get(column) is None else str(row[column]).strip() for column in MENU_COLUMNS}
+        for row in rows
+    ]
+
+
+def clean_row(row):
+    """Validate and convert a row in place. Returns the list of errors."""
+    errors = []
+    row['category'] = row['category'].capitalize()
+    if not row['category']:
+        errors.append('category is required')
+    elif len(row['category']) > Category._meta.get_field('category_name').max_length:
+        errors.append('category is too long')
+    if len(row['category_description']) > Category._meta.get_field('description').max_length:
+        errors.append('category_description is too long')
+    if not row['food_title']:
+        return errors
+
+    if len(row['food_title']) > FoodItem._meta.get_field('food_title').max_length:
+        errors.append('food_title is too long')
+    if len(row['description']) > FoodItem._meta.get_field('description').max_length:
+        errors.append('description is too long')
+    try:
+        row['price'] = Decimal(row['price']).quantize(Decimal('0.01'))
+        if row['price'] < 0 or row['price'] >= 10 ** 8:
+            raise InvalidOperation
+    except (InvalidOperation, ValueError):
+        errors.append(f'invalid price "{row["price"]}"')
+    available = row['is_available'].lower()
+    if available not in TRUE_VALUES + FALSE_VALUES + ('',):
+        errors.append(f'invalid is_available "{row["is_available"]}"')
+    row['is_available'] = available not in FALSE_VALUES
+    if row['image'] and os.path.splitext(row['image'])[1].lower() not in IMAGE_EXTENSIONS:
+        errors.append(f'unsupported image "{row["image"]}", allowed: {", ".join(IMAGE_EXTENSIONS)}')
+    return errors
+
+
+class ImageSource:
+    """Looks up the image files named in a menu, in an uploaded ZIP archive or a local directory.
+    Items whose image name did not change keep their stored file and are not looked up."""
+
+    def __init__(self, archive=None, directory=None):
+        self.archive = zipfile.ZipFile(archive) if archive else None
+        self.directory = directory
+        self.names = {posixpath.basename(name): name for name in self.archive.namelist()} if self.archive else {}
+
+    def read(self, name):
+        if self.archive and posixpath.basename(name) in self.names:
+            return self.archive.read(self.names[posixpath.basename(name)])
+        if self.directory:
+            path = os.path.join(self.directory, name)
+            if os.path.isfile(path):
+                with open(path, 'rb') as file:
+                    return file.read()
+        raise FileNotFoundError(f'image "{name}" not found')
+
+
+def process_image(name, content):
+    """Store an image and build its variants, runs in the worker pool. Returns (storage name, image_variants)."""
+    upload_to = FoodItem._meta.get_field('image').upload_to
+    name = default_storage.save(posixpath.join(upload_to, posixpath.basename(name)), ContentFile(content))
+    try:
+        return name, {'image': build_variants(name, FoodItem.IMAGE_VARIANTS['image'])}
+    except Exception:
+        default_storage.delete(name)
+        raise
+
+
+def process_images(jobs, image_source, workers):
+    """Store and build the variants of {row number: image name} in parallel, one copy per row so no two items
+    share a file that saving one of them would delete. Returns {row number: process_image() result}.
+    Raises MenuImportError, after removing the files it stored, when any image cannot be processed."""
+    errors = []
+    contents = {}
+    for number, name in jobs.items():
+        if name in contents:
+            continue
+        try:
+            contents[name] = image_source.read(name)
+        except (FileNotFoundError, KeyError, OSError) as exc:
+            errors.append(f'row {number}: {exc}')
+    if errors:
+        raise MenuImportError(errors)
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {number: executor.submit(process_image, name, contents[name]) for number, name in jobs.items()}
+        for number, future in futures.items():
+            try:
+                results[number] = future.result()
+            except Exception as exc:
+                errors.append(f'row {number}: image "{jobs[number]}" could not be processed: {exc}')
+    if errors:
+        discard_images(results)
+        raise MenuImportError(errors)
+    return results
+
+
+def discard_images(images):
+    """Delete the files process_images() stored."""
+    for name, image_variants in images.values():
+        delete_variants(image_variants['image'])
+        default_storage.delete(name)
+
+
+def import_menu(vendor, rows, image_source=None, workers=None):
+    """Create or update the vendor's categories and food items from menu rows, in one transaction.
+
+    Categories are matched by name, case-insensitively, and food items by category and title. New rows get
+    pre-allocated ids and are inserted with bulk_create(), updates go through bulk_update(). Images are stored
+    and their variants built in a pool of MENU_IMPORT_WORKERS threads before the transaction starts.
+    Returns counts of what was created and updated, raises MenuImportError without importing anything."""
+    errors = []
+    for number, row in enumerate(rows, start=1):
+        errors.extend(f'row {number}: {error}' for error in clean_row(row))
+    if not rows:
+        errors.append('the menu is empty')
+    if errors:
+        raise MenuImportError(errors)
+
+    categories = {category.category_name.lower(): category for category in Category.objects.filter(vendor=vendor)}
+    items = {
+        (item.category_id, item.food_title): item
+        for item in FoodItem.objects.filter(vendor=vendor).only('id', 'category', 'food_title', 'image',
+                                                              'image_variants')
+    }
+
+    # Only new images are processed, an unchanged image name keeps the stored file and its variants.
+    category_keys = {category.pk: key for key, category in categories.items()}
+    existing_images = {
+        (category_keys[category_id], title): item.image.name for (category_id, title), item in items.items()
+    }
+    jobs = {}
+    for number, row in enumerate(rows, start=1):
+        if not row['food_title']:
+            continue
+        existing_image = existing_images.get((row['category'].lower(), row['food_title']))
+        if not row['image'] and existing_image is None:
+            errors.append(f'row {number}: image is required for new items')
+        elif row['image'] and row['image'] != existing_image:
+            jobs[number] = row['image']
+    if errors:
+        raise MenuImportError(errors)
+    images = process_images(jobs, image_source or ImageSource(), workers or settings.MENU_IMPORT_WORKERS)
+
+    try:
+        with transaction.atomic():
+            return _save_menu(vendor, rows, categories, items, images)
+    except Exception:
+        discard_images(images)
+        raise
+
+
+def _save_menu(vendor, rows, categories, items, images):
+    new_categories = {}
+    updated_categories = {}
+    for row in rows:
+        key = row['category'].lower()
+        category = categories.get(key) or new_categories.get(key)
+        if category is None:
+            new_categories[key] = Category(vendor=vendor, category_name=row['category'],
+                                           description=row['category_description'])
+        elif row['category_description'] and category.description != row['category_description']:
+            category.description = row['category_description']
+            if category.pk:
+                updated_categories[category.pk] = category
+
+    for category, pk in zip(new_categories.values(), allocate_ids(Category, len(new_categories))):
+        category.pk = pk
+        category.slug = make_slug(category.category_name, pk)
+    Category.objects.bulk_create(new_categories.values())
+    Category.objects.bulk_update(updated_categories.values(), ['description'])
+    categories.update(new_categories)
+
+    new_items = {}
+    updated_items = {}
+    replaced_images = []
+    for number, row in enumerate(rows, start=1):
+        if not row['food_title']:
+            continue
+        category = categories[row['category'].lower()]
+        key = (category.pk, row['food_title'])
+        item = items.get(key) or new_items.get(key)
+        if item is None:
+            item = new_items[key] = FoodItem(vendor=vendor, category=category, food_title=row['food_title'])
+        elif item.pk:
+            updated_items[key] = item
+        item.description = row['description']
+        item.price = row['price']
+        item.is_available = row['is_available']
+        if number in images:
+            if item.image and item.image.name not in {name for name, _ in images.values()}:
+                replaced_images.append((item.image.name, item.image_variants.get('image', {})))
+            item.image, item.image_variants = images[number]
+
+    for item, pk in zip(new_items.values(), allocate_ids(FoodItem, len(new_items))):
+        item.pk = pk
+        item.slug = make_slug(item.food_title, pk)
+    FoodItem.objects.bulk_create(new_items.values())
+    FoodItem.objects.bulk_update(updated_items.values(),
+                                 ['description', 'price', 'is_available', 'image', 'image_variants'])
+
+    bump_catalog_version([vendor.pk])
+
+    # bulk_update() bypasses FoodItem.save(), so replaced files are deleted here, as save() does on commit.
+    for name, image_variants in replaced_images:
+        transaction.on_commit(partial(default_storage.delete, name))
+        transaction.on_commit(partial(delete_variants, image_variants))
+
+    return {
+        'categories_created': len(new_categories),
+        'categories_updated': len(updated_categories),
+        'items_created': len(new_items),
+        'items_updated': len(updated_items),
+    }
+
+
+def get_menu_rows(vendor):
+    """Menu rows of the vendor in MENU_COLUMNS order: its items by category, then empty categories."""
+    rows = FoodItem.objects.filter(vendor=vendor).order_by('category__category_name', 'food_title').values_list(
+        'category__category_name', 'category__description', 'food_title', 'description', 'price', 'is_available',
+        'image',
+    )
+    yield from rows
+    for name, description in Category.objects.filter(vendor=vendor, food_items__isnull=True).order_by(
+            'category_name').values_list('category_name', 'description'):
+        yield name, description, '', '', '', '', ''
+
+
+def iter_menu(vendor, menu_format):
+    """Return a generator over the vendor's menu in the import format."""
+    if menu_format == 'json':
+        return _iter_json(get_menu_rows(vendor))
+    return _iter_csv(get_menu_rows(vendor))
+
+
+def _iter_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(MENU_COLUMNS)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def _iter_json(rows):
+    yield '['
+    for index, row in enumerate(rows):
+        yield (',\n' if index else '\n') + json.dumps(dict(zip(MENU_COLUMNS, row)), cls=DjangoJSONEncoder)
+    yield '\n]\n'
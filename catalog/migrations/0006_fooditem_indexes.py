@@ -0,0 +1,21 @@
+# Generated by Django 3.2.19 on 2026-10-19 11:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0005_fooditem_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='fooditem',
+            index=models.Index(fields=['vendor', 'is_available'], name='fooditem_vendor_available_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fooditem',
+            index=models.Index(fields=['category', 'is_available'], name='fooditem_category_avail_idx'),
+        ),
+    ]
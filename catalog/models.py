@@ -1,7 +1,11 @@
+from functools import partial
+
 from django.db import models
 
-from CoreRoot.decorators import delete_old_photo
-from vendor.models import Vendor
+from CoreRoot.decorators import delete_old_files_on_save
+from CoreRoot.images import pending_image_fields, refresh_image_variants
+from CoreRoot.tracking import LoadedValuesMixin
+from vendor.models import Vendor, bump_catalog_version
 
 
 class Category(models.Model):
@@ -23,7 +27,7 @@ class Category(models.Model):
         return self.category_name
 
 
-class FoodItem(models.Model):
+class FoodItem(LoadedValuesMixin, models.Model):
     vendor = models.ForeignKey(Vendor, on_delete=models.CASCADE)
     category = models.ForeignKey(Category, related_name='food_items', on_delete=models.CASCADE)
     food_title = models.CharField(max_length=50)
@@ -31,17 +35,30 @@ class FoodItem(models.Model):
     description = models.TextField(max_length=500, blank=True)
     price = models.DecimalField(max_digits=10, decimal_places=2)
     image = models.ImageField(upload_to='food_images')
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     is_available = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Resized variants generated for each image field, see CoreRoot.images.VARIANT_SIZES.
+    IMAGE_VARIANTS = {
+        'image': ('thumb', 'card'),
+    }
+    tracked_fields = ('image',)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['vendor', 'is_available'], name='fooditem_vendor_available_idx'),
+            models.Index(fields=['category', 'is_available'], name='fooditem_category_avail_idx'),
+        ]
+
     def __str__(self):
         return self.food_title
 
+    @delete_old_files_on_save('image')
     def save(self, *args, **kwargs):
-        """Override the save method for deleting old product image if vendor updated image."""
-        if self.pk:
-            old_instance = FoodItem.objects.get(pk=self.pk)
-            if old_instance.image != self.image:
-                delete_old_photo(old_instance.image.path)
+        """Delete the old product image once a new one is saved, and update the image variants in the background."""
+        pending_images = pending_image_fields(self)
         super().save(*args, **kwargs)
+        # The cached menu is rendered again with the variants.
+        refresh_image_variants(self, pending_images, on_done=partial(bump_catalog_version, [self.vendor_id]))
@@ -0,0 +1,14 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from catalog.models import Category, FoodItem
+from vendor.models import bump_catalog_version
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=FoodItem)
+def post_save_bump_catalog_version(sender, instance, raw=False, **kwargs):
+    """Saving a category or food item changes the vendor's menu. Deletes are not covered: a cascade would
+    bump once per deleted row, the delete views bump once instead."""
+    if not raw:
+        bump_catalog_version([instance.vendor_id])
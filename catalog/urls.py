@@ -1,7 +1,7 @@
 from django.urls import path
 
 from catalog.views import CategoryAddView, CategoryEditView, CategoryDeleteView, ProductAddView, ProductEditView, \
-    product_delete
+    product_delete, ProductBulkUpdateView, MenuImportView, MenuExportView
 
 urlpatterns = [
     # category CRUD
@@ -13,4 +13,9 @@ urlpatterns = [
     path('catalog-builder/product/add/', ProductAddView.as_view(), name='product_add'),
     path('catalog-builder/product/edit/<int:pk>/', ProductEditView.as_view(), name='product_edit'),
     path('catalog-builder/product/delete/<int:pk>/', product_delete, name='product_delete'),
+    path('catalog-builder/product/bulk/', ProductBulkUpdateView.as_view(), name='product_bulk_update'),
+
+    # bulk menu import / export
+    path('catalog-builder/menu/import/', MenuImportView.as_view(), name='menu_import'),
+    path('catalog-builder/menu/export/', MenuExportView.as_view(), name='menu_export'),
 ]
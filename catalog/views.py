@@ -1,14 +1,21 @@
+import zipfile
+
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, get_object_or_404, redirect
-from django.template.defaultfilters import slugify
 from django.urls import reverse_lazy, reverse
-from django.views.generic import CreateView, UpdateView, DeleteView
+from django.utils.http import url_has_allowed_host_and_scheme
+from django.views import View
+from django.views.generic import CreateView, UpdateView, DeleteView, FormView
 
-from catalog.forms import CategoryForm, FoodItemForm
+from catalog.forms import CategoryForm, FoodItemBulkForm, FoodItemForm, MenuImportForm
+from catalog.menu import (MENU_FORMATS, ImageSource, MenuImportError, allocate_ids, guess_format, import_menu,
+                          iter_menu, make_slug, read_menu)
 from catalog.models import Category, FoodItem
 from common.views import VendorUserPassesTestMixin, check_role_vendor
+from vendor.models import bump_catalog_version
 from vendor.views import get_vendor
 
 
@@ -25,11 +32,12 @@ class CategoryAddView(LoginRequiredMixin, VendorUserPassesTestMixin, CreateView)
         """Save the category object after form validation."""
         category = form.save(commit=False)
         category.vendor = get_vendor(self.request)
-        category.save()  # here the category id will be generated
-        category.slug = slugify(category.category_name) + '-' + str(category.id)
-        category.save()
+        # Reserve the id first, so the slug is set in the INSERT instead of a second UPDATE.
+        category.id = allocate_ids(Category, 1)[0]
+        category.slug = make_slug(category.category_name, category.id)
+        category.save(force_insert=True)
         messages.success(self.request, 'Category added successfully!')
-        return super().form_valid(form)
+        return redirect(self.success_url)
 
 
 class CategoryEditView(LoginRequiredMixin, VendorUserPassesTestMixin, UpdateView):
@@ -45,11 +53,10 @@ class CategoryEditView(LoginRequiredMixin, VendorUserPassesTestMixin, UpdateView
         """Save the updated category object after form validation."""
         category = form.save(commit=False)
         category.vendor = get_vendor(self.request)
-        category.save()  # here the category id will be generated
-        category.slug = slugify(category.category_name) + '-' + str(category.id)
-        form.save()
+        category.slug = make_slug(category.category_name, category.id)
+        category.save()
         messages.success(self.request, 'Category updated successfully!')
-        return super().form_valid(form)
+        return redirect(self.success_url)
 
     def get_object(self, queryset=None):
         """Get the category object based on the pk parameter."""
@@ -68,6 +75,7 @@ class CategoryDeleteView(LoginRequiredMixin, VendorUserPassesTestMixin, DeleteVi
         """Delete the category and display success message."""
         category = self.get_object()
         category.delete()
+        bump_catalog_version([category.vendor_id])
         messages.success(request, 'Category has been deleted successfully!')
         return redirect(self.success_url)
 
@@ -97,9 +105,10 @@ class ProductAddView(LoginRequiredMixin, VendorUserPassesTestMixin, CreateView):
         food_title = form.cleaned_data['food_title']
         product = form.save(commit=False)
         product.vendor = get_vendor(self.request)
-        product.save()
-        product.slug = slugify(food_title) + '-' + str(product.id)  # generate unique slug for creating similar products
-        form.save()
+        # generate unique slug for creating similar products, with a reserved id so the row is written once
+        product.id = allocate_ids(FoodItem, 1)[0]
+        product.slug = make_slug(food_title, product.id)
+        product.save(force_insert=True)
         messages.success(self.request, 'Product Item added successfully!')
         category_id = product.category.id
         return redirect(reverse('product_items_by_category', args=[category_id]))
@@ -131,9 +140,8 @@ class ProductEditView(LoginRequiredMixin, VendorUserPassesTestMixin, UpdateView)
         food_title = form.cleaned_data['food_title']
         product = form.save(commit=False)
         product.vendor = get_vendor(self.request)
+        product.slug = make_slug(food_title, product.id)
         product.save()
-        product.slug = slugify(food_title) + '-' + str(product.id)
-        form.save()
         messages.success(self.request, 'Product Item updated successfully!')
         return redirect('product_items_by_category', product.category.id)
 
@@ -149,10 +157,82 @@ class ProductEditView(LoginRequiredMixin, VendorUserPassesTestMixin, UpdateView)
         return context
 
 
+class ProductBulkUpdateView(LoginRequiredMixin, VendorUserPassesTestMixin, View):
+    """Mark many product items available or not, change their price by a percentage or move them to another
+    category, in one UPDATE. Answers AJAX requests with JSON, others with a redirect to `next`."""
+
+    login_url = 'login'
+
+    def post(self, request):
+        form = FoodItemBulkForm(request.POST, vendor=get_vendor(request))
+        is_ajax = request.headers.get('x-requested-with') == 'XMLHttpRequest'
+        if form.is_valid():
+            updated = form.save()
+            if is_ajax:
+                return JsonResponse({'status': 'Success', 'updated': updated})
+            messages.success(request, f'{updated} product items updated.')
+        else:
+            errors = [error for field_errors in form.errors.values() for error in field_errors]
+            if is_ajax:
+                return JsonResponse({'status': 'Failed', 'message': ' '.join(errors)})
+            for error in errors:
+                messages.error(request, error)
+
+        next_url = request.POST.get('next')
+        if not url_has_allowed_host_and_scheme(next_url, allowed_hosts={request.get_host()},
+                                               require_https=request.is_secure()):
+            next_url = reverse('catalog_builder')
+        return redirect(next_url)
+
+
 @login_required(login_url='login')
 @user_passes_test(check_role_vendor)
 def product_delete(request, pk=None):
     product = get_object_or_404(FoodItem, pk=pk)
     product.delete()
+    bump_catalog_version([product.vendor_id])
     messages.success(request, 'Product Item has been deleted successfully!')
     return redirect('product_items_by_category', product.category.id)
+
+
+class MenuImportView(LoginRequiredMixin, VendorUserPassesTestMixin, FormView):
+    """Import categories and product items from a CSV or JSON menu, with an optional ZIP of the images."""
+
+    form_class = MenuImportForm
+    template_name = 'vendor/menu-import.html'
+    success_url = reverse_lazy('catalog_builder')
+    login_url = 'login'
+
+    def form_valid(self, form):
+        menu_file = form.cleaned_data['menu_file']
+        images = form.cleaned_data['images']
+        try:
+            rows = read_menu(menu_file, guess_format(menu_file.name))
+            result = import_menu(get_vendor(self.request), rows, ImageSource(archive=images))
+        except (MenuImportError, zipfile.BadZipFile) as exc:
+            for error in getattr(exc, 'errors', [str(exc)])[:20]:
+                form.add_error(None, error)
+            return self.form_invalid(form)
+        messages.success(self.request, 'Menu imported: {categories_created} categories and {items_created} product '
+                                       'items added, {items_updated} product items updated.'.format(**result))
+        return super().form_valid(form)
+
+
+class MenuExportView(LoginRequiredMixin, VendorUserPassesTestMixin, View):
+    """Download the vendor's menu in the import format, CSV or JSON."""
+
+    login_url = 'login'
+    content_types = {
+        'csv': 'text/csv',
+        'json': 'application/json',
+    }
+
+    def get(self, request):
+        export_format = request.GET.get('format', 'csv')
+        if export_format not in MENU_FORMATS:
+            export_format = 'csv'
+        vendor = get_vendor(request)
+        response = StreamingHttpResponse(iter_menu(vendor, export_format),
+                                         content_type=self.content_types[export_format])
+        response['Content-Disposition'] = f'attachment; filename="menu-{vendor.vendor_slug}.{export_format}"'
+        return response
@@ -80,8 +80,10 @@ class OrderDetailView(LoginRequiredMixin, CustomerUserPassesTestMixin, DetailVie
     def get(self, request, *args, **kwargs):
         """Handle GET requests for the order detail view."""
         try:
-            order = Order.objects.get(order_number=self.kwargs['order_number'], is_ordered=True)
-            ordered_product = OrderedProduct.objects.filter(order=order)
+            order = Order.objects.select_related('payment').get(
+                order_number=self.kwargs['order_number'], is_ordered=True
+            )
+            ordered_product = OrderedProduct.objects.filter(order=order).select_related('product_item__vendor')
 
             # Calculate the subtotal of the ordered products
             subtotal = sum(item.price * item.quantity for item in ordered_product)
@@ -1,10 +1,13 @@
 from django.core.exceptions import ObjectDoesNotExist, MultipleObjectsReturned
 
-from catalog.models import FoodItem
 from marketplace.models import Cart, Tax
 
 
 def get_cart_counter(request):
+    # Priced by the view already, see marketplace.quotes.get_quote().
+    quote = getattr(request, 'cart_quote', None)
+    if quote is not None:
+        return dict(cart_count=quote['cart_count'])
     cart_count = 0
     if request.user.is_authenticated:
         try:
@@ -20,15 +23,18 @@ def get_cart_counter(request):
 
 
 def get_cart_amounts(request):
+    quote = getattr(request, 'cart_quote', None)
+    if quote is not None:
+        return dict(subtotal=quote['subtotal'], tax=quote['tax'], grand_total=quote['grand_total'],
+                    tax_dict=quote['tax_dict'])
     subtotal = 0
     tax = 0
     grand_total = 0
     tax_dict = {}
     if request.user.is_authenticated:
-        cart_items = Cart.objects.filter(user=request.user)
+        cart_items = Cart.objects.filter(user=request.user).select_related('product_item')
         for item in cart_items:
-            product_item = FoodItem.objects.get(pk=item.product_item.id)
-            subtotal += (product_item.price * item.quantity)
+            subtotal += (item.product_item.price * item.quantity)
 
         get_tax = Tax.objects.filter(is_active=True)
         for i in get_tax:
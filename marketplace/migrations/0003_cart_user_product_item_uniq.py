@@ -0,0 +1,34 @@
+# Generated by Django 3.2.19 on 2026-10-19 11:02
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicate_cart_items(apps, schema_editor):
+    """Collapse duplicate (user, product_item) rows into one so the unique constraint can be added."""
+    Cart = apps.get_model('marketplace', 'Cart')
+    duplicates = (
+        Cart.objects.values('user_id', 'product_item_id')
+        .annotate(rows=Count('id'), total_quantity=Sum('quantity'), keep_id=Min('id'))
+        .filter(rows__gt=1)
+    )
+    for row in duplicates:
+        Cart.objects.filter(pk=row['keep_id']).update(quantity=row['total_quantity'])
+        Cart.objects.filter(
+            user_id=row['user_id'], product_item_id=row['product_item_id']
+        ).exclude(pk=row['keep_id']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0002_tax'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_cart_items, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='cart',
+            constraint=models.UniqueConstraint(fields=('user', 'product_item'), name='cart_user_product_item_uniq'),
+        ),
+    ]
@@ -1,4 +1,6 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
+from django.utils import timezone
 
 from accounts.models import User
 from catalog.models import FoodItem
@@ -11,10 +13,40 @@ class Cart(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'product_item'], name='cart_user_product_item_uniq'),
+        ]
+
     def __unicode__(self):
         return self.user
 
 
+def increase_cart_quantity(user, product_item):
+    """Add one product_item to the user's cart. Returns (cart item, created). The quantity is incremented
+    in the database, so concurrent requests (a double click, two tabs) each count once."""
+    lines = Cart.objects.filter(user=user, product_item=product_item)
+    if lines.update(quantity=F('quantity') + 1, updated_at=timezone.now()):
+        return lines.get(), False
+    try:
+        with transaction.atomic():
+            return Cart.objects.create(user=user, product_item=product_item, quantity=1), True
+    except IntegrityError:
+        # A concurrent request added the line between the update and the insert.
+        lines.update(quantity=F('quantity') + 1, updated_at=timezone.now())
+        return lines.get(), False
+
+
+def decrease_cart_quantity(user, product_item):
+    """Remove one product_item from the user's cart, deleting the line at the last one. Returns the quantity
+    left, or None when the product was not in the cart."""
+    lines = Cart.objects.filter(user=user, product_item=product_item)
+    if lines.filter(quantity__gt=1).update(quantity=F('quantity') - 1, updated_at=timezone.now()):
+        return lines.values_list('quantity', flat=True).get()
+    deleted, _ = lines.delete()
+    return 0 if deleted else None
+
+
 class Tax(models.Model):
     tax_type = models.CharField(max_length=20, unique=True)
     tax_percentage = models.DecimalField(decimal_places=2, max_digits=4, verbose_name='Tax Percentage (%)')
@@ -0,0 +1,117 @@
+import hashlib
+
+import simplejson as json
+from django.conf import settings
+from django.core import signing
+
+from marketplace.models import Tax
+
+QUOTE_SALT = 'marketplace.quote'
+
+
+class QuoteSerializer:
+    """Serializer for signing that keeps the Decimal amounts of a quote exact."""
+
+    def dumps(self, obj):
+        return json.dumps(obj, separators=(',', ':')).encode('latin-1')
+
+    def loads(self, data):
+        return json.loads(data.decode('latin-1'), use_decimal=True)
+
+
+def get_active_taxes():
+    """The active taxes. Not cached: a per process cache would keep pricing with old rates in the other
+    workers after a tax is changed, and this is a single small query."""
+    return list(Tax.objects.filter(is_active=True))
+
+
+def cart_version(cart_items, taxes):
+    """Fingerprint of the cart lines, of the menus they come from and of the active taxes. Changes when a line
+    is added, removed or its quantity changes, when a vendor's catalog (so a price) changes, see
+    Vendor.catalog_version, and when a tax is added, deactivated or its rate changes.
+    The cart items need product_item__vendor selected."""
+    lines = sorted(
+        (item.id, item.product_item_id, item.quantity, item.product_item.vendor.catalog_version)
+        for item in cart_items
+    )
+    rates = sorted((tax.id, tax.tax_type, str(tax.tax_percentage)) for tax in taxes)
+    return hashlib.sha256(repr((lines, rates)).encode()).hexdigest()[:32]
+
+
+def price_cart(cart_items, taxes=None):
+    """Price the cart lines in one pass with the active taxes: the amounts the cart pages show,
+    the tax breakdown and the per vendor totals in the Order.total_data format."""
+    if taxes is None:
+        taxes = get_active_taxes()
+    lines = []
+    cart_count = 0
+    subtotal = 0
+    vendor_subtotals = {}
+    for item in cart_items:
+        price = item.product_item.price
+        amount = price * item.quantity
+        lines.append([item.id, item.product_item_id, item.quantity, price])
+        cart_count += item.quantity
+        subtotal += amount
+        vendor_id = str(item.product_item.vendor_id)
+        vendor_subtotals[vendor_id] = vendor_subtotals.get(vendor_id, 0) + amount
+
+    # {"vendor_id":{"subtotal":{"tax_type": {"tax_percentage": "tax_amount"}}}}
+    total_data = {}
+    for vendor_id, vendor_subtotal in vendor_subtotals.items():
+        vendor_tax_dict = {
+            tax.tax_type: {str(tax.tax_percentage): str(round((tax.tax_percentage * vendor_subtotal) / 100, 2))}
+            for tax in taxes
+        }
+        total_data[vendor_id] = {str(vendor_subtotal): str(vendor_tax_dict)}
+
+    tax_dict = {
+        tax.tax_type: {str(tax.tax_percentage): round((tax.tax_percentage * subtotal) / 100, 2)} for tax in taxes
+    }
+    tax = sum(x for key in tax_dict.values() for x in key.values())
+    return {
+        'version': cart_version(cart_items, taxes),
+        'lines': lines,
+        'cart_count': cart_count,
+        'subtotal': subtotal,
+        'tax': tax,
+        'grand_total': subtotal + tax,
+        'tax_dict': tax_dict,
+        'total_data': total_data,
+    }
+
+
+def sign_quote(quote, user, **extra):
+    """Signed token of the quote for the user, extra values (e.g. the order number) are signed along."""
+    return signing.dumps({**quote, **extra, 'user': user.pk}, salt=QUOTE_SALT, serializer=QuoteSerializer,
+                         compress=True)
+
+
+def load_quote(token, user, cart_items=None, taxes=None, **expected):
+    """The quote signed into token. None when it is missing, tampered with, older than CHECKOUT_QUOTE_MAX_AGE,
+    signed for another user or other expected values, or, given the cart items, the cart or the taxes changed since."""
+    if not token:
+        return None
+    try:
+        quote = signing.loads(token, salt=QUOTE_SALT, serializer=QuoteSerializer,
+                              max_age=settings.CHECKOUT_QUOTE_MAX_AGE)
+    except signing.BadSignature:
+        return None
+    if quote.get('user') != user.pk or any(quote.get(key) != value for key, value in expected.items()):
+        return None
+    if cart_items is not None:
+        if taxes is None:
+            taxes = get_active_taxes()
+        if quote['version'] != cart_version(cart_items, taxes):
+            return None
+    return quote
+
+
+def get_quote(request, cart_items, token=None):
+    """Quote of the loaded cart items: the one signed into token while the cart is unchanged, else the cart
+    priced again. Kept on the request, the cart context processors reuse it instead of querying the cart
+    and the taxes again."""
+    taxes = get_active_taxes()
+    quote = load_quote(token, request.user, cart_items, taxes) or price_cart(cart_items, taxes)
+    request.cart_quote = quote
+    return quote
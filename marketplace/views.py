@@ -1,5 +1,6 @@
 from datetime import date
 
+from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.gis.db.models.functions import Distance
 from django.contrib.gis.geos import GEOSGeometry
@@ -7,15 +8,18 @@ from django.contrib.gis.measure import D
 from django.db.models import Prefetch, Q
 from django.http import JsonResponse
 from django.shortcuts import redirect
-from django.views import View
 from django.views.generic import ListView, DetailView, FormView
 
 from accounts.models import UserProfile
 from catalog.models import Category, FoodItem
+from CoreRoot import metrics
+from CoreRoot.async_support import AsyncView, database_sync_to_async
 from marketplace.context_processors import get_cart_counter, get_cart_amounts
-from marketplace.models import Cart
+from marketplace.models import Cart, decrease_cart_quantity, increase_cart_quantity
+from marketplace.quotes import get_quote, sign_quote
 from orders.forms import OrderForm
-from vendor.models import Vendor, OpeningHour
+from vendor.models import Vendor, get_listed_vendor_count
+from vendor.opening_hours import get_opening_hours
 
 
 class MarketplaceView(ListView):
@@ -23,18 +27,24 @@ class MarketplaceView(ListView):
 
     template_name = 'marketplace/listings.html'
     context_object_name = 'vendors'
+    paginate_by = 20
 
     def get_queryset(self):
         """Get the queryset of vendors. Filters vendors based on the 'is_approved' and 'user__is_active' fields."""
-        queryset = Vendor.objects.filter(is_approved=True, user__is_active=True)
+        queryset = Vendor.objects.listed().for_listing().order_by('-id')
         return queryset
 
+    def get_paginator(self, *args, **kwargs):
+        paginator = super().get_paginator(*args, **kwargs)
+        # The cached listed vendor count saves the COUNT query.
+        paginator.count = get_listed_vendor_count()
+        return paginator
+
     def get_context_data(self, **kwargs):
         """Get the additional context data to be passed to the template.
         Adds the 'vendor_count' variable to the context, representing the count of vendors."""
         context = super().get_context_data(**kwargs)
-        vendor_count = self.object_list.count()
-        context['vendor_count'] = vendor_count
+        context['vendor_count'] = context['paginator'].count
         return context
 
 
@@ -50,7 +60,7 @@ class VendorDetailView(DetailView):
     def get_queryset(self):
         """Get the queryset of vendors."""
         queryset = super().get_queryset()
-        return queryset.filter(is_approved=True, user__is_active=True)
+        return queryset.listed().select_related('user_profile')
 
     def get_context_data(self, **kwargs):
         """Get the additional context data to be passed to the template."""
@@ -65,23 +75,27 @@ class VendorDetailView(DetailView):
             )
         )
 
-        # Retrieve opening hours for the vendor and order them.
-        opening_hours = OpeningHour.objects.filter(vendor=vendor).order_by('day', 'from_hour')
+        # Retrieve opening hours for the vendor, ordered, from the compiled cache.
+        opening_hours = get_opening_hours(vendor.id)
 
         # Check current day's opening hours.
         today_date = date.today()
         today = today_date.isoweekday()
 
-        current_opening_hours = opening_hours.filter(day=today)
+        current_opening_hours = [hour for hour in opening_hours if hour.day == today]
+        # Reuse today's hours for vendor.is_open in the template.
+        vendor.today_opening_hours = current_opening_hours
 
         # Check if the user is authenticated and retrieve their cart items.
         if self.request.user.is_authenticated:
-            cart_items = Cart.objects.filter(user=self.request.user)
+            cart_items = Cart.objects.filter(user=self.request.user).select_related('product_item')
         else:
             cart_items = None
 
         # Add the variables to the context.
+        # Only queried when the cached menu fragments are missing.
         context['categories'] = categories
+        context['menu_cache_timeout'] = settings.MENU_CACHE_TIMEOUT
         context['opening_hours'] = opening_hours
         context['current_opening_hours'] = current_opening_hours
         context['cart_items'] = cart_items
@@ -89,11 +103,14 @@ class VendorDetailView(DetailView):
         return context
 
 
-class AddToCartView(View):
+class AddToCartView(AsyncView):
     """View for adding items to cart."""
 
-    def get(self, request, product_id):
+    async def get(self, request, product_id):
         """Handle GET request to increase the cart quantity."""
+        return await database_sync_to_async(self.update_cart)(request, product_id)
+
+    def update_cart(self, request, product_id):
         # Check if the user is authenticated
         if not request.user.is_authenticated:
             return JsonResponse({'status': 'login_required', 'message': 'Please login to continue'})
@@ -104,37 +121,27 @@ class AddToCartView(View):
 
         # Check if the food item exists
         try:
-            # Check if the product item exists
             product_item = FoodItem.objects.get(id=product_id)
-            # Check if the user has already added that food to the cart.
-            try:
-                # Check if the user has already added the food item to the cart.
-                check_cart = Cart.objects.get(user=request.user, product_item=product_item)
-                # Increase the cart quantity
-                check_cart.quantity += 1
-                check_cart.save()
-                return JsonResponse({'status': 'Success',
-                                     'message': 'Increased the cart quantity',
-                                     'cart_counter': get_cart_counter(request),
-                                     'qty': check_cart.quantity,
-                                     'cart_amount': get_cart_amounts(request)})
-            except Cart.DoesNotExist:
-                # Create a new cart item
-                check_cart = Cart.objects.create(user=request.user, product_item=product_item, quantity=1)
-                return JsonResponse({'status': 'Success',
-                                     'message': 'Added the product to the cart',
-                                     'cart_counter': get_cart_counter(request),
-                                     'qty': check_cart.quantity,
-                                     'cart_amount': get_cart_amounts(request)})
         except FoodItem.DoesNotExist:
             return JsonResponse({'status': 'Failed', 'message': 'This product does not exist!'})
 
+        check_cart, created = increase_cart_quantity(request.user, product_item)
+        metrics.cart_operations.inc(action='add' if created else 'increase')
+        return JsonResponse({'status': 'Success',
+                             'message': 'Added the product to the cart' if created else 'Increased the cart quantity',
+                             'cart_counter': get_cart_counter(request),
+                             'qty': check_cart.quantity,
+                             'cart_amount': get_cart_amounts(request)})
+
 
-class DecreaseCartView(View):
+class DecreaseCartView(AsyncView):
     """View to decrease the quantity of a product in the cart."""
 
-    def get(self, request, product_id):
+    async def get(self, request, product_id):
         """Handle GET request to decrease the cart quantity."""
+        return await database_sync_to_async(self.decrease_cart)(request, product_id)
+
+    def decrease_cart(self, request, product_id):
         # Check if the user is not authenticated
         if not request.user.is_authenticated:
             return JsonResponse({'status': 'login_required', 'message': 'Please login to continue'})
@@ -146,35 +153,30 @@ class DecreaseCartView(View):
         try:
             # Check if the product exists
             product_item = FoodItem.objects.get(id=product_id)
-            try:
-                # Check if the user has the product in the cart
-                check_cart = Cart.objects.get(user=request.user, product_item=product_item)
-                if check_cart.quantity > 1:
-                    # Decrease the cart quantity if it is greater than 1
-                    check_cart.quantity -= 1
-                    check_cart.save()
-                else:
-                    # Remove the product from the cart if the quantity becomes 0.
-                    check_cart.delete()
-                    check_cart.quantity = 0
-                return JsonResponse({'status': 'Success',
-                                     'message': 'Decreased the cart quantity',
-                                     'cart_counter': get_cart_counter(request),
-                                     'qty': check_cart.quantity,
-                                     'cart_amount': get_cart_amounts(request)})
-            except Cart.DoesNotExist:
-                # The user does not have the product in the cart
-                return JsonResponse({'status': 'Failed', 'message': 'You do not have this item in your cart!'})
         except FoodItem.DoesNotExist:
-            # The product does not exist
             return JsonResponse({'status': 'Failed', 'message': 'This product does not exist!'})
 
+        quantity = decrease_cart_quantity(request.user, product_item)
+        if quantity is None:
+            # The user does not have the product in the cart
+            return JsonResponse({'status': 'Failed', 'message': 'You do not have this item in your cart!'})
+        # The line is removed from the cart when the quantity becomes 0.
+        metrics.cart_operations.inc(action='decrease' if quantity else 'remove')
+        return JsonResponse({'status': 'Success',
+                             'message': 'Decreased the cart quantity',
+                             'cart_counter': get_cart_counter(request),
+                             'qty': quantity,
+                             'cart_amount': get_cart_amounts(request)})
+
 
-class DeleteCartView(View):
+class DeleteCartView(AsyncView):
     """View to delete a cart item."""
 
-    def get(self, request, cart_id):
+    async def get(self, request, cart_id):
         """Handle GET request to delete the cart item."""
+        return await database_sync_to_async(self.delete_cart)(request, cart_id)
+
+    def delete_cart(self, request, cart_id):
         # Check if the user is not authenticated
         if not request.user.is_authenticated:
             return JsonResponse({'status': 'login_required', 'message': 'Please login to continue'})
@@ -189,6 +191,7 @@ class DeleteCartView(View):
             if cart_item:
                 # Delete the cart item
                 cart_item.delete()
+                metrics.cart_operations.inc(action='delete')
                 return JsonResponse({'status': 'Success',
                                      'message': 'Cart item has been deleted!',
                                      'cart_counter': get_cart_counter(request),
@@ -207,15 +210,30 @@ class CartListView(LoginRequiredMixin, ListView):
 
     def get_queryset(self):
         """Get the cart items for the current user."""
-        return Cart.objects.filter(user=self.request.user).order_by('created_at')
+        return Cart.objects.filter(user=self.request.user).select_related(
+            'product_item__vendor'
+        ).order_by('created_at')
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # Priced once from the listed lines, the cart context processors reuse the quote.
+        get_quote(self.request, context['cart_items'])
+        return context
 
-class SearchView(ListView):
+
+class SearchView(AsyncView, ListView):
     """View to display search results based on user input."""
 
     template_name = 'marketplace/listings.html'
     context_object_name = 'vendors'
 
+    async def get(self, request, *args, **kwargs):
+        return await database_sync_to_async(self.render_results)(request, *args, **kwargs)
+
+    def render_results(self, request, *args, **kwargs):
+        # Rendered in the pool as well, the template and context processors query the database too.
+        return super().get(request, *args, **kwargs).render()
+
     def get_queryset(self):
         """Get the filtered vendors based on the search parameters."""
         # Check if the 'address' parameter is present in the request GET parameters.
@@ -238,7 +256,7 @@ class SearchView(ListView):
             Q(id__in=fetch_vendors_by_product_items) | Q(
                 vendor_name__icontains=keyword, is_approved=True, user__is_active=True
             )
-        )
+        ).for_listing()
 
         # Apply additional filtering based on location if latitude, longitude and radius are provided.
         if latitude and longitude and radius:
@@ -260,7 +278,8 @@ class SearchView(ListView):
         # Get the default context data from the parent class
         context = super().get_context_data(**kwargs)
         # Add additional context data for the template
-        context['vendor_count'] = self.get_queryset().count()
+        # Count the already evaluated object list instead of running the search again.
+        context['vendor_count'] = len(self.object_list)
         context['source_location'] = self.request.GET.get('address', '')
         return context
 
@@ -277,15 +296,17 @@ class CheckoutView(LoginRequiredMixin, FormView):
         context = super().get_context_data(**kwargs)
 
         # Retrieve the cart items for the logged-in user
-        cart_items = Cart.objects.filter(user=self.request.user).order_by('created_at')
-        cart_count = cart_items.count()
+        cart_items = list(Cart.objects.filter(user=self.request.user).select_related(
+            'product_item__vendor'
+        ).order_by('created_at'))
 
         # If the cart is empty, redirect back to the marketplace
-        if cart_count <= 0:
+        if not cart_items:
             return redirect('marketplace')
+        metrics.checkouts.inc(stage='checkout')
 
         # Retrieve user profile details
-        user_profile = UserProfile.objects.get(user=self.request.user)
+        user_profile = UserProfile.objects.get_for_user(self.request.user)
 
         # Set default values for the form fields
         default_values = {
@@ -304,8 +325,12 @@ class CheckoutView(LoginRequiredMixin, FormView):
         form = self.get_form(self.form_class)
         form.initial = default_values
 
+        # Price the cart once: the signed quote goes with the form, place_order only prices again if the cart changed.
+        quote = get_quote(self.request, cart_items)
+
         # Add the form and cart items to the context
         context['form'] = form
         context['cart_items'] = cart_items
+        context['quote'] = sign_quote(quote, self.request.user)
 
         return context
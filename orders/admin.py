@@ -1,5 +1,17 @@
 from django.contrib import admin
+from django.db.models import Prefetch
+
+from CoreRoot.pagination import EstimatedCountPaginator
 from orders.models import Payment, Order, OrderedProduct
+from vendor.models import Vendor
+
+
+class BigTableAdmin(admin.ModelAdmin):
+    """Changelist settings for tables with millions of rows: estimated counts for unfiltered lists and
+    no second COUNT(*) of the whole table next to a filtered one. Subclasses set raw_id_fields, a select
+    box would list every related row."""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 class OrderedProductInline(admin.TabularInline):
@@ -7,13 +19,44 @@ class OrderedProductInline(admin.TabularInline):
     readonly_fields = ('order', 'payment', 'user', 'product_item', 'quantity', 'price', 'amount')
     extra = 0
 
+    def get_queryset(self, request):
+        # The read-only relations and the row titles (the food title) are rendered from these joins.
+        return super().get_queryset(request).select_related('order', 'payment', 'user', 'product_item')
 
-class OrderAdmin(admin.ModelAdmin):
-    list_display = ['order_number', 'name', 'phone', 'email', 'total',
+
+class OrderAdmin(BigTableAdmin):
+    list_display = ['order_number', 'name', 'phone', 'email', 'total', 'payment',
                     'payment_method', 'status', 'order_placed_to', 'is_ordered']
+    list_select_related = ('payment',)
+    # Bounded ranges of created_at (today, past 7 days, this month, this year), served by order_created_id_idx
+    # as is the default ordering. No date_hierarchy: its links are built from MIN/MAX and DISTINCT date_trunc
+    # over the whole table on every load.
+    list_filter = (('created_at', admin.DateFieldListFilter),)
+    ordering = ('-created_at', '-id')
+    raw_id_fields = ('user', 'payment')
     inlines = [OrderedProductInline]
 
+    def get_queryset(self, request):
+        # order_placed_to() lists the vendors of every row.
+        return super().get_queryset(request).prefetch_related(
+            Prefetch('vendors', queryset=Vendor.objects.only('id', 'vendor_name'))
+        )
+
+
+class OrderedProductAdmin(BigTableAdmin):
+    list_display = ('order', 'product_item', 'user', 'quantity', 'amount', 'created_at')
+    list_select_related = ('order', 'product_item', 'user')
+    ordering = ('-id',)
+    raw_id_fields = ('order', 'payment', 'user', 'product_item')
+
+
+class PaymentAdmin(BigTableAdmin):
+    list_display = ('transaction_id', 'user', 'payment_method', 'amount', 'status', 'created_at')
+    list_select_related = ('user',)
+    ordering = ('-id',)
+    raw_id_fields = ('user',)
+
 
-admin.site.register(Payment)
+admin.site.register(Payment, PaymentAdmin)
 admin.site.register(Order, OrderAdmin)
-admin.site.register(OrderedProduct)
+admin.site.register(OrderedProduct, OrderedProductAdmin)
@@ -0,0 +1,105 @@
+import csv
+import datetime
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from orders.models import OrderedProduct
+
+EXPORT_FORMATS = ('csv', 'jsonl')
+EXPORT_CHUNK_SIZE = 2000
+
+# Column name -> OrderedProduct lookup, in export order.
+EXPORT_COLUMNS = (
+    ('order_number', 'order__order_number'),
+    ('created_at', 'order__created_at'),
+    ('status', 'order__status'),
+    ('first_name', 'order__first_name'),
+    ('last_name', 'order__last_name'),
+    ('email', 'order__email'),
+    ('city', 'order__city'),
+    ('vendor', 'product_item__vendor__vendor_name'),
+    ('product', 'product_item__food_title'),
+    ('quantity', 'quantity'),
+    ('price', 'price'),
+    ('amount', 'amount'),
+    ('payment_method', 'order__payment_method'),
+    ('transaction_id', 'payment__transaction_id'),
+)
+
+
+class Echo:
+    """File-like object that returns the written value instead of buffering it, so csv.writer feeds a generator."""
+
+    def write(self, value):
+        return value
+
+
+def parse_day(value):
+    """Parse a 'YYYY-MM-DD' string, raising ValueError for anything else."""
+    try:
+        day = parse_date(value)
+    except ValueError:
+        day = None
+    if day is None:
+        raise ValueError(f'Invalid date "{value}", use YYYY-MM-DD.')
+    return day
+
+
+def parse_date_range(date_from, date_to):
+    """Convert 'YYYY-MM-DD' strings into an aware [start, end) datetime range. Empty values leave that side open,
+    invalid dates and a range ending before it starts raise ValueError."""
+    start = end = None
+    tz = timezone.get_current_timezone()
+    if date_from:
+        start = timezone.make_aware(datetime.datetime.combine(parse_day(date_from), datetime.time.min), tz)
+    if date_to:
+        day = parse_day(date_to) + datetime.timedelta(days=1)
+        end = timezone.make_aware(datetime.datetime.combine(day, datetime.time.min), tz)
+    if start is not None and end is not None and start >= end:
+        raise ValueError(f'The date range ends on {date_to}, before it starts on {date_from}.')
+    return start, end
+
+
+def get_export_queryset(vendor_id=None, start=None, end=None):
+    """Ordered products of completed orders as flat tuples, optionally limited to a vendor and a date range."""
+    queryset = OrderedProduct.objects.filter(order__is_ordered=True)
+    if vendor_id is not None:
+        queryset = queryset.filter(product_item__vendor_id=vendor_id)
+    # Compare against the raw column (not __date) so the created_at index stays usable.
+    if start is not None:
+        queryset = queryset.filter(order__created_at__gte=start)
+    if end is not None:
+        queryset = queryset.filter(order__created_at__lt=end)
+    lookups = [lookup for _, lookup in EXPORT_COLUMNS]
+    return queryset.order_by('order__created_at', 'id').values_list(*lookups)
+
+
+def iter_export_rows(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """Stream rows through a server-side cursor so memory does not grow with the export size."""
+    return queryset.iterator(chunk_size=chunk_size)
+
+
+def iter_csv(rows):
+    """Yield the CSV export line by line, starting with the header."""
+    writer = csv.writer(Echo())
+    yield writer.writerow([name for name, _ in EXPORT_COLUMNS])
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def iter_jsonl(rows):
+    """Yield the export as JSON Lines, one object per ordered product."""
+    names = [name for name, _ in EXPORT_COLUMNS]
+    for row in rows:
+        yield json.dumps(dict(zip(names, row)), cls=DjangoJSONEncoder) + '\n'
+
+
+def iter_export(export_format, vendor_id=None, start=None, end=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """Return a generator over the formatted export."""
+    rows = iter_export_rows(get_export_queryset(vendor_id, start, end), chunk_size=chunk_size)
+    if export_format == 'jsonl':
+        return iter_jsonl(rows)
+    return iter_csv(rows)
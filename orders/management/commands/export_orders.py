@@ -0,0 +1,44 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from orders.exports import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, iter_export, parse_date_range
+from vendor.models import Vendor
+
+
+class Command(BaseCommand):
+    help = 'Stream ordered products of completed orders as CSV or JSON Lines, optionally for a single vendor.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vendor', help='Vendor id or slug. All vendors are exported when omitted.')
+        parser.add_argument('--format', choices=EXPORT_FORMATS, default='csv')
+        parser.add_argument('--from', dest='date_from', help='First order date to include (YYYY-MM-DD).')
+        parser.add_argument('--to', dest='date_to', help='Last order date to include (YYYY-MM-DD).')
+        parser.add_argument('--output', help='File to write to. Defaults to stdout.')
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        vendor_id = None
+        if options['vendor']:
+            vendor_id = self.resolve_vendor(options['vendor'])
+        try:
+            start, end = parse_date_range(options['date_from'], options['date_to'])
+        except ValueError as error:
+            raise CommandError(error)
+
+        chunks = iter_export(options['format'], vendor_id=vendor_id, start=start, end=end,
+                             chunk_size=options['chunk_size'])
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as output:
+                output.writelines(chunks)
+        else:
+            sys.stdout.writelines(chunks)
+
+    @staticmethod
+    def resolve_vendor(value):
+        """Return the vendor id for the given id or slug."""
+        lookup = {'pk': value} if value.isdigit() else {'vendor_slug': value}
+        try:
+            return Vendor.objects.values_list('id', flat=True).get(**lookup)
+        except Vendor.DoesNotExist:
+            raise CommandError(f'Vendor "{value}" does not exist')
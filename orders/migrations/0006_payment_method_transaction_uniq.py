@@ -0,0 +1,53 @@
+# Generated by Django 3.2.19 on 2026-10-19 16:05
+
+from django.db import migrations, models
+from django.db.models import CharField, Count, Min, Value
+from django.db.models.functions import Cast, Concat
+
+
+def merge_duplicate_payments(apps, schema_editor):
+    """Collapse payments recorded twice for the same capture into the first one so the unique constraint
+    can be added. A capture recorded twice also created the order's products twice: the copies made for
+    a duplicate payment are deleted when the order already has products of the kept payment, anything
+    else is moved to the kept payment, as are the orders. Payments stored without a transaction id are
+    unrelated captures, each gets a synthetic id instead of being merged."""
+    Payment = apps.get_model('orders', 'Payment')
+    Order = apps.get_model('orders', 'Order')
+    OrderedProduct = apps.get_model('orders', 'OrderedProduct')
+    Payment.objects.filter(transaction_id='').update(
+        transaction_id=Concat(Value('missing-'), Cast('id', output_field=CharField()), output_field=CharField())
+    )
+    duplicates = (
+        Payment.objects.values('payment_method', 'transaction_id')
+        .annotate(rows=Count('id'), keep_id=Min('id'))
+        .filter(rows__gt=1)
+    )
+    for row in duplicates:
+        extra = Payment.objects.filter(
+            payment_method=row['payment_method'], transaction_id=row['transaction_id']
+        ).exclude(pk=row['keep_id'])
+        kept_orders = OrderedProduct.objects.filter(payment_id=row['keep_id']).values('order_id')
+        OrderedProduct.objects.filter(payment__in=extra, order__in=kept_orders).delete()
+        OrderedProduct.objects.filter(payment__in=extra).update(payment_id=row['keep_id'])
+        Order.objects.filter(payment__in=extra).update(payment_id=row['keep_id'])
+        extra.delete()
+    if schema_editor.connection.vendor == 'postgresql':
+        # The deletes queued checks of the deferred foreign keys referencing orders_payment. PostgreSQL
+        # refuses to alter a table with pending trigger events, so they are run now, before AddConstraint.
+        schema_editor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0005_order_created_id_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_payments, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='payment',
+            constraint=models.UniqueConstraint(fields=('payment_method', 'transaction_id'),
+                                               name='payment_method_transaction_uniq'),
+        ),
+    ]
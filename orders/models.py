@@ -1,3 +1,5 @@
+from contextvars import ContextVar
+
 from django.db import models
 
 from accounts.models import User
@@ -5,7 +7,14 @@ from catalog.models import FoodItem
 from vendor.models import Vendor
 import simplejson as json
 
-request_object = ''
+# Request being handled, set by orders.request_object.request_object_middleware. A context variable,
+# so concurrent requests under ASGI each see their own.
+current_request = ContextVar('current_request', default=None)
+
+
+def get_request_vendor():
+    """Vendor of the current request's user, see UserCacheManager.get_for_user()."""
+    return Vendor.objects.get_for_user(current_request.get().user)
 
 
 class Payment(models.Model):
@@ -19,6 +28,13 @@ class Payment(models.Model):
     status = models.CharField(max_length=100)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        constraints = [
+            # A capture is recorded once, retries of the payments callback are detected on this index.
+            models.UniqueConstraint(fields=['payment_method', 'transaction_id'],
+                                    name='payment_method_transaction_uniq'),
+        ]
+
     def __str__(self):
         return self.transaction_id
 
@@ -56,6 +72,14 @@ class Order(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['order_number'], name='order_number_idx'),
+            models.Index(fields=['user', 'is_ordered', 'created_at'], name='order_user_ordered_created_idx'),
+            # Date hierarchy ranges and the newest first ordering of the admin changelist.
+            models.Index(fields=['created_at', 'id'], name='order_created_id_idx'),
+        ]
+
     # Concatenate first name and last name
     @property
     def name(self):
@@ -65,7 +89,7 @@ class Order(models.Model):
         return ", ".join([str(i) for i in self.vendors.all()])
 
     def get_total_by_vendor(self):
-        vendor = Vendor.objects.get(user=request_object.user)
+        vendor = get_request_vendor()
         subtotal = 0
         tax = 0
         tax_dict = {}
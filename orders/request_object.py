@@ -1,19 +1,29 @@
-from orders import models
+import asyncio
 
+from django.utils.decorators import sync_and_async_middleware
 
-def request_object_middleware(get_response):
-    # One-time configuration and initialization.
-
-    def middleware(request):
-        # Code to be executed for each request before
-        # the view (and later middleware) are called.
-        models.request_object = request
+from orders.models import current_request
 
-        response = get_response(request)
 
-        # Code to be executed for each request/response after
-        # the view is called.
+@sync_and_async_middleware
+def request_object_middleware(get_response):
+    # One-time configuration and initialization.
 
-        return response
+    if asyncio.iscoroutinefunction(get_response):
+        async def middleware(request):
+            token = current_request.set(request)
+            try:
+                return await get_response(request)
+            finally:
+                current_request.reset(token)
+    else:
+        def middleware(request):
+            # Code to be executed for each request before
+            # the view (and later middleware) are called.
+            token = current_request.set(request)
+            try:
+                return get_response(request)
+            finally:
+                current_request.reset(token)
 
     return middleware
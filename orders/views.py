@@ -1,12 +1,14 @@
 from django.contrib.auth.decorators import login_required
 from django.contrib.sites.shortcuts import get_current_site
 from django.http import HttpResponse, JsonResponse
+from django.db import IntegrityError, transaction
 from django.shortcuts import render, redirect
 
-from accounts.utils import send_notification
+from accounts.utils import send_notifications_in_background
 from catalog.models import FoodItem
-from marketplace.context_processors import get_cart_amounts
-from marketplace.models import Cart, Tax
+from CoreRoot import metrics
+from marketplace.models import Cart
+from marketplace.quotes import cart_version, get_active_taxes, get_quote, load_quote, sign_quote
 from orders.forms import OrderForm
 from orders.models import Order, Payment, OrderedProduct
 import simplejson as json
@@ -16,46 +18,19 @@ from orders.utils import generate_order_number, order_total_by_vendor
 
 @login_required(login_url='login')
 def place_order(request):
-    cart_items = Cart.objects.filter(user=request.user).order_by('created_at')
-    cart_count = cart_items.count()
-    if cart_count <= 0:
+    cart_items = list(
+        Cart.objects.filter(user=request.user).select_related('product_item__vendor').order_by('created_at')
+    )
+    if not cart_items:
         return redirect('marketplace')
 
     vendors_ids = []
     for item in cart_items:
-        if item.product_item.vendor.id not in vendors_ids:
-            vendors_ids.append(item.product_item.vendor.id)
-
-    # {"vendor_id":{"subtotal":{"tax_type": {"tax_percentage": "tax_amount"}}}}
-    get_tax = Tax.objects.filter(is_active=True)
-    subtotal = 0
-    total_data = {}
-    k = {}
-    for item in cart_items:
-        product_item = FoodItem.objects.get(pk=item.product_item.id, vendor_id__in=vendors_ids)
-        vendor_id = product_item.vendor.id
-        if vendor_id in k:
-            subtotal = k[vendor_id]
-            subtotal += (product_item.price * item.quantity)
-            k[vendor_id] = subtotal
-        else:
-            subtotal = (product_item.price * item.quantity)
-            k[vendor_id] = subtotal
-
-        # Calculate the tax_data
-        tax_dict = {}
-        for i in get_tax:
-            tax_type = i.tax_type
-            tax_percentage = i.tax_percentage
-            tax_amount = round((tax_percentage * subtotal) / 100, 2)
-            tax_dict.update({tax_type: {str(tax_percentage): str(tax_amount)}})
-        # Construct total data
-        total_data.update({product_item.vendor.id: {str(subtotal): str(tax_dict)}})
-
-    subtotal = get_cart_amounts(request)['subtotal']
-    total_tax = get_cart_amounts(request)['tax']
-    grand_total = get_cart_amounts(request)['grand_total']
-    tax_data = get_cart_amounts(request)['tax_dict']
+        if item.product_item.vendor_id not in vendors_ids:
+            vendors_ids.append(item.product_item.vendor_id)
+
+    # The quote signed on the checkout page, the cart is only priced again if it changed since.
+    quote = get_quote(request, cart_items, request.POST.get('quote'))
 
     if request.method == 'POST':
         form = OrderForm(request.POST)
@@ -71,18 +46,21 @@ def place_order(request):
             order.city = form.cleaned_data['city']
             order.pin_code = form.cleaned_data['pin_code']
             order.user = request.user
-            order.total = grand_total
-            order.tax_data = json.dumps(tax_data)
-            order.total_data = json.dumps(total_data)
-            order.total_tax = total_tax
+            order.total = quote['grand_total']
+            order.tax_data = json.dumps(quote['tax_dict'])
+            order.total_data = json.dumps(quote['total_data'])
+            order.total_tax = quote['tax']
             order.payment_method = request.POST['payment_method']
             order.save()
             order.order_number = generate_order_number(order.id)
             order.vendors.add(*vendors_ids)
             order.save()
+            metrics.checkouts.inc(stage='order_placed')
             context = {
                 'order': order,
                 'cart_items': cart_items,
+                # Bound to the order, payments uses it to tell whether the cart changed after pricing.
+                'quote': sign_quote(quote, request.user, order_number=order.order_number),
             }
             return render(request, 'orders/place-order.html', context)
         else:
@@ -91,93 +69,142 @@ def place_order(request):
     return render(request, 'orders/place-order.html')
 
 
+def _capture_payment(request, order, transaction_id, payment_method, status):
+    """Record the payment of the locked order, move the cart to its ordered products and clear the cart.
+    Returns the confirmation emails to send once committed."""
+    # STORE THE PAYMENT DETAILS IN THE PAYMENT MODEL
+    payment = Payment(
+        user=request.user,
+        transaction_id=transaction_id,
+        payment_method=payment_method,
+        amount=order.total,
+        status=status
+    )
+    payment.save()
+
+    # UPDATE THE ORDER MODEL
+    order.payment = payment
+    order.is_ordered = True
+    order.save()
+
+    # MOVE THE CART ITEMS TO ORDERED FOOD MODEL
+    cart_items = list(Cart.objects.filter(user=request.user).select_related('product_item__vendor__user'))
+    quote = load_quote(request.POST.get('quote'), request.user, order_number=order.order_number)
+    if quote is None or quote['version'] == cart_version(cart_items, get_active_taxes()):
+        lines = [(item.product_item, item.quantity, item.product_item.price) for item in cart_items]
+        cart_ids = [item.id for item in cart_items]
+    else:
+        # The cart or the taxes changed after the order was priced: order the quoted lines, they are what
+        # was paid for.
+        product_items = FoodItem.objects.select_related('vendor__user').in_bulk(
+            [product_item_id for _, product_item_id, _, _ in quote['lines']]
+        )
+        lines = [
+            (product_items[product_item_id], quantity, price)
+            for _, product_item_id, quantity, price in quote['lines'] if product_item_id in product_items
+        ]
+        cart_ids = [cart_id for cart_id, _, _, _ in quote['lines']]
+    ordered_product = OrderedProduct.objects.bulk_create([
+        OrderedProduct(
+            order=order,
+            payment=payment,
+            user=request.user,
+            product_item=product_item,
+            quantity=quantity,
+            price=price,
+            amount=price * quantity,  # total amount
+        )
+        for product_item, quantity, price in lines
+    ])
+
+    # SEND ORDER CONFIRMATION EMAIL TO THE CUSTOMER
+    mail_subject = 'Thank you for ordering with us.'
+    mail_template = 'orders/order-confirmation-email.html'
+
+    customer_subtotal = 0
+    for item in ordered_product:
+        customer_subtotal += (item.price * item.quantity)
+    tax_data = json.loads(order.tax_data)
+    context = {
+        'user': request.user,
+        'order': order,
+        'to_email': order.email,
+        'ordered_product': ordered_product,
+        'domain': get_current_site(request),
+        'customer_subtotal': customer_subtotal,
+        'tax_data': tax_data,
+    }
+    notifications = [(mail_subject, mail_template, context)]
+
+    # SEND ORDER RECEIVED EMAIL TO THE VENDOR
+    mail_subject = 'You have received a new order.'
+    mail_template = 'orders/new-order-received.html'
+    vendors = {}
+    for product in ordered_product:
+        vendors.setdefault(product.product_item.vendor_id, product.product_item.vendor)
+    for vendor_id, vendor in vendors.items():
+        ordered_product_to_vendor = [
+            product for product in ordered_product if product.product_item.vendor_id == vendor_id
+        ]
+        vendor_total = order_total_by_vendor(order, vendor_id)
+        context = {
+            'order': order,
+            'to_email': vendor.user.email,
+            'ordered_product_to_vendor': ordered_product_to_vendor,
+            'vendor_subtotal': vendor_total['subtotal'],
+            'tax_data': vendor_total['tax_dict'],
+            'vendor_grand_total': vendor_total['grand_total'],
+        }
+        notifications.append((mail_subject, mail_template, context))
+
+    # CLEAR THE CART IF THE PAYMENT IS SUCCESS
+    Cart.objects.filter(user=request.user, id__in=cart_ids).delete()
+    return notifications
+
+
 @login_required(login_url='login')
 def payments(request):
     # Check if the request is ajax or not
     if request.headers.get('x-requested-with') == 'XMLHttpRequest' and request.method == 'POST':
 
-        # STORE THE PAYMENT DETAILS IN THE PAYMENT MODEL
         order_number = request.POST.get('order_number')
         transaction_id = request.POST.get('transaction_id')
         payment_method = request.POST.get('payment_method')
         status = request.POST.get('status')
 
-        order = Order.objects.get(user=request.user, order_number=order_number)
-        payment = Payment(
-            user=request.user,
-            transaction_id=transaction_id,
-            payment_method=payment_method,
-            amount=order.total,
-            status=status
-        )
-        payment.save()
-
-        # UPDATE THE ORDER MODEL
-        order.payment = payment
-        order.is_ordered = True
-        order.save()
-
-        # MOVE THE CART ITEMS TO ORDERED FOOD MODEL
-        cart_items = Cart.objects.filter(user=request.user)
-        for item in cart_items:
-            ordered_product = OrderedProduct()
-            ordered_product.order = order
-            ordered_product.payment = payment
-            ordered_product.user = request.user
-            ordered_product.product_item = item.product_item
-            ordered_product.quantity = item.quantity
-            ordered_product.price = item.product_item.price
-            ordered_product.amount = item.product_item.price * item.quantity  # total amount
-            ordered_product.save()
-
-        # SEND ORDER CONFIRMATION EMAIL TO THE CUSTOMER
-        mail_subject = 'Thank you for ordering with us.'
-        mail_template = 'orders/order-confirmation-email.html'
-
-        ordered_product = OrderedProduct.objects.filter(order=order)
-        customer_subtotal = 0
-        for item in ordered_product:
-            customer_subtotal += (item.price * item.quantity)
-        tax_data = json.loads(order.tax_data)
-        context = {
-            'user': request.user,
-            'order': order,
-            'to_email': order.email,
-            'ordered_product': ordered_product,
-            'domain': get_current_site(request),
-            'customer_subtotal': customer_subtotal,
-            'tax_data': tax_data,
-        }
-        send_notification(mail_subject, mail_template, context)
-
-        # SEND ORDER RECEIVED EMAIL TO THE VENDOR
-        mail_subject = 'You have received a new order.'
-        mail_template = 'orders/new-order-received.html'
-        to_emails = []
-        for item in cart_items:
-            if item.product_item.vendor.user.email not in to_emails:
-                to_emails.append(item.product_item.vendor.user.email)
-                ordered_product_to_vendor = OrderedProduct.objects.filter(
-                    order=order, product_item__vendor=item.product_item.vendor)
-                print(ordered_product_to_vendor)
-                context = {
-                    'order': order,
-                    'to_email': item.product_item.vendor.user.email,
-                    'ordered_product_to_vendor': ordered_product_to_vendor,
-                    'vendor_subtotal': order_total_by_vendor(order, item.product_item.vendor.id)['subtotal'],
-                    'tax_data': order_total_by_vendor(order, item.product_item.vendor.id)['tax_dict'],
-                    'vendor_grand_total': order_total_by_vendor(order, item.product_item.vendor.id)['grand_total'],
-                }
-                send_notification(mail_subject, mail_template, context)
-
-        # CLEAR THE CART IF THE PAYMENT IS SUCCESS
-        cart_items.delete()
-
-        # RETURN BACK TO AJAX WITH THE STATUS SUCCESS OR FAILURE
         response = {
             'order_number': order_number,
             'transaction_id': transaction_id,
         }
+        if not transaction_id:
+            return JsonResponse({'status': 'Failed', 'message': 'The transaction id is missing.'}, status=400)
+
+        # A retried capture, e.g. the PayPal callback sent twice, gets the first response back. One lookup on
+        # the unique (payment_method, transaction_id) index.
+        if Order.objects.filter(user=request.user, order_number=order_number, payment__payment_method=payment_method,
+                                payment__transaction_id=transaction_id).exists():
+            return JsonResponse(response)
+
+        try:
+            with transaction.atomic():
+                # Concurrent duplicates of the capture wait for the first one to commit, then see its payment.
+                order = Order.objects.select_for_update().get(user=request.user, order_number=order_number)
+                if order.payment_id is not None:
+                    if (order.payment.payment_method, order.payment.transaction_id) == (payment_method,
+                                                                                        transaction_id):
+                        return JsonResponse(response)
+                    return JsonResponse({'status': 'Failed', 'message': 'The order is already paid.'}, status=409)
+                notifications = _capture_payment(request, order, transaction_id, payment_method, status)
+                # Sent once, after commit, in one batch off the request thread.
+                transaction.on_commit(lambda: send_notifications_in_background(notifications))
+        except IntegrityError:
+            # The unique index: this transaction was recorded for another order.
+            return JsonResponse({'status': 'Failed', 'message': 'The transaction is already recorded.'}, status=409)
+        metrics.payments.inc(payment_method=metrics.bounded(payment_method, dict(Payment.PAYMENT_METHOD)),
+                             status=metrics.bounded(status, metrics.PAYMENT_STATUSES))
+        metrics.checkouts.inc(stage='paid')
+
+        # RETURN BACK TO AJAX WITH THE STATUS SUCCESS OR FAILURE
         return JsonResponse(response)
 
     return HttpResponse('Payments view')
@@ -187,8 +214,10 @@ def order_complete(request):
     order_number = request.GET.get('order_no')
     transaction_id = request.GET.get('trans_id')
     try:
-        order = Order.objects.get(order_number=order_number, payment__transaction_id=transaction_id, is_ordered=True)
-        ordered_product = OrderedProduct.objects.filter(order=order)
+        order = Order.objects.select_related('payment').get(
+            order_number=order_number, payment__transaction_id=transaction_id, is_ordered=True
+        )
+        ordered_product = OrderedProduct.objects.filter(order=order).select_related('product_item__vendor')
 
         subtotal = 0
         for item in ordered_product:
@@ -0,0 +1,32 @@
+from smtplib import SMTPException
+from unittest import mock
+
+from django.core import mail
+from django.test import SimpleTestCase, override_settings
+
+from accounts.utils import get_notification_executor, send_notifications_in_background
+
+NOTIFICATION = ('Subject', 'accounts/emails/admin-approval-email.html',
+                {'user': None, 'is_approved': True, 'to_email': 'vendor@example.com'})
+
+
+@override_settings(NOTIFICATION_THREADS=1)
+class BackgroundNotificationTest(SimpleTestCase):
+    def wait_for_pool(self):
+        # The single pool thread has finished the send and its callbacks once this runs.
+        get_notification_executor().submit(lambda: None).result()
+
+    def test_notifications_are_sent_in_the_pool(self):
+        future = send_notifications_in_background([NOTIFICATION])
+        future.result()
+
+        self.assertEqual([message.to for message in mail.outbox], [['vendor@example.com']])
+
+    def test_failed_send_is_logged(self):
+        with mock.patch('accounts.utils.send_notifications', side_effect=SMTPException('connection refused')), \
+                self.assertLogs('accounts.utils', 'ERROR') as logs:
+            send_notifications_in_background([NOTIFICATION])
+            self.wait_for_pool()
+
+        self.assertIn('Sending notifications failed', logs.output[0])
+        self.assertIn('connection refused', logs.output[0])
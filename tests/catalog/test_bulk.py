@@ -0,0 +1,91 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from catalog.forms import FoodItemBulkForm
+from catalog.models import Category, FoodItem
+from tests.performance.data import create_vendor
+from vendor.models import Vendor
+
+AJAX = {'HTTP_X_REQUESTED_WITH': 'XMLHttpRequest'}
+
+
+class FoodItemBulkUpdateTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.vendor = create_vendor(1, items=3)
+        cls.other_vendor = create_vendor(2, items=1)
+        cls.items = list(cls.vendor.fooditem_set.order_by('pk'))
+
+    def setUp(self):
+        cache.clear()
+
+    def bulk_update(self, **data):
+        form = FoodItemBulkForm(data, vendor=self.vendor)
+        self.assertTrue(form.is_valid(), form.errors)
+        return form.save()
+
+    def catalog_version(self):
+        return Vendor.objects.values_list('catalog_version', flat=True).get(pk=self.vendor.pk)
+
+    def test_availability_in_one_update_and_one_version_bump(self):
+        version = self.catalog_version()
+        form = FoodItemBulkForm({'items': [item.pk for item in self.items], 'action': 'make_unavailable'},
+                                vendor=self.vendor)
+        self.assertTrue(form.is_valid())
+        with self.assertNumQueries(2):
+            self.assertEqual(form.save(), 3)
+
+        self.assertFalse(FoodItem.objects.filter(vendor=self.vendor, is_available=True).exists())
+        self.assertEqual(self.catalog_version(), version + 1)
+
+    def test_percentage_price_change_rounds_to_cents(self):
+        self.bulk_update(items=[self.items[0].pk], action='adjust_price', percent='-12.5')
+        self.assertEqual(FoodItem.objects.get(pk=self.items[0].pk).price, Decimal('8.31'))
+        self.assertEqual(FoodItem.objects.get(pk=self.items[1].pk).price, Decimal('9.50'))
+
+    def test_price_change_above_the_column_limit_is_a_form_error(self):
+        FoodItem.objects.filter(pk=self.items[0].pk).update(price=Decimal('20000000.00'))
+        form = FoodItemBulkForm({'items': [item.pk for item in self.items], 'action': 'adjust_price',
+                                 'percent': '400'}, vendor=self.vendor)
+
+        self.assertFalse(form.is_valid())
+        self.assertIn('100000000.00', form.errors['percent'][0])
+        self.assertEqual(FoodItem.objects.get(pk=self.items[1].pk).price, Decimal('9.50'))
+
+    def test_move_to_category(self):
+        category = Category.objects.create(vendor=self.vendor, category_name='Other', slug='other')
+        self.bulk_update(items=[self.items[0].pk], action='move', category=category.pk)
+        self.assertEqual(FoodItem.objects.get(pk=self.items[0].pk).category, category)
+
+    def test_other_vendors_items_and_categories_are_rejected(self):
+        other_item = self.other_vendor.fooditem_set.get()
+        self.assertEqual(self.bulk_update(items=[other_item.pk], action='make_unavailable'), 0)
+        self.assertTrue(FoodItem.objects.get(pk=other_item.pk).is_available)
+
+        form = FoodItemBulkForm({'items': [self.items[0].pk], 'action': 'move',
+                                 'category': other_item.category_id}, vendor=self.vendor)
+        self.assertFalse(form.is_valid())
+
+    def test_view_answers_ajax_and_refreshes_cached_menu(self):
+        self.client.force_login(self.vendor.user)
+        vendor_page = reverse('vendor_detail', args=[self.vendor.vendor_slug])
+        self.assertContains(self.client.get(vendor_page), self.items[0].food_title)
+
+        response = self.client.post(reverse('product_bulk_update'), {
+            'items': [self.items[0].pk], 'action': 'make_unavailable',
+        }, **AJAX)
+
+        self.assertEqual(response.json(), {'status': 'Success', 'updated': 1})
+        self.assertNotContains(self.client.get(vendor_page), self.items[0].food_title)
+
+    def test_view_redirects_to_next(self):
+        self.client.force_login(self.vendor.user)
+        next_url = reverse('product_items_by_category', args=[self.items[0].category_id])
+        response = self.client.post(reverse('product_bulk_update'), {
+            'items': [self.items[0].pk], 'action': 'adjust_price', 'next': next_url,
+        })
+        self.assertRedirects(response, next_url, fetch_redirect_response=False)
+        self.assertEqual(FoodItem.objects.get(pk=self.items[0].pk).price, Decimal('9.50'))
@@ -0,0 +1,56 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from catalog.models import Category, FoodItem
+from tests.performance.data import create_vendor
+
+
+class CatalogBuilderTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.vendor = create_vendor(1, items=3, categories=2)
+        cls.category = cls.vendor.category_set.order_by('pk').first()
+        FoodItem.objects.filter(pk=cls.category.food_items.order_by('pk').first().pk).update(is_available=False)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.vendor.user)
+
+    def get(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        return response, len(queries)
+
+    def test_categories_are_annotated_with_item_counts(self):
+        response, _ = self.get(reverse('catalog_builder'))
+        category = response.context['categories'][0]
+        self.assertEqual((category.item_count, category.available_item_count), (3, 2))
+        self.assertContains(response, '2 of 3 available')
+
+    def test_query_count_does_not_grow_with_categories(self):
+        _, before = self.get(reverse('catalog_builder'))
+        for index in range(20):
+            Category.objects.create(vendor=self.vendor, category_name=f'Extra {index}', slug=f'extra-{index}')
+        cache.clear()
+        _, after = self.get(reverse('catalog_builder'))
+        self.assertEqual(after, before)
+
+    def test_product_items_are_paginated(self):
+        FoodItem.objects.bulk_create([
+            FoodItem(vendor=self.vendor, category=self.category, food_title=f'Extra {index}', slug=f'extra-{index}',
+                     price='4.00', image='food_images/food.jpg')
+            for index in range(60)
+        ])
+        response, _ = self.get(reverse('product_items_by_category', args=[self.category.pk]) + '?page=2')
+
+        self.assertEqual(response.context['paginator'].count, 63)
+        self.assertEqual(len(response.context['product_items']), 13)
+        self.assertEqual(response.context['category'], self.category)
+
+    def test_other_vendors_category_is_not_found(self):
+        other_category = create_vendor(2).category_set.get()
+        response, _ = self.get(reverse('product_items_by_category', args=[other_category.pk]))
+        self.assertEqual(response.status_code, 404)
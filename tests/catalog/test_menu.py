@@ -0,0 +1,127 @@
+import io
+import shutil
+import tempfile
+import zipfile
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from catalog.menu import ImageSource, MenuImportError, import_menu, iter_menu, read_menu
+from catalog.models import Category, FoodItem
+from tests.performance.data import create_vendor
+
+MENU_CSV = '''category,category_description,food_title,description,price,is_available,image
+pizzas,Stone oven,Margherita,Tomato and mozzarella,9.50,true,margherita.png
+Pizzas,,Diavola,,11,yes,diavola.png
+Drinks,Cold drinks,Water,,1.5,no,water.png
+Desserts,Coming soon,,,,,
+'''
+
+
+def png():
+    buffer = io.BytesIO()
+    Image.new('RGB', (40, 30), (200, 50, 50)).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def images_zip(*names):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        for name in names:
+            archive.writestr(f'photos/{name}', png())
+    buffer.seek(0)
+    return buffer
+
+
+class MenuImportTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.vendor = create_vendor(1, items=1)
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def import_csv(self, data, *image_names):
+        return import_menu(self.vendor, read_menu(io.StringIO(data), 'csv'),
+                           ImageSource(archive=images_zip(*image_names)), workers=2)
+
+    def test_import_creates_categories_and_items_in_one_pass(self):
+        result = self.import_csv(MENU_CSV, 'margherita.png', 'diavola.png', 'water.png')
+
+        self.assertEqual(result, {'categories_created': 3, 'categories_updated': 0,
+                                  'items_created': 3, 'items_updated': 0})
+        pizzas = Category.objects.get(vendor=self.vendor, category_name='Pizzas')
+        self.assertEqual(pizzas.slug, f'pizzas-{pizzas.pk}')
+        self.assertTrue(Category.objects.filter(vendor=self.vendor, category_name='Desserts').exists())
+        margherita = FoodItem.objects.get(category=pizzas, food_title='Margherita')
+        self.assertEqual(margherita.slug, f'margherita-{margherita.pk}')
+        self.assertEqual(str(margherita.price), '9.50')
+        self.assertTrue(margherita.image.name.startswith('food_images/'))
+        self.assertEqual(set(margherita.image_variants['image']), {'thumb', 'card'})
+        self.assertFalse(FoodItem.objects.get(food_title='Water').is_available)
+
+    def test_query_count_does_not_grow_with_the_menu(self):
+        rows = ['category,food_title,price,image'] + [f'Bulk,Item {index},5,item.png' for index in range(50)]
+        # Category and item lookups, savepoint and release, id allocations and bulk inserts per model,
+        # the catalog version bump.
+        with self.assertNumQueries(9):
+            self.import_csv('\n'.join(rows), 'item.png')
+        self.assertEqual(FoodItem.objects.filter(category__category_name='Bulk').count(), 50)
+
+    def test_reimport_updates_without_images(self):
+        self.import_csv(MENU_CSV, 'margherita.png', 'diavola.png', 'water.png')
+        exported = ''.join(iter_menu(self.vendor, 'csv')).replace('9.50', '10.00')
+
+        result = self.import_csv(exported)
+
+        self.assertEqual(result['items_created'], 0)
+        self.assertEqual(str(FoodItem.objects.get(food_title='Margherita').price), '10.00')
+
+    def test_json_round_trip(self):
+        self.import_csv(MENU_CSV, 'margherita.png', 'diavola.png', 'water.png')
+        rows = read_menu(io.StringIO(''.join(iter_menu(self.vendor, 'json'))), 'json')
+
+        self.assertIn({'category': 'Drinks', 'category_description': 'Cold drinks', 'food_title': 'Water',
+                       'description': '', 'price': '1.5', 'is_available': 'False',
+                       'image': FoodItem.objects.get(food_title='Water').image.name}, rows)
+        self.assertEqual(import_menu(self.vendor, rows)['items_updated'], 4)
+
+    def test_invalid_menu_imports_nothing(self):
+        data = 'category,food_title,price,image\nPizzas,Margherita,9.50,margherita.png\nPizzas,Diavola,cheap,d.png\n'
+        with self.assertRaises(MenuImportError) as context:
+            self.import_csv(data, 'margherita.png', 'd.png')
+
+        self.assertEqual(context.exception.errors, ['row 2: invalid price "cheap"'])
+        self.assertFalse(Category.objects.filter(category_name='Pizzas').exists())
+
+    def test_non_utf8_menu_is_reported(self):
+        data = 'category,food_title,price\nCaf\xe9s,Caf\xe9 con leche,2.00\n'.encode('cp1252')
+        with self.assertRaises(MenuImportError) as context:
+            read_menu(io.BytesIO(data), 'csv')
+
+        self.assertIn('UTF-8', context.exception.errors[0])
+
+    def test_missing_image_imports_nothing(self):
+        with self.assertRaises(MenuImportError):
+            self.import_csv(MENU_CSV, 'margherita.png')
+        self.assertFalse(Category.objects.filter(category_name='Pizzas').exists())
+
+    def test_import_view(self):
+        self.client.force_login(self.vendor.user)
+        response = self.client.post(reverse('menu_import'), {
+            'menu_file': SimpleUploadedFile('menu.csv', MENU_CSV.encode()),
+            'images': SimpleUploadedFile('images.zip',
+                                         images_zip('margherita.png', 'diavola.png', 'water.png').getvalue()),
+        })
+
+        self.assertRedirects(response, reverse('catalog_builder'), fetch_redirect_response=False)
+        self.assertEqual(FoodItem.objects.filter(vendor=self.vendor).count(), 4)
+
+        response = self.client.get(reverse('menu_export'), {'format': 'csv'})
+        self.assertIn('Pizzas,Stone oven,Margherita', b''.join(response.streaming_content).decode())
@@ -0,0 +1,88 @@
+import asyncio
+import threading
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from accounts.models import User
+from CoreRoot import async_support
+from CoreRoot.async_support import database_sync_to_async, get_executor
+from CoreRoot.queries import observe_queries
+from marketplace.models import Cart
+from marketplace.views import AddToCartView, SearchView
+from tests.performance.data import create_user, create_vendor
+
+AJAX = {'HTTP_X_REQUESTED_WITH': 'XMLHttpRequest'}
+
+
+class DatabaseSyncToAsyncTest(SimpleTestCase):
+    @override_settings(ASYNC_DB_THREADS=2)
+    def test_runs_on_the_database_pool(self):
+        thread_name = async_to_sync(database_sync_to_async(lambda: threading.current_thread().name))()
+        self.assertTrue(thread_name.startswith('async-db'))
+
+    @override_settings(ASYNC_DB_THREADS=2)
+    def test_concurrent_first_calls_share_one_pool(self):
+        barrier = threading.Barrier(8)
+        pools = []
+
+        def first_call():
+            barrier.wait()
+            pools.append(get_executor())
+
+        with mock.patch.object(async_support, '_executor', None):
+            threads = [threading.Thread(target=first_call) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            pools[0].shutdown()
+
+        self.assertEqual(len({id(pool) for pool in pools}), 1)
+
+    @override_settings(ASYNC_DB_THREADS=0)
+    def test_runs_in_the_calling_thread_without_pool(self):
+        thread = async_to_sync(database_sync_to_async(threading.current_thread))()
+        self.assertIs(thread, threading.current_thread())
+
+
+@override_settings(ASYNC_DB_THREADS=0, DATABASE_REPLICAS=[])
+class AsyncViewTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.vendor = create_vendor(1)
+        cls.customer = create_user('customer', User.CUSTOMER)
+
+    def test_views_are_coroutine_functions(self):
+        self.assertTrue(asyncio.iscoroutinefunction(AddToCartView.as_view()))
+        self.assertTrue(asyncio.iscoroutinefunction(SearchView.as_view()))
+
+    def test_add_to_cart_through_asgi_handler(self):
+        self.async_client.force_login(self.customer)
+        product_item = self.vendor.fooditem_set.first()
+
+        response = async_to_sync(self.async_client.get)(reverse('add_to_cart', args=[product_item.pk]), **AJAX)
+
+        self.assertEqual(response.json()['status'], 'Success')
+        self.assertEqual(Cart.objects.get(user=self.customer, product_item=product_item).quantity, 1)
+
+    def test_search_renders_through_asgi_handler(self):
+        response = async_to_sync(self.async_client.get)(reverse('search'), {
+            'address': 'Madrid', 'lat': '', 'lng': '', 'radius': '', 'keyword': self.vendor.vendor_name,
+        })
+
+        self.assertContains(response, self.vendor.vendor_name)
+
+    def test_queries_in_the_pool_are_observed(self):
+        observed = []
+
+        async def run():
+            with observe_queries(lambda sql, *args: observed.append(sql)):
+                await database_sync_to_async(Cart.objects.count)()
+
+        async_to_sync(run)()
+        self.assertEqual(len(observed), 1)
+        self.assertIn(connection.ops.quote_name('marketplace_cart'), observed[0])
@@ -0,0 +1,99 @@
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounts.models import User, UserProfile
+from CoreRoot.caching import check_shared_cache
+from tests.performance.data import create_user, create_vendor
+from vendor.models import Vendor
+
+
+class UserCacheManagerTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.vendor = create_vendor(1)
+        cls.customer = create_user('customer', User.CUSTOMER)
+
+    def setUp(self):
+        cache.clear()
+
+    def fresh_user(self, user):
+        """A new instance of the user, like request.user in the next request."""
+        return User.objects.get(pk=user.pk)
+
+    def test_memoized_on_user_and_cached_across_instances(self):
+        user = self.fresh_user(self.vendor.user)
+        with self.assertNumQueries(1):
+            self.assertEqual(Vendor.objects.get_for_user(user), self.vendor)
+            self.assertIs(Vendor.objects.get_for_user(user), Vendor.objects.get_for_user(user))
+        user = self.fresh_user(self.vendor.user)
+        with self.assertNumQueries(0):
+            self.assertEqual(Vendor.objects.get_for_user(user), self.vendor)
+
+    def test_missing_rows_are_cached(self):
+        first, second = self.fresh_user(self.customer), self.fresh_user(self.customer)
+        with self.assertNumQueries(1):
+            with self.assertRaises(Vendor.DoesNotExist):
+                Vendor.objects.get_for_user(first)
+        with self.assertNumQueries(0):
+            with self.assertRaises(Vendor.DoesNotExist):
+                Vendor.objects.get_for_user(second)
+
+    def test_anonymous_user_does_not_query(self):
+        with self.assertNumQueries(0):
+            with self.assertRaises(UserProfile.DoesNotExist):
+                UserProfile.objects.get_for_user(AnonymousUser())
+
+    def test_save_invalidates(self):
+        Vendor.objects.get_for_user(self.fresh_user(self.vendor.user))
+        vendor = Vendor.objects.get(pk=self.vendor.pk)
+        vendor.vendor_name = 'Renamed'
+        vendor.save()
+
+        self.assertEqual(Vendor.objects.get_for_user(self.fresh_user(self.vendor.user)).vendor_name, 'Renamed')
+
+    def test_create_and_delete_invalidate(self):
+        user = create_user('newvendor', User.VENDOR)
+        with self.assertRaises(Vendor.DoesNotExist):
+            Vendor.objects.get_for_user(self.fresh_user(user))
+
+        vendor = Vendor.objects.create(user=user, user_profile=user.userprofile, vendor_name='New',
+                                       vendor_slug='new', vendor_license='vendor/license/license.pdf')
+        self.assertEqual(Vendor.objects.get_for_user(self.fresh_user(user)), vendor)
+
+        vendor.delete()
+        with self.assertRaises(Vendor.DoesNotExist):
+            Vendor.objects.get_for_user(self.fresh_user(user))
+
+    def test_repeat_vendor_request_skips_identity_queries(self):
+        url = reverse('product_edit', args=[self.vendor.fooditem_set.first().pk])
+        self.client.force_login(self.vendor.user)
+        self.client.get(url)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+
+        self.assertEqual(response.context['vendor'], self.vendor)
+        self.assertEqual(response.context['vendor'].user_profile, self.vendor.user_profile)
+        identity_lookups = [
+            query['sql'] for query in queries.captured_queries
+            if '"vendor_vendor"."user_id" =' in query['sql'] or '"accounts_userprofile"."user_id" =' in query['sql']
+        ]
+        self.assertEqual(identity_lookups, [])
+
+
+class SharedCacheCheckTest(SimpleTestCase):
+    LOCMEM = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+    MEMCACHED = {'default': {'BACKEND': 'django.core.cache.backends.memcached.PyLibMCCache',
+                             'LOCATION': '127.0.0.1:11211'}}
+
+    def test_per_process_cache_is_refused_outside_debug(self):
+        with override_settings(DEBUG=False, CACHES=self.LOCMEM):
+            self.assertEqual([error.id for error in check_shared_cache(None)], ['CoreRoot.E001'])
+        with override_settings(DEBUG=True, CACHES=self.LOCMEM):
+            self.assertEqual(check_shared_cache(None), [])
+        with override_settings(DEBUG=False, CACHES=self.MEMCACHED):
+            self.assertEqual(check_shared_cache(None), [])
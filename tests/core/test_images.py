@@ -0,0 +1,136 @@
+import io
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from accounts.models import User, UserProfile
+from catalog.management.commands.regenerate_images import Command as RegenerateImagesCommand
+from CoreRoot.images import build_variants, update_image_variants
+from tests.performance.data import create_user
+
+
+def upload(name='photo.png', color=(200, 50, 50)):
+    buffer = io.BytesIO()
+    Image.new('RGBA', (400, 300), color + (128,)).save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+def variant_names(variants):
+    return {name for formats in variants.values() for name in formats.values()}
+
+
+@override_settings(IMAGE_VARIANT_THREADS=0, DATABASE_REPLICAS=[])
+class ImageVariantsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('customer', User.CUSTOMER)
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.profile = UserProfile.objects.get(user=self.user)
+
+    def run_committed(self, func):
+        """Run func, then its on_commit callbacks and the ones those register, as a real commit would."""
+        with self.captureOnCommitCallbacks() as callbacks:
+            func()
+        while callbacks:
+            pending, callbacks = callbacks, []
+            for callback in pending:
+                with self.captureOnCommitCallbacks() as registered:
+                    callback()
+                callbacks += registered
+
+    def save_picture(self, picture):
+        self.profile = UserProfile.objects.get(pk=self.profile.pk)
+        self.profile.profile_picture = picture
+        self.run_committed(self.profile.save)
+        return UserProfile.objects.get(pk=self.profile.pk).image_variants
+
+    def test_build_variants_sizes_formats_and_reuse(self):
+        name = default_storage.save('users/photo.png', upload())
+
+        variants = build_variants(name, ('thumb', 'card'))
+
+        self.assertEqual(set(variants), {'thumb', 'card'})
+        self.assertEqual(set(variants['thumb']), {'jpeg', 'webp'})
+        with default_storage.open(variants['thumb']['jpeg']) as file, Image.open(file) as image:
+            self.assertEqual((image.format, image.size), ('JPEG', (160, 160)))
+        # Same content, same names: nothing is encoded or stored again.
+        self.assertEqual(build_variants(name, ('thumb', 'card')), variants)
+
+    def test_variants_are_built_after_the_save_commits(self):
+        self.profile.profile_picture = upload()
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.profile.save()
+
+        self.assertEqual(UserProfile.objects.get(pk=self.profile.pk).image_variants, {})
+        for callback in callbacks:
+            callback()
+        variants = UserProfile.objects.get(pk=self.profile.pk).image_variants['profile_picture']
+        self.assertEqual(set(variants), {'thumb', 'card'})
+        self.assertTrue(all(default_storage.exists(name) for name in variant_names(variants)))
+
+    def test_replaced_image_variants_are_deleted(self):
+        old = variant_names(self.save_picture(upload())['profile_picture'])
+
+        new = variant_names(self.save_picture(upload('other.png', (10, 10, 200)))['profile_picture'])
+
+        self.assertFalse(old & new)
+        self.assertFalse(any(default_storage.exists(name) for name in old))
+        self.assertTrue(all(default_storage.exists(name) for name in new))
+
+    def test_cleared_image_drops_its_variants(self):
+        old = variant_names(self.save_picture(upload())['profile_picture'])
+
+        image_variants = self.save_picture(None)
+
+        self.assertNotIn('profile_picture', image_variants)
+        self.assertFalse(any(default_storage.exists(name) for name in old))
+
+    def test_picture_tag_prefers_the_variants(self):
+        self.save_picture(upload())
+        profile = UserProfile.objects.get(pk=self.profile.pk)
+        template = Template("{% load image_variants %}{% picture profile 'profile_picture' 'thumb' alt='Me' %}")
+
+        html = template.render(Context({'profile': profile}))
+
+        self.assertIn('type="image/webp"', html)
+        self.assertIn(profile.image_variants['profile_picture']['thumb']['jpeg'], html)
+
+    def test_image_replaced_during_the_build_is_left_to_the_later_job(self):
+        self.save_picture(upload())
+        first = UserProfile.objects.get(pk=self.profile.pk)
+
+        def build_then_replace(name, sizes):
+            # Another save stores a newer image while these variants are built.
+            UserProfile.objects.filter(pk=first.pk).update(profile_picture='users/profile_pictures/newer.png')
+            return build_variants(name, sizes)
+
+        with mock.patch('CoreRoot.images.build_variants', build_then_replace):
+            self.run_committed(lambda: update_image_variants(UserProfile, first.pk, ['profile_picture']))
+
+        self.assertEqual(UserProfile.objects.get(pk=first.pk).image_variants, first.image_variants)
+
+    def test_regenerated_variants_of_a_replaced_image_are_not_recorded(self):
+        self.save_picture(upload())
+        old_source = UserProfile.objects.get(pk=self.profile.pk).profile_picture.name
+        # Built by a regenerate_images worker while the image is uploaded again.
+        stale = build_variants(old_source, ('thumb', 'card'))
+        new = self.save_picture(upload('other.png', (10, 10, 200)))['profile_picture']
+
+        self.run_committed(lambda: RegenerateImagesCommand.save_variants(
+            UserProfile, self.profile.pk, {'profile_picture': old_source}, {'profile_picture': stale}))
+
+        self.assertEqual(UserProfile.objects.get(pk=self.profile.pk).image_variants['profile_picture'], new)
+        self.assertTrue(all(default_storage.exists(name) for name in variant_names(new)))
+        self.assertFalse(any(default_storage.exists(name) for name in variant_names(stale)))
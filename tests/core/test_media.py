@@ -0,0 +1,178 @@
+import os
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils.http import http_date
+
+from accounts.models import User
+from CoreRoot.views import parse_range
+from tests.performance.data import create_user, create_vendor
+from vendor.models import Vendor
+
+CONTENT = bytes(range(256)) * 4
+
+
+class ParseRangeTest(SimpleTestCase):
+    def test_ranges(self):
+        cases = [
+            ('bytes=0-99', 1024, (0, 99)),
+            ('bytes=1000-', 1024, (1000, 1023)),
+            ('bytes=1000-5000', 1024, (1000, 1023)),
+            ('bytes=-100', 1024, (924, 1023)),
+            ('bytes=-5000', 1024, (0, 1023)),
+            (' bytes=5-5 ', 1024, (5, 5)),
+        ]
+        for header, size, expected in cases:
+            with self.subTest(header=header):
+                self.assertEqual(parse_range(header, size), expected)
+
+    def test_unusable_ranges_are_ignored(self):
+        for header in ('bytes=-', 'bytes=0-10,20-30', 'items=0-10', 'bytes=a-b', ''):
+            with self.subTest(header=header):
+                self.assertIsNone(parse_range(header, 1024))
+
+    def test_unsatisfiable_ranges(self):
+        cases = [
+            ('bytes=1024-', 1024),
+            ('bytes=20-10', 1024),
+            ('bytes=-0', 1024),
+            ('bytes=0-', 0),
+            # An empty file has no last bytes.
+            ('bytes=-100', 0),
+        ]
+        for header, size in cases:
+            with self.subTest(header=header, size=size):
+                self.assertIs(parse_range(header, size), False)
+
+
+class MediaViewTest(SimpleTestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        os.makedirs(os.path.join(self.media_root, 'food_images'))
+        self.path = os.path.join(self.media_root, 'food_images', 'dish one.jpg')
+        with open(self.path, 'wb') as file:
+            file.write(CONTENT)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root, MEDIA_SENDFILE_BACKEND='',
+                                              SERVE_MEDIA_FILES=True)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.url = reverse('media', args=['food_images/dish one.jpg'])
+
+    def get(self, **headers):
+        return self.client.get(self.url, **headers)
+
+    def test_full_response_with_validators(self):
+        response = self.get()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), CONTENT)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('ETag', response)
+        self.assertIn('max-age=', response['Cache-Control'])
+
+    def test_byte_ranges(self):
+        response = self.get(HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), CONTENT[10:20])
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{len(CONTENT)}')
+        self.assertEqual(response['Content-Length'], '10')
+
+        response = self.get(HTTP_RANGE='bytes=-24')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), CONTENT[-24:])
+
+    def test_unsatisfiable_range(self):
+        response = self.get(HTTP_RANGE=f'bytes={len(CONTENT)}-')
+
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(CONTENT)}')
+
+    def test_stale_if_range_sends_the_whole_file(self):
+        response = self.get(HTTP_RANGE='bytes=10-19', HTTP_IF_RANGE='"stale"')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), CONTENT)
+
+    def test_not_modified(self):
+        etag = self.get()['ETag']
+
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH='"other"').status_code, 200)
+        mtime = os.stat(self.path).st_mtime
+        self.assertEqual(self.get(HTTP_IF_MODIFIED_SINCE=http_date(mtime + 60)).status_code, 304)
+        self.assertEqual(self.get(HTTP_IF_MODIFIED_SINCE=http_date(mtime - 60)).status_code, 200)
+
+    def test_missing_files_and_paths_outside_media_root(self):
+        self.assertEqual(self.client.get(reverse('media', args=['food_images/missing.jpg'])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('media', args=['../settings.py'])).status_code, 404)
+
+    @override_settings(MEDIA_SENDFILE_BACKEND='nginx', MEDIA_ACCEL_REDIRECT_PREFIX='/protected-media/')
+    def test_nginx_offload(self):
+        response = self.get()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/food_images/dish%20one.jpg')
+        self.assertEqual(response.content, b'')
+        self.assertIn('ETag', response)
+
+    @override_settings(MEDIA_SENDFILE_BACKEND='xsendfile')
+    def test_xsendfile_offload(self):
+        response = self.get()
+
+        self.assertEqual(response['X-Sendfile'], self.path)
+        self.assertEqual(response.content, b'')
+
+    @override_settings(MEDIA_SENDFILE_BACKEND='apache')
+    def test_unknown_backend_is_rejected(self):
+        with self.assertRaises(ImproperlyConfigured):
+            self.get()
+
+    @override_settings(SERVE_MEDIA_FILES=False, DEBUG=False)
+    def test_not_served_unless_enabled(self):
+        self.assertEqual(self.get().status_code, 404)
+
+
+@override_settings(SERVE_MEDIA_FILES=True, MEDIA_SENDFILE_BACKEND='', DATABASE_REPLICAS=[])
+class PrivateMediaTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.vendor = create_vendor(1)
+        cls.other_vendor = create_vendor(2)
+        Vendor.objects.filter(pk=cls.other_vendor.pk).update(vendor_license='vendor/license/other.pdf')
+        cls.staff = create_user('staff', User.CUSTOMER)
+        User.objects.filter(pk=cls.staff.pk).update(is_staff=True)
+
+    def setUp(self):
+        cache.clear()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        os.makedirs(os.path.join(media_root, 'vendor', 'license'))
+        os.makedirs(os.path.join(media_root, 'food_images'))
+        with open(os.path.join(media_root, self.vendor.vendor_license.name), 'wb') as file:
+            file.write(CONTENT)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.url = reverse('media', args=[self.vendor.vendor_license.name])
+
+    def test_license_is_hidden_from_anonymous_users_and_other_vendors(self):
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        traversal = reverse('media', args=[f'food_images/../{self.vendor.vendor_license.name}'])
+        self.assertEqual(self.client.get(traversal).status_code, 404)
+        self.client.force_login(self.other_vendor.user)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_license_is_served_privately_to_staff_and_its_vendor(self):
+        for user in (User.objects.get(pk=self.staff.pk), self.vendor.user):
+            with self.subTest(user=user.username):
+                self.client.force_login(user)
+                response = self.client.get(self.url)
+
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response['Cache-Control'], 'private, no-cache')
@@ -0,0 +1,97 @@
+import os
+import re
+import shutil
+import tempfile
+
+import simplejson as json
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from CoreRoot import metrics
+
+
+AUTHORIZATION = {'HTTP_AUTHORIZATION': 'Bearer scrape-token'}
+
+
+@override_settings(METRICS_ENABLED=True, METRICS_TOKEN='scrape-token')
+class MetricsTest(TestCase):
+    def setUp(self):
+        self.metrics_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.metrics_dir)
+        settings_override = override_settings(METRICS_DIR=self.metrics_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def sample(self, line):
+        """Value of a sample line such as 'name{label="value"}' in the scrape output, 0 when absent."""
+        match = re.search(rf'^{re.escape(line)} (\S+)$', metrics.render(), re.MULTILINE)
+        return float(match.group(1)) if match else 0
+
+    def test_counters_are_summed_across_worker_files(self):
+        line = 'cart_operations_total{action="add"}'
+        before = self.sample(line)
+        metrics.cart_operations.inc(action='add')
+        # Another worker's file.
+        with open(os.path.join(self.metrics_dir, '99999-other.json'), 'w') as file:
+            json.dump([['cart_operations_total', [['action', 'add']], 2.0]], file)
+
+        self.assertEqual(self.sample(line), before + 3)
+
+    def test_request_latency_histogram_per_url_name(self):
+        count = 'http_request_duration_seconds_count{url_name="home",method="GET"}'
+        infinite_bucket = 'http_request_duration_seconds_bucket{url_name="home",method="GET",le="+Inf"}'
+        before = self.sample(count)
+
+        self.client.get(reverse('home'))
+
+        self.assertEqual(self.sample(count), before + 1)
+        self.assertEqual(self.sample(infinite_bucket), self.sample(count))
+        self.assertGreater(self.sample('db_queries_per_request_count{url_name="home"}'), 0)
+
+    def test_unknown_methods_share_one_label_value(self):
+        count = 'http_request_duration_seconds_count{url_name="home",method="other"}'
+        before = self.sample(count)
+
+        self.client.generic('BREW', reverse('home'))
+        self.client.generic('PROPFIND', reverse('home'))
+
+        self.assertEqual(self.sample(count), before + 2)
+        self.assertNotIn('BREW', metrics.render())
+
+    def test_endpoint_format_and_gauges(self):
+        response = self.client.get(reverse('metrics'), **AUTHORIZATION)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        text = response.content.decode()
+        self.assertIn('# TYPE http_request_duration_seconds histogram', text)
+        self.assertIn('# TYPE cart_operations_total counter', text)
+        self.assertIn('orders_awaiting_vendor 0', text)
+        self.assertIn('images_pending_variants{model="fooditem"} 0', text)
+
+    def test_endpoint_requires_the_token(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 404)
+        self.assertEqual(self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer wrong').status_code, 404)
+        # The proxied address of every public request does not open it.
+        self.assertEqual(self.client.get(reverse('metrics'), REMOTE_ADDR='127.0.0.1').status_code, 404)
+
+    @override_settings(METRICS_TOKEN='')
+    def test_endpoint_is_closed_without_a_token(self):
+        self.assertEqual(self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer ').status_code, 404)
+
+    @override_settings(METRICS_ENABLED=False)
+    def test_nothing_is_recorded_while_disabled(self):
+        metrics.cart_operations.inc(action='disabled')
+
+        self.assertNotIn('disabled', metrics.render())
+        self.assertEqual(self.client.get(reverse('metrics'), **AUTHORIZATION).status_code, 404)
+
+    def test_forked_process_starts_from_zero(self):
+        metrics.cart_operations.inc(action='add')
+        pid = metrics.store.pid
+        metrics.store.pid = -1
+        self.addCleanup(setattr, metrics.store, 'pid', pid)
+
+        metrics.cart_operations.inc(action='delete')
+
+        self.assertEqual(dict(metrics.store.values), {('cart_operations_total', (('action', 'delete'),)): 1})
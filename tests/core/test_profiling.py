@@ -0,0 +1,74 @@
+import json
+
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from accounts.models import User
+from CoreRoot.profiling import profiling_middleware
+
+
+@override_settings(PROFILING_SAMPLE_RATE=1.0, PROFILING_SLOW_QUERY_MS=10_000)
+class ProfilingMiddlewareTest(TestCase):
+    def test_disabled_when_sample_rate_is_zero(self):
+        with override_settings(PROFILING_SAMPLE_RATE=0):
+            with self.assertRaises(MiddlewareNotUsed):
+                profiling_middleware(lambda request: HttpResponse())
+
+    def test_server_timing_and_log_line(self):
+        with self.assertLogs('CoreRoot.profiling', 'INFO') as logs:
+            response = self.client.get(reverse('home'))
+
+        timing = response['Server-Timing']
+        for metric in ('db;dur=', 'tpl;dur=', 'cp;dur=', 'cache;desc=', 'total;dur='):
+            self.assertIn(metric, timing)
+        line = json.loads(logs.records[0].getMessage())
+        self.assertEqual(line['url_name'], 'home')
+        self.assertEqual(line['status'], 200)
+        self.assertGreater(line['queries'], 0)
+        self.assertGreater(line['template_ms'], 0)
+
+    def test_cache_hits_and_misses(self):
+        def view(request):
+            cache.get('profiling-test')
+            cache.set('profiling-test', 1)
+            cache.get('profiling-test')
+            cache.get_many(['profiling-test', 'profiling-other'])
+            return HttpResponse()
+
+        with self.assertLogs('CoreRoot.profiling', 'INFO') as logs:
+            response = profiling_middleware(view)(RequestFactory().get('/'))
+
+        self.assertIn('cache;desc="2 hits 2 misses"', response['Server-Timing'])
+        line = json.loads(logs.records[0].getMessage())
+        self.assertEqual((line['cache_hits'], line['cache_misses']), (2, 2))
+
+    @override_settings(PROFILING_SLOW_QUERY_MS=0)
+    def test_slow_queries_are_logged_with_explain(self):
+        def view(request):
+            User.objects.filter(email='nobody@example.com').exists()
+            return HttpResponse()
+
+        with self.assertLogs('CoreRoot.profiling', 'WARNING') as logs:
+            profiling_middleware(view)(RequestFactory().get('/'))
+
+        slow = json.loads(logs.records[0].getMessage())
+        self.assertIn('accounts_user', slow['sql'])
+        self.assertIn('Scan', slow['explain'])
+
+    @override_settings(PROFILING_SLOW_QUERY_MS=0)
+    def test_slow_query_params_are_logged_only_for_selects(self):
+        def view(request):
+            User.objects.filter(email='nobody@example.com').exists()
+            User.objects.filter(email='nobody@example.com').update(password='secret-hash')
+            return HttpResponse()
+
+        with self.assertLogs('CoreRoot.profiling', 'WARNING') as logs:
+            profiling_middleware(view)(RequestFactory().get('/'))
+
+        slow = {line['sql'].split()[0]: line for line in map(json.loads, (r.getMessage() for r in logs.records))}
+        self.assertEqual(slow['SELECT']['params'], ['nobody@example.com'])
+        self.assertEqual(slow['UPDATE']['params'], '<redacted>')
+        self.assertNotIn('secret-hash', ''.join(record.getMessage() for record in logs.records))
@@ -0,0 +1,67 @@
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from accounts.models import User
+from catalog.models import FoodItem
+from CoreRoot.routers import PrimaryReplicaRouter, replica_pinning_middleware
+from marketplace.models import Cart
+from vendor.models import Vendor
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class PrimaryReplicaRouterTest(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.router = PrimaryReplicaRouter()
+
+    def run_request(self, request, view):
+        """Run the view inside the pinning middleware and return its response."""
+        return replica_pinning_middleware(view)(request)
+
+    def test_catalog_reads_use_replica(self):
+        def view(request):
+            self.assertEqual(Vendor.objects.all().db, 'replica1')
+            self.assertEqual(FoodItem.objects.all().db, 'replica1')
+            return HttpResponse()
+
+        self.run_request(self.factory.get('/marketplace/'), view)
+
+    def test_other_models_read_from_primary(self):
+        def view(request):
+            self.assertEqual(Cart.objects.all().db, 'default')
+            self.assertEqual(User.objects.all().db, 'default')
+            return HttpResponse()
+
+        self.run_request(self.factory.get('/marketplace/'), view)
+
+    def test_write_pins_rest_of_request_and_sets_cookie(self):
+        def view(request):
+            self.assertEqual(self.router.db_for_write(Vendor), 'default')
+            self.assertEqual(Vendor.objects.all().db, 'default')
+            return HttpResponse()
+
+        response = self.run_request(self.factory.get('/marketplace/'), view)
+        self.assertIn('db_pin', response.cookies)
+
+    def test_pin_cookie_keeps_reads_on_primary(self):
+        def view(request):
+            self.assertEqual(Vendor.objects.all().db, 'default')
+            return HttpResponse()
+
+        request = self.factory.get('/marketplace/')
+        request.COOKIES['db_pin'] = '1'
+        response = self.run_request(request, view)
+        # No write happened, so the pin window is not extended.
+        self.assertNotIn('db_pin', response.cookies)
+
+    def test_unsafe_methods_and_primary_only_paths_are_pinned(self):
+        def view(request):
+            self.assertEqual(Vendor.objects.all().db, 'default')
+            return HttpResponse()
+
+        self.run_request(self.factory.post('/marketplace/'), view)
+        self.run_request(self.factory.get('/checkout'), view)
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas_everything_uses_primary(self):
+        self.assertEqual(self.router.db_for_read(Vendor), 'default')
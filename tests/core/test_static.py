@@ -0,0 +1,142 @@
+import gzip
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+import simplejson as json
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+
+from CoreRoot.static_serving import IMMUTABLE_CACHE_CONTROL, PrecompressedStaticFiles, accepted_encodings
+
+CSS = '/* theme */\nbody {\n    color: red;\n}\n\n/*! licence */\n.title  {  margin: 0 ; }\n' * 20
+JS = 'function add(a, b) {\n    // sum\n    return a + b;\n}\n' * 20
+
+
+class CollectStaticTest(SimpleTestCase):
+    def setUp(self):
+        self.source = tempfile.mkdtemp()
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.source)
+        self.addCleanup(shutil.rmtree, self.root)
+        os.makedirs(os.path.join(self.source, 'css'))
+        with open(os.path.join(self.source, 'css', 'style.css'), 'w') as file:
+            file.write(CSS)
+        with open(os.path.join(self.source, 'app.js'), 'w') as file:
+            file.write(JS)
+        with open(os.path.join(self.source, 'tiny.txt'), 'w') as file:
+            file.write('x')
+        settings_override = override_settings(
+            STATIC_ROOT=self.root, STATICFILES_DIRS=[self.source],
+            STATICFILES_FINDERS=['django.contrib.staticfiles.finders.FileSystemFinder'],
+            STATIC_MANIFEST_STRICT=True,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        call_command('collectstatic', interactive=False, verbosity=0)
+        with open(os.path.join(self.root, 'staticfiles.json')) as file:
+            self.paths = json.load(file)['paths']
+
+    def read(self, name, mode='r'):
+        with open(os.path.join(self.root, name), mode) as file:
+            return file.read()
+
+    def test_css_is_minified_before_hashing(self):
+        hashed = self.paths['css/style.css']
+        css = self.read(hashed)
+
+        self.assertNotIn('/* theme */', css)
+        self.assertIn('/*! licence */', css)
+        self.assertLess(len(css), len(CSS))
+        self.assertEqual(staticfiles_storage.url('css/style.css'), f'/static/{hashed}')
+
+    def test_compressed_siblings_match_the_hashed_file(self):
+        hashed = self.paths['app.js']
+
+        self.assertEqual(gzip.decompress(self.read(f'{hashed}.gz', 'rb')), self.read(hashed, 'rb'))
+        # Compressing one byte saves nothing, no sibling is written.
+        self.assertFalse(os.path.exists(os.path.join(self.root, self.paths['tiny.txt'] + '.gz')))
+
+    def test_strict_manifest_fails_on_files_never_collected(self):
+        with self.assertRaises(ValueError):
+            staticfiles_storage.url('css/missing.css')
+
+    @override_settings(STATIC_MANIFEST_STRICT=False)
+    def test_plain_name_served_without_hashing_outside_strict_mode(self):
+        with mock.patch.object(type(staticfiles_storage._wrapped), 'hashed_name') as hashed_name:
+            self.assertEqual(staticfiles_storage.url('css/missing.css'), '/static/css/missing.css')
+            self.assertEqual(staticfiles_storage.url('css/style.css'), f'/static/{self.paths["css/style.css"]}')
+        hashed_name.assert_not_called()
+
+
+class PrecompressedStaticFilesTest(SimpleTestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        os.makedirs(os.path.join(self.root, 'css'))
+        self.name = 'css/style.0a1b2c3d4e5f.css'
+        with open(os.path.join(self.root, self.name), 'w') as file:
+            file.write(CSS)
+        with open(os.path.join(self.root, self.name + '.gz'), 'wb') as file:
+            file.write(gzip.compress(CSS.encode()))
+        self.application = PrecompressedStaticFiles(self.fallback, self.root, '/static/')
+
+    @staticmethod
+    def fallback(environ, start_response):
+        start_response('404 Not Found', [])
+        return [b'django']
+
+    def request(self, path, method='GET', **environ):
+        response = {}
+
+        def start_response(status, headers):
+            response['status'] = status
+            response['headers'] = dict(headers)
+
+        body = b''.join(self.application({'PATH_INFO': path, 'REQUEST_METHOD': method, **environ}, start_response))
+        return response['status'], response['headers'], body
+
+    def test_precompressed_sibling_for_accepting_clients(self):
+        status, headers, body = self.request(f'/static/{self.name}', HTTP_ACCEPT_ENCODING='br, gzip')
+
+        self.assertEqual(status, '200 OK')
+        self.assertEqual(headers['Content-Encoding'], 'gzip')
+        self.assertEqual(headers['Vary'], 'Accept-Encoding')
+        self.assertEqual(headers['Content-Type'], 'text/css')
+        self.assertEqual(headers['Cache-Control'], IMMUTABLE_CACHE_CONTROL)
+        self.assertEqual(gzip.decompress(body), CSS.encode())
+        self.assertEqual(headers['Content-Length'], str(len(body)))
+
+    def test_identity_for_other_clients(self):
+        for accept in ('', 'gzip;q=0, deflate'):
+            with self.subTest(accept=accept):
+                status, headers, body = self.request(f'/static/{self.name}', HTTP_ACCEPT_ENCODING=accept)
+                self.assertNotIn('Content-Encoding', headers)
+                self.assertEqual(body, CSS.encode())
+
+    def test_not_modified_and_head(self):
+        _, headers, _ = self.request(f'/static/{self.name}')
+
+        status, _, body = self.request(f'/static/{self.name}', HTTP_IF_NONE_MATCH=headers['ETag'])
+        self.assertEqual((status, body), ('304 Not Modified', b''))
+        status, headers, body = self.request(f'/static/{self.name}', method='HEAD')
+        self.assertEqual((status, body), ('200 OK', b''))
+        self.assertEqual(headers['Content-Length'], str(len(CSS)))
+
+    def test_unhashed_names_get_a_short_cache(self):
+        shutil.copy(os.path.join(self.root, self.name), os.path.join(self.root, 'css', 'plain.css'))
+
+        _, headers, _ = self.request('/static/css/plain.css')
+
+        self.assertNotEqual(headers['Cache-Control'], IMMUTABLE_CACHE_CONTROL)
+
+    def test_other_requests_reach_the_application(self):
+        for path, method in (('/static/css/missing.css', 'GET'), ('/static/../secret.txt', 'GET'),
+                             (f'/static/{self.name}', 'POST'), ('/media/photo.jpg', 'GET')):
+            with self.subTest(path=path, method=method):
+                self.assertEqual(self.request(path, method)[2], b'django')
+
+    def test_accepted_encodings(self):
+        self.assertEqual(accepted_encodings('gzip, BR;q=0.5, deflate;q=0'), {'gzip', 'br'})
@@ -0,0 +1,171 @@
+import io
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import DatabaseError
+from django.db.models import Model
+from django.test import TestCase, TransactionTestCase, override_settings
+from PIL import Image
+
+from accounts.models import User, UserProfile
+from tests.performance.data import create_user, create_vendor
+from vendor.models import Vendor
+
+
+def upload(name):
+    buffer = io.BytesIO()
+    Image.new('RGB', (40, 30), (200, 50, 50)).save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+@override_settings(DATABASE_REPLICAS=[])
+class LoadedValuesTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.vendor = create_vendor(1)
+
+    def get_vendor(self, queryset=None):
+        return (queryset or Vendor.objects).get(pk=self.vendor.pk)
+
+    def test_changes_are_detected_without_queries(self):
+        vendor = self.get_vendor()
+        with self.assertNumQueries(0):
+            self.assertFalse(vendor.has_changed('is_approved'))
+            self.assertTrue(vendor.get_loaded_value('is_approved'))
+            vendor.is_approved = False
+            self.assertTrue(vendor.has_changed('is_approved'))
+            vendor.is_approved = True
+            self.assertFalse(vendor.has_changed('is_approved'))
+
+    def test_deferred_field_is_fetched_once(self):
+        vendor = self.get_vendor(Vendor.objects.only('id', 'vendor_name'))
+        with self.assertNumQueries(1):
+            self.assertTrue(vendor.get_loaded_value('is_approved'))
+            self.assertTrue(vendor.get_loaded_value('is_approved'))
+
+    def test_unsaved_instance_has_changed(self):
+        self.assertTrue(Vendor(vendor_name='New').has_changed('is_approved'))
+
+    def test_save_takes_a_new_snapshot(self):
+        vendor = self.get_vendor()
+        vendor.is_approved = False
+        vendor.save()
+
+        self.assertFalse(vendor.has_changed('is_approved'))
+        self.assertFalse(vendor.get_loaded_value('is_approved'))
+
+    def test_update_fields_only_snapshot_the_saved_fields(self):
+        vendor = self.get_vendor()
+        vendor.is_approved = False
+        vendor.vendor_name = 'Renamed'
+        vendor.save(update_fields=['vendor_name'])
+
+        # is_approved was not written, it still differs from the stored value.
+        self.assertTrue(vendor.has_changed('is_approved'))
+        self.assertTrue(Vendor.objects.values_list('is_approved', flat=True).get(pk=vendor.pk))
+
+    def test_refresh_from_db_takes_a_new_snapshot(self):
+        vendor = self.get_vendor()
+        Vendor.objects.filter(pk=vendor.pk).update(is_approved=False)
+
+        vendor.refresh_from_db(fields=['is_approved'])
+
+        self.assertFalse(vendor.has_changed('is_approved'))
+        self.assertFalse(vendor.get_loaded_value('is_approved'))
+
+
+@override_settings(DATABASE_REPLICAS=[], IMAGE_VARIANT_THREADS=0)
+class DeleteOldFilesOnSaveTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('customer', User.CUSTOMER)
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        profile = UserProfile.objects.get(user=self.user)
+        profile.profile_picture = upload('first.png')
+        profile.cover_photo = upload('cover.png')
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.save()
+        self.profile = UserProfile.objects.get(pk=profile.pk)
+
+    def test_replaced_file_is_deleted_after_commit(self):
+        old_name = self.profile.profile_picture.name
+        self.profile.profile_picture = upload('second.png')
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.profile.save()
+
+        # Still there until the transaction commits, a rollback keeps the old image usable.
+        self.assertTrue(default_storage.exists(old_name))
+        for callback in callbacks:
+            callback()
+        self.assertFalse(default_storage.exists(old_name))
+        self.assertTrue(default_storage.exists(self.profile.profile_picture.name))
+        # The unchanged field keeps its file.
+        self.assertTrue(default_storage.exists(self.profile.cover_photo.name))
+
+    def test_cleared_file_is_deleted(self):
+        old_name = self.profile.cover_photo.name
+        self.profile.cover_photo = None
+        with self.captureOnCommitCallbacks(execute=True):
+            self.profile.save()
+
+        self.assertFalse(default_storage.exists(old_name))
+
+    def test_unchanged_files_are_kept(self):
+        names = [self.profile.profile_picture.name, self.profile.cover_photo.name]
+        self.profile.city = 'Madrid'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.profile.save()
+
+        self.assertTrue(all(default_storage.exists(name) for name in names))
+
+    def test_deferred_file_field_is_compared_with_the_stored_name(self):
+        old_name = self.profile.profile_picture.name
+        profile = UserProfile.objects.only('id', 'user').get(pk=self.profile.pk)
+        profile.profile_picture = upload('third.png')
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.save()
+
+        self.assertFalse(default_storage.exists(old_name))
+
+
+@override_settings(DATABASE_REPLICAS=[], IMAGE_VARIANT_THREADS=0)
+class DeleteOldFilesInAutocommitTest(TransactionTestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        user = create_user('customer', User.CUSTOMER)
+        profile = UserProfile.objects.get(user=user)
+        profile.profile_picture = upload('first.png')
+        profile.save()
+        self.profile = UserProfile.objects.get(pk=profile.pk)
+        self.old_name = self.profile.profile_picture.name
+
+    def test_replaced_file_is_deleted_after_the_update(self):
+        self.profile.profile_picture = upload('second.png')
+        self.profile.save()
+
+        self.assertFalse(default_storage.exists(self.old_name))
+        stored = UserProfile.objects.values_list('profile_picture', flat=True).get(pk=self.profile.pk)
+        self.assertEqual(stored, self.profile.profile_picture.name)
+
+    def test_failed_save_keeps_the_old_file(self):
+        self.profile.profile_picture = upload('second.png')
+        with mock.patch.object(Model, 'save_base', side_effect=DatabaseError('connection lost')):
+            with self.assertRaises(DatabaseError):
+                self.profile.save()
+
+        self.assertTrue(default_storage.exists(self.old_name))
+        stored = UserProfile.objects.values_list('profile_picture', flat=True).get(pk=self.profile.pk)
+        self.assertEqual(stored, self.old_name)
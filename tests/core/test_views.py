@@ -0,0 +1,42 @@
+from django.conf import settings
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from tests.performance.data import create_vendor
+
+
+class HomeViewLocationTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.near = create_vendor(1)
+        cls.far = create_vendor(900)
+
+    def get_home(self, data=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('home'), data)
+        session_queries = [query['sql'] for query in queries.captured_queries if 'django_session' in query['sql']]
+        self.assertEqual(session_queries, [])
+        return response
+
+    def test_location_is_kept_in_signed_cookie(self):
+        response = self.get_home({'lat': '40.401', 'lng': '-3.701'})
+
+        self.assertIn(settings.LOCATION_COOKIE_NAME, response.cookies)
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, response.cookies)
+        self.assertEqual(list(response.context['vendors']), [self.near, self.far])
+
+        # The next visit without coordinates uses the cookie.
+        response = self.get_home()
+        self.assertEqual([vendor.kms for vendor in response.context['vendors']][0], 0.0)
+
+    def test_tampered_cookie_is_ignored(self):
+        self.client.cookies[settings.LOCATION_COOKIE_NAME] = '40.401,-3.701:forged'
+        response = self.get_home()
+        self.assertFalse(hasattr(response.context['vendors'][0], 'kms'))
+
+    def test_invalid_coordinates_are_ignored(self):
+        response = self.get_home({'lat': 'POINT(0 0)', 'lng': '-3.70'})
+        self.assertNotIn(settings.LOCATION_COOKIE_NAME, response.cookies)
+        self.assertFalse(hasattr(response.context['vendors'][0], 'kms'))
@@ -0,0 +1,67 @@
+from unittest import mock
+
+from django.db.models import QuerySet
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from accounts.models import User
+from marketplace.models import Cart, decrease_cart_quantity, increase_cart_quantity
+from tests.performance.data import create_user, create_vendor
+
+AJAX = {'HTTP_X_REQUESTED_WITH': 'XMLHttpRequest'}
+
+
+@override_settings(DATABASE_REPLICAS=[], ASYNC_DB_THREADS=0)
+class CartQuantityTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.vendor = create_vendor(1)
+        cls.customer = create_user('customer', User.CUSTOMER)
+        cls.item = cls.vendor.fooditem_set.first()
+
+    def quantity(self):
+        return Cart.objects.get(user=self.customer, product_item=self.item).quantity
+
+    def test_increase_adds_the_line_then_increments_it(self):
+        self.assertEqual(increase_cart_quantity(self.customer, self.item)[1], True)
+        cart_item, created = increase_cart_quantity(self.customer, self.item)
+
+        self.assertFalse(created)
+        self.assertEqual(cart_item.quantity, 2)
+        self.assertEqual(self.quantity(), 2)
+
+    def test_line_added_by_a_concurrent_request_is_incremented(self):
+        Cart.objects.create(user=self.customer, product_item=self.item, quantity=1)
+        update = QuerySet.update
+        calls = []
+
+        def update_missing_the_line_once(queryset, **kwargs):
+            calls.append(kwargs)
+            # As if the other request inserted the line right after this update.
+            return 0 if len(calls) == 1 else update(queryset, **kwargs)
+
+        with mock.patch.object(QuerySet, 'update', update_missing_the_line_once):
+            cart_item, created = increase_cart_quantity(self.customer, self.item)
+
+        self.assertFalse(created)
+        self.assertEqual(cart_item.quantity, 2)
+        self.assertEqual(Cart.objects.filter(user=self.customer).count(), 1)
+
+    def test_decrease_removes_the_line_at_the_last_one(self):
+        Cart.objects.create(user=self.customer, product_item=self.item, quantity=2)
+
+        self.assertEqual(decrease_cart_quantity(self.customer, self.item), 1)
+        self.assertEqual(decrease_cart_quantity(self.customer, self.item), 0)
+        self.assertFalse(Cart.objects.filter(user=self.customer).exists())
+        self.assertIsNone(decrease_cart_quantity(self.customer, self.item))
+
+    def test_add_to_cart_view(self):
+        self.client.force_login(self.customer)
+        url = reverse('add_to_cart', args=[self.item.pk])
+
+        first = self.client.get(url, **AJAX).json()
+        second = self.client.get(url, **AJAX).json()
+
+        self.assertEqual((first['message'], first['qty']), ('Added the product to the cart', 1))
+        self.assertEqual((second['message'], second['qty']), ('Increased the cart quantity', 2))
+        self.assertEqual(self.quantity(), 2)
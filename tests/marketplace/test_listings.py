@@ -0,0 +1,92 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from tests.performance.data import create_vendor
+from vendor.models import Vendor, get_listed_vendor_count, set_vendors_approval
+
+
+@override_settings(DATABASE_REPLICAS=[], NOTIFICATION_THREADS=0)
+class ListedVendorCountTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.vendors = [create_vendor(index) for index in range(1, 4)]
+
+    def setUp(self):
+        cache.clear()
+
+    def test_marketplace_with_cached_count_is_two_queries(self):
+        get_listed_vendor_count()
+
+        # The page of vendors and their opening hours of today.
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('marketplace'))
+
+        self.assertEqual(response.context['vendor_count'], 3)
+        self.assertEqual(len(response.context['vendors']), 3)
+
+    def test_count_follows_approval_changes(self):
+        self.assertEqual(get_listed_vendor_count(), 3)
+
+        vendor = Vendor.objects.get(pk=self.vendors[0].pk)
+        vendor.is_approved = False
+        vendor.save()
+        self.assertEqual(get_listed_vendor_count(), 2)
+
+        set_vendors_approval([self.vendors[1].pk], False)
+        self.assertEqual(get_listed_vendor_count(), 1)
+
+    def test_count_follows_user_activation(self):
+        self.assertEqual(get_listed_vendor_count(), 3)
+
+        user = self.vendors[0].user
+        user.is_active = False
+        user.save()
+        self.assertEqual(get_listed_vendor_count(), 2)
+
+    def test_unrelated_saves_keep_the_cached_count(self):
+        self.assertEqual(get_listed_vendor_count(), 3)
+        user = self.vendors[0].user
+        user.save(update_fields=['last_login'])
+        vendor = Vendor.objects.get(pk=self.vendors[0].pk)
+        vendor.vendor_name = 'Renamed'
+        vendor.save()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(get_listed_vendor_count(), 3)
+
+
+@override_settings(DATABASE_REPLICAS=[], ASYNC_DB_THREADS=0)
+class ListingQueryCountTest(TestCase):
+    """Every listing renders its cards from the vendors query and the opening hours prefetch,
+    whatever the number of vendors."""
+    LISTINGS = [
+        ('home', {}),
+        ('home', {'lat': '40.41', 'lng': '-3.70'}),
+        ('marketplace', {}),
+        ('search', {'address': 'Madrid', 'lat': '', 'lng': '', 'radius': '', 'keyword': 'Vendor'}),
+        ('search', {'address': 'Madrid', 'lat': '40.41', 'lng': '-3.70', 'radius': '50', 'keyword': 'Food'}),
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        for index in range(1, 6):
+            create_vendor(index)
+
+    def setUp(self):
+        cache.clear()
+        get_listed_vendor_count()
+
+    def test_listings_are_two_queries(self):
+        for name, params in self.LISTINGS:
+            with self.subTest(name, **params), self.assertNumQueries(2):
+                response = self.client.get(reverse(name), params)
+                self.assertEqual(len(response.context['vendors']), 5)
+
+    def test_listing_defers_unused_columns(self):
+        vendor = Vendor.objects.listed().for_listing().first()
+
+        self.assertTrue({'vendor_license', 'created_at', 'modified_at'} <= vendor.get_deferred_fields())
+        with self.assertNumQueries(0):
+            vendor.user_profile.address
+            vendor.is_open()
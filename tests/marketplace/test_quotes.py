@@ -0,0 +1,126 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounts.models import User
+from marketplace.models import Cart, Tax
+from marketplace.quotes import load_quote, price_cart, sign_quote
+from orders.models import Order, OrderedProduct
+from tests.performance.data import create_tax, create_user, create_vendor, fill_cart
+
+AJAX = {'HTTP_X_REQUESTED_WITH': 'XMLHttpRequest'}
+ORDER_DATA = {
+    'first_name': 'Test', 'last_name': 'Customer', 'phone': '600000000', 'email': 'customer@example.com',
+    'address': 'Calle 1', 'country': 'Spain', 'state': 'Madrid', 'city': 'Madrid', 'pin_code': '28001',
+    'payment_method': 'PayPal',
+}
+
+
+def cart_items(user):
+    return list(Cart.objects.filter(user=user).select_related('product_item__vendor').order_by('created_at'))
+
+
+@override_settings(DATABASE_REPLICAS=[], NOTIFICATION_THREADS=0)
+class CheckoutQuoteTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_tax()
+        cls.vendors = [create_vendor(index) for index in range(1, 3)]
+        cls.customer = create_user('customer', User.CUSTOMER)
+        cls.items = [vendor.fooditem_set.order_by('id').first() for vendor in cls.vendors]
+        fill_cart(cls.customer, cls.items)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.customer)
+
+    def checkout_quote(self):
+        return self.client.get(reverse('checkout')).context['quote']
+
+    def place_order(self, quote):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('place_order'), {**ORDER_DATA, 'quote': quote})
+        tax_queries = [query for query in queries.captured_queries if Tax._meta.db_table in query['sql']]
+        return response, tax_queries
+
+    def test_price_cart_matches_the_stored_order_format(self):
+        quote = price_cart(cart_items(self.customer))
+
+        # Two lines of 2 x 9.50 from two vendors, 21% VAT.
+        self.assertEqual(quote['subtotal'], Decimal('38.00'))
+        self.assertEqual(quote['tax_dict'], {'VAT': {'21.00': Decimal('7.98')}})
+        self.assertEqual(quote['grand_total'], Decimal('45.98'))
+        self.assertEqual(quote['cart_count'], 4)
+        self.assertEqual(quote['total_data'][str(self.vendors[0].pk)], {'19.00': "{'VAT': {'21.00': '3.99'}}"})
+
+    def test_token_round_trip_keeps_decimals_and_rejects_others(self):
+        items = cart_items(self.customer)
+        token = sign_quote(price_cart(items), self.customer, order_number='1')
+        other = create_user('other', User.CUSTOMER)
+
+        self.assertEqual(load_quote(token, self.customer, items, order_number='1')['grand_total'], Decimal('45.98'))
+        self.assertIsNone(load_quote(token, other, items))
+        self.assertIsNone(load_quote(token, self.customer, items, order_number='2'))
+        self.assertIsNone(load_quote(token[:-2] + 'xx', self.customer, items))
+        with override_settings(CHECKOUT_QUOTE_MAX_AGE=-1):
+            self.assertIsNone(load_quote(token, self.customer, items))
+
+    def test_place_order_reuses_the_checkout_quote(self):
+        response, tax_queries = self.place_order(self.checkout_quote())
+
+        # The taxes are only read to check the quote version, the amounts come from the quote.
+        self.assertEqual(len(tax_queries), 1)
+        order = response.context['order']
+        self.assertEqual(Decimal(str(order.total)), Decimal('45.98'))
+        self.assertEqual(response.context['grand_total'], Decimal('45.98'))
+
+    def test_place_order_prices_again_when_the_cart_changed(self):
+        quote = self.checkout_quote()
+        Cart.objects.filter(user=self.customer, product_item=self.items[1]).delete()
+
+        response, tax_queries = self.place_order(quote)
+
+        # Loaded once for the version check and the pricing.
+        self.assertEqual(len(tax_queries), 1)
+        self.assertEqual(Decimal(str(response.context['order'].total)), Decimal('22.99'))
+
+    def test_place_order_prices_again_when_a_price_changed(self):
+        quote = self.checkout_quote()
+        self.items[0].price = Decimal('10.00')
+        # Bumps the vendor's catalog version.
+        self.items[0].save()
+
+        response, _ = self.place_order(quote)
+
+        self.assertEqual(Decimal(str(response.context['order'].total)), Decimal('47.19'))
+
+    def test_place_order_prices_again_when_a_tax_changed(self):
+        quote = self.checkout_quote()
+        Tax.objects.filter(tax_type='VAT').get().delete()
+        Tax.objects.create(tax_type='IVA', tax_percentage=Decimal('10.00'))
+
+        response, _ = self.place_order(quote)
+
+        self.assertEqual(Decimal(str(response.context['order'].total)), Decimal('41.80'))
+
+    def test_payment_records_the_quoted_lines_when_the_cart_changed_after_pricing(self):
+        response, _ = self.place_order(self.checkout_quote())
+        order, quote = response.context['order'], response.context['quote']
+        extra_item = self.vendors[0].fooditem_set.order_by('id').last()
+        Cart.objects.create(user=self.customer, product_item=extra_item, quantity=1)
+
+        self.client.post(reverse('payments'), {
+            'order_number': order.order_number, 'transaction_id': 'PAYPAL-1', 'payment_method': 'PayPal',
+            'status': 'COMPLETED', 'quote': quote,
+        }, **AJAX)
+
+        self.assertEqual(set(OrderedProduct.objects.filter(order=order).values_list('product_item', flat=True)),
+                         {item.pk for item in self.items})
+        # The line added after the order was priced stays in the cart.
+        self.assertEqual(list(Cart.objects.filter(user=self.customer).values_list('product_item', flat=True)),
+                         [extra_item.pk])
+        self.assertTrue(Order.objects.get(pk=order.pk).is_ordered)
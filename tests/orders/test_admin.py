@@ -0,0 +1,78 @@
+import datetime
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import User
+from CoreRoot.pagination import EstimatedCountPaginator
+from orders.models import Order
+from tests.performance.data import create_order, create_user, create_vendor
+
+
+class EstimatedCountPaginatorTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        vendor = create_vendor(1)
+        customer = create_user('customer', User.CUSTOMER)
+        items = list(vendor.fooditem_set.all())
+        for number in range(3):
+            create_order(customer, items[:1], number)
+        with connection.cursor() as cursor:
+            # Rows inserted by the test transaction itself are counted as live.
+            cursor.execute(f'ANALYZE {Order._meta.db_table}')
+
+    @override_settings(ESTIMATED_COUNT_THRESHOLD=1)
+    def test_unfiltered_big_table_is_counted_from_pg_class(self):
+        paginator = EstimatedCountPaginator(Order.objects.order_by('-id'), 100)
+
+        with self.assertNumQueries(1) as queries:
+            self.assertEqual(paginator.count, 3)
+        self.assertIn('pg_class', queries.captured_queries[0]['sql'])
+
+    @override_settings(ESTIMATED_COUNT_THRESHOLD=1)
+    def test_filtered_list_is_counted_exactly(self):
+        paginator = EstimatedCountPaginator(Order.objects.filter(order_number='2023000001').order_by('-id'), 100)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(paginator.count, 1)
+
+    @override_settings(ESTIMATED_COUNT_THRESHOLD=1000)
+    def test_small_table_is_counted_exactly(self):
+        Order.objects.filter(order_number='2023000002').delete()
+        paginator = EstimatedCountPaginator(Order.objects.order_by('-id'), 100)
+
+        with self.assertNumQueries(2):
+            self.assertEqual(paginator.count, 2)
+
+
+@override_settings(DATABASE_REPLICAS=[])
+class OrderChangelistTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(first_name='Admin', last_name='User', username='admin',
+                                                  email='admin@example.com', password='test123')
+        vendor = create_vendor(1)
+        customer = create_user('customer', User.CUSTOMER)
+        create_order(customer, list(vendor.fooditem_set.all()[:1]), 1)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_date_filter_does_not_scan_the_table(self):
+        today = timezone.localdate()
+        url = reverse('admin:orders_order_changelist')
+        today_range = {'created_at__gte': str(today), 'created_at__lt': str(today + datetime.timedelta(days=1))}
+        for params in ({}, today_range):
+            with self.subTest(params=params):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(url, params)
+
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.context['cl'].result_count, 1)
+                sql = '\n'.join(query['sql'].upper() for query in queries.captured_queries)
+                # The links of date_hierarchy, computed over the whole table.
+                self.assertNotIn('DATE_TRUNC', sql)
+                self.assertNotIn('MIN(', sql)
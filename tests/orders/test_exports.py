@@ -0,0 +1,123 @@
+import csv
+import datetime
+import io
+import os
+import tempfile
+
+import simplejson as json
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import User
+from orders.exports import EXPORT_COLUMNS, parse_date_range
+from orders.models import Order
+from tests.performance.data import create_order, create_user, create_vendor
+
+
+def aware(*args):
+    return timezone.make_aware(datetime.datetime(*args))
+
+
+class ParseDateRangeTest(SimpleTestCase):
+    def test_days_become_a_half_open_range(self):
+        self.assertEqual(parse_date_range('2023-05-01', '2023-05-02'), (aware(2023, 5, 1), aware(2023, 5, 3)))
+        self.assertEqual(parse_date_range('', None), (None, None))
+        self.assertEqual(parse_date_range(None, '2023-05-02'), (None, aware(2023, 5, 3)))
+
+    def test_invalid_ranges(self):
+        for date_from, date_to in (('01/05/2023', ''), ('', '2023-02-30'), ('yesterday', ''),
+                                   ('2023-05-02', '2023-05-01')):
+            with self.subTest(date_from=date_from, date_to=date_to), self.assertRaises(ValueError):
+                parse_date_range(date_from, date_to)
+
+
+@override_settings(DATABASE_REPLICAS=[])
+class OrderExportTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.vendor = create_vendor(1)
+        other_vendor = create_vendor(2)
+        customer = create_user('customer', User.CUSTOMER)
+        items = list(cls.vendor.fooditem_set.order_by('id'))
+        other_items = list(other_vendor.fooditem_set.order_by('id'))
+        cls.first = create_order(customer, items[:2], 1)
+        cls.second = create_order(customer, items[2:] + other_items, 2)
+        unpaid = create_order(customer, items, 3)
+        Order.objects.filter(pk=cls.first.pk).update(created_at=aware(2023, 5, 1, 12))
+        Order.objects.filter(pk=cls.second.pk).update(created_at=aware(2023, 5, 10, 23, 30))
+        Order.objects.filter(pk=unpaid.pk).update(created_at=aware(2023, 5, 5), is_ordered=False)
+
+    def setUp(self):
+        self.client.force_login(self.vendor.user)
+
+    def export(self, **params):
+        response = self.client.get(reverse('vendor_orders_export'), params)
+        if response.status_code != 200:
+            return response, None
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_csv_export_is_scoped_to_the_vendor(self):
+        response, content = self.export()
+
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="orders-vendor-1.csv"')
+        header, *rows = csv.reader(io.StringIO(content))
+        self.assertEqual(header, [name for name, _ in EXPORT_COLUMNS])
+        self.assertEqual([(row[0], row[7], row[8], row[9], row[13]) for row in rows], [
+            (self.first.order_number, 'Vendor 1', 'Food 1-0-0', '2', 'TX1'),
+            (self.first.order_number, 'Vendor 1', 'Food 1-0-1', '2', 'TX1'),
+            (self.second.order_number, 'Vendor 1', 'Food 1-0-2', '2', 'TX2'),
+        ])
+
+    def test_jsonl_export_with_date_range(self):
+        response, content = self.export(format='jsonl', **{'from': '2023-05-02', 'to': '2023-05-10'})
+
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual([(row['order_number'], row['vendor'], row['product']) for row in rows],
+                         [(self.second.order_number, 'Vendor 1', 'Food 1-0-2')])
+        self.assertEqual(rows[0]['created_at'], '2023-05-10T23:30:00Z')
+
+    def test_unknown_format_falls_back_to_csv(self):
+        response, _ = self.export(format='xlsx')
+
+        self.assertEqual(response['Content-Type'], 'text/csv')
+
+    def test_invalid_dates_are_rejected(self):
+        for params in ({'from': '2023-13-01'}, {'to': 'tomorrow'}, {'from': '2023-05-10', 'to': '2023-05-01'}):
+            with self.subTest(params=params):
+                response, _ = self.export(**params)
+                self.assertEqual(response.status_code, 400)
+
+    def test_customers_cannot_export(self):
+        self.client.force_login(User.objects.get(username='customer'))
+
+        response, _ = self.export()
+
+        self.assertEqual(response.status_code, 403)
+
+    @staticmethod
+    def call_export(directory, **options):
+        output = os.path.join(directory, 'export.jsonl')
+        call_command('export_orders', format='jsonl', output=output, **options)
+        with open(output, encoding='utf-8') as file:
+            return [json.loads(line) for line in file]
+
+    def test_command_exports_all_vendors_or_one(self):
+        with tempfile.TemporaryDirectory() as directory:
+            everything = self.call_export(directory)
+            other_vendor = self.call_export(directory, vendor='vendor-2', chunk_size=1)
+            first_day = self.call_export(directory, date_from='2023-05-01', date_to='2023-05-01')
+
+        self.assertEqual(len(everything), 6)
+        self.assertEqual({row['vendor'] for row in other_vendor}, {'Vendor 2'})
+        self.assertEqual(len(other_vendor), 3)
+        self.assertEqual({row['order_number'] for row in first_day}, {self.first.order_number})
+
+    def test_command_errors(self):
+        with self.assertRaisesMessage(CommandError, 'Vendor "missing" does not exist'):
+            call_command('export_orders', vendor='missing')
+        with self.assertRaisesMessage(CommandError, 'Invalid date "2023-02-30"'):
+            call_command('export_orders', date_from='2023-02-30')
@@ -0,0 +1,81 @@
+from django.core import mail
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounts.models import User
+from marketplace.models import Cart
+from orders.models import Order, OrderedProduct, Payment
+from tests.performance.data import create_order, create_tax, create_user, create_vendor, fill_cart
+
+AJAX = {'HTTP_X_REQUESTED_WITH': 'XMLHttpRequest'}
+
+
+@override_settings(DATABASE_REPLICAS=[], NOTIFICATION_THREADS=0)
+class IdempotentPaymentTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_tax()
+        cls.vendor = create_vendor(1)
+        cls.customer = create_user('customer', User.CUSTOMER)
+        items = list(cls.vendor.fooditem_set.order_by('id'))
+        fill_cart(cls.customer, items)
+        # Unpaid and without ordered products, as place_order leaves it.
+        cls.order = create_order(cls.customer, items, 1)
+        Order.objects.filter(pk=cls.order.pk).update(payment=None, is_ordered=False)
+        OrderedProduct.objects.filter(order=cls.order).delete()
+
+    def setUp(self):
+        self.client.force_login(self.customer)
+
+    def pay(self, transaction_id='PAYPAL-1', order_number=None):
+        return self.client.post(reverse('payments'), {
+            'order_number': order_number or self.order.order_number, 'transaction_id': transaction_id,
+            'payment_method': 'PayPal', 'status': 'COMPLETED',
+        }, **AJAX)
+
+    def test_retry_returns_the_first_response_without_recording_again(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            first = self.pay()
+        sent = len(mail.outbox)
+
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+            retry = self.pay()
+
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(Payment.objects.filter(transaction_id='PAYPAL-1').count(), 1)
+        self.assertEqual(OrderedProduct.objects.filter(order=self.order).count(), 3)
+        self.assertEqual(len(mail.outbox), sent)
+        # Customer and vendor, sent once.
+        self.assertEqual(sent, 2)
+        order_queries = [query for query in queries.captured_queries if Order._meta.db_table in query['sql']]
+        self.assertEqual(len(order_queries), 1)
+
+    def test_order_paid_by_another_transaction_is_refused(self):
+        self.pay()
+
+        response = self.pay(transaction_id='PAYPAL-2')
+
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(Payment.objects.filter(transaction_id='PAYPAL-2').exists())
+
+    def test_transaction_recorded_for_another_order_is_refused(self):
+        self.pay()
+        other = create_order(self.customer, [], 2)
+        Order.objects.filter(pk=other.pk).update(payment=None, is_ordered=False)
+        fill_cart(self.customer, list(self.vendor.fooditem_set.all()[:1]))
+
+        response = self.pay(order_number=other.order_number)
+
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(Order.objects.get(pk=other.pk).is_ordered)
+        # Rolled back, the cart is still there.
+        self.assertEqual(Cart.objects.filter(user=self.customer).count(), 1)
+
+    def test_missing_transaction_id_is_rejected(self):
+        response = self.pay(transaction_id='')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Payment.objects.exists())
+        self.assertFalse(Order.objects.get(pk=self.order.pk).is_ordered)
@@ -0,0 +1,78 @@
+import simplejson as json
+
+from accounts.models import User
+from catalog.models import Category, FoodItem
+from marketplace.models import Cart, Tax
+from orders.models import Order, OrderedProduct, Payment
+from vendor.models import OpeningHour, Vendor
+
+PASSWORD = 'test123'
+
+
+def create_user(username, role):
+    """Active user with the given role. The post_save signal creates its UserProfile."""
+    user = User.objects.create_user(first_name='Test', last_name=username, username=username,
+                                    email=f'{username}@example.com', password=PASSWORD)
+    user.role = role
+    user.is_active = True
+    user.save()
+    return user
+
+
+def create_vendor(index, items=3, categories=1):
+    """Approved vendor with a located profile, daily opening hours, categories and food items."""
+    user = create_user(f'vendor{index}', User.VENDOR)
+    profile = user.userprofile
+    profile.address = f'Calle {index}'
+    profile.city = 'Madrid'
+    profile.state = 'Madrid'
+    profile.pin_code = '28001'
+    profile.latitude = str(40.4 + index / 1000)
+    profile.longitude = str(-3.7 - index / 1000)
+    profile.save()
+
+    vendor = Vendor.objects.create(user=user, user_profile=profile, vendor_name=f'Vendor {index}',
+                                   vendor_slug=f'vendor-{index}', vendor_license='vendor/license/license.pdf',
+                                   is_approved=True)
+    OpeningHour.objects.bulk_create([
+        OpeningHour(vendor=vendor, day=day, from_hour='12:00 AM', to_hour='11:30 PM') for day in range(1, 8)
+    ])
+    for category_index in range(categories):
+        category = Category.objects.create(vendor=vendor, category_name=f'Category {index}-{category_index}',
+                                           slug=f'category-{index}-{category_index}')
+        FoodItem.objects.bulk_create([
+            FoodItem(vendor=vendor, category=category, food_title=f'Food {index}-{category_index}-{item}',
+                     slug=f'food-{index}-{category_index}-{item}', price='9.50',
+                     image='food_images/food.jpg')
+            for item in range(items)
+        ])
+    return vendor
+
+
+def create_tax():
+    return Tax.objects.create(tax_type='VAT', tax_percentage='21.00', is_active=True)
+
+
+def fill_cart(user, food_items):
+    Cart.objects.bulk_create([Cart(user=user, product_item=item, quantity=2) for item in food_items])
+
+
+def create_order(user, food_items, number):
+    """Completed, paid order of the given food items, with total_data in the format place_order writes."""
+    payment = Payment.objects.create(user=user, transaction_id=f'TX{number}', payment_method='PayPal',
+                                     amount='100', status='COMPLETED')
+    vendors = {item.vendor_id for item in food_items}
+    total_data = {
+        str(vendor_id): {'19.00': str({'VAT': {'21.00': '3.99'}})} for vendor_id in vendors
+    }
+    order = Order.objects.create(user=user, payment=payment, order_number=f'2023{number:06d}', first_name='Test',
+                                 last_name='Customer', email=user.email, address='Calle 1', city='Madrid',
+                                 pin_code='28001', total=22.99, total_tax=3.99, payment_method='PayPal',
+                                 tax_data=json.dumps({'VAT': {'21.00': '3.99'}}), total_data=json.dumps(total_data),
+                                 is_ordered=True)
+    order.vendors.add(*vendors)
+    OrderedProduct.objects.bulk_create([
+        OrderedProduct(order=order, payment=payment, user=user, product_item=item, quantity=2, price=9.5, amount=19)
+        for item in food_items
+    ])
+    return order
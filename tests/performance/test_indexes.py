@@ -0,0 +1,73 @@
+from django.db import connection
+from django.test import TestCase
+
+from accounts.models import User
+from catalog.models import FoodItem
+from marketplace.models import Cart
+from orders.models import Order
+from tests.performance.data import create_order, create_user, create_vendor, fill_cart
+from vendor.models import OpeningHour, Vendor
+
+
+class HotQueryIndexTest(TestCase):
+    """EXPLAIN the hot lookups on a seeded dataset and assert PostgreSQL answers them from an index.
+    Sequential scans are disabled so the planner picks an index whenever a usable one exists,
+    which keeps the assertions independent of the (small) table sizes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.vendors = [create_vendor(index, items=5, categories=2) for index in range(10)]
+        cls.customer = create_user('customer', User.CUSTOMER)
+        items = list(FoodItem.objects.all()[:6])
+        fill_cart(cls.customer, items)
+        cls.orders = [create_order(cls.customer, items[:2], number) for number in range(20)]
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def setUp(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def assertIndexScan(self, queryset, index_name=None):
+        plan = queryset.explain()
+        self.assertNotIn('Seq Scan', plan, plan)
+        self.assertRegex(plan, r'(Index Scan|Index Only Scan|Bitmap Index Scan)')
+        if index_name:
+            self.assertIn(index_name, plan)
+
+    def assertIndexExists(self, table, index_name):
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, table)
+        self.assertIn(index_name, constraints)
+
+    def test_cart_user_product_item(self):
+        item = FoodItem.objects.first()
+        self.assertIndexExists(Cart._meta.db_table, 'cart_user_product_item_uniq')
+        self.assertIndexScan(Cart.objects.filter(user=self.customer, product_item=item))
+
+    def test_opening_hour_vendor_day(self):
+        self.assertIndexExists(OpeningHour._meta.db_table, 'openinghour_vendor_day_idx')
+        self.assertIndexScan(OpeningHour.objects.filter(vendor=self.vendors[0], day=1))
+
+    def test_order_number(self):
+        order = self.orders[0]
+        self.assertIndexScan(Order.objects.filter(order_number=order.order_number, is_ordered=True),
+                             'order_number_idx')
+
+    def test_food_items_by_vendor_and_availability(self):
+        self.assertIndexExists(FoodItem._meta.db_table, 'fooditem_vendor_available_idx')
+        self.assertIndexScan(FoodItem.objects.filter(vendor=self.vendors[0], is_available=True))
+
+    def test_food_items_by_category_and_availability(self):
+        category = self.vendors[0].category_set.first()
+        self.assertIndexExists(FoodItem._meta.db_table, 'fooditem_category_avail_idx')
+        self.assertIndexScan(FoodItem.objects.filter(category=category, is_available=True))
+
+    def test_approved_vendors(self):
+        self.assertIndexScan(Vendor.objects.filter(is_approved=True), 'vendor_is_approved_idx')
+
+    def test_customer_orders_by_date(self):
+        self.assertIndexScan(
+            Order.objects.filter(user=self.customer, is_ordered=True).order_by('-created_at'),
+            'order_user_ordered_created_idx',
+        )
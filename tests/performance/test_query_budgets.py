@@ -0,0 +1,349 @@
+from itertools import count
+
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from accounts.models import User
+from catalog.models import Category, FoodItem
+from CoreRoot.queries import observe_queries
+from marketplace.models import Cart
+from orders.models import Order
+from tests.performance.data import PASSWORD, create_order, create_tax, create_user, create_vendor, fill_cart
+from vendor.models import OpeningHour
+
+AJAX = {'HTTP_X_REQUESTED_WITH': 'XMLHttpRequest'}
+# Loose ceiling of queries per request. The exact counts may change with any refactor, what is checked
+# is that they do not grow with the data.
+QUERY_CEILING = 20
+
+
+class QueryBudgetMixin:
+    """Each URL is requested on the seeded data and again after grow() added vendors, cart lines, catalog
+    items and order history, both times with a cold and then a warm shared cache. The query counts must not
+    change between the two runs and must stay under a loose ceiling, so an N+1 fails here instead of in
+    production. Queries are counted on every connection and thread, replicas and the async pool included."""
+
+    @staticmethod
+    def seed(target):
+        create_tax()
+        target.vendors = [create_vendor(index) for index in range(2)]
+        target.vendor = target.vendors[0]
+        target.category = target.vendor.category_set.first()
+        target.customer = create_user('customer', User.CUSTOMER)
+        items = list(FoodItem.objects.filter(vendor__in=target.vendors).order_by('id'))
+        fill_cart(target.customer, items[::2])
+        target.order = create_order(target.customer, items[:2], 0)
+
+    def grow(self):
+        """Add vendors, catalog items, cart lines and orders so any per-row query shows up in the count."""
+        new_vendors = [create_vendor(100 + next(self.numbers), items=4) for _ in range(3)]
+        FoodItem.objects.bulk_create([
+            FoodItem(vendor=self.vendor, category=self.category, food_title=f'Extra {index}',
+                     slug=f'extra-{next(self.numbers)}', price='4.00', image='food_images/food.jpg')
+            for index in range(4)
+        ])
+        new_items = list(FoodItem.objects.filter(vendor__in=new_vendors))
+        fill_cart(self.customer, new_items)
+        own_item = FoodItem.objects.filter(vendor=self.vendor).first()
+        for item in new_items[:5]:
+            create_order(self.customer, [own_item, item], next(self.numbers))
+
+    def request(self, method, url, data, extra):
+        """The response and the (database alias, sql) of the queries it ran."""
+        queries = []
+
+        def observer(sql, params, many, context, duration):
+            queries.append((context['connection'].alias, sql))
+
+        with observe_queries(observer):
+            response = getattr(self.client, method)(url, data or {}, **extra)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.assertLess(response.status_code, 500, url)
+        return response, queries
+
+    def assertQueryBudget(self, url, method='get', data=None, before=None, ceiling=QUERY_CEILING, **extra):
+        """Check the query count of url does not grow with the data and stays under ceiling, with a cold and a
+        warm cache. url and data may be callables, evaluated before each request outside the counted block.
+        Returns the queries of the last request."""
+        counts = {'cold': [], 'warm': []}
+        for run in range(2):
+            if run:
+                self.grow()
+            cache.clear()
+            # The cold request fills the cache for the warm one.
+            for state in ('cold', 'warm'):
+                if before:
+                    before()
+                response, queries = self.request(
+                    method, url() if callable(url) else url, data() if callable(data) else data, extra
+                )
+                counts[state].append(len(queries))
+        sql = '\n'.join(f'{alias}: {query}' for alias, query in queries)
+        for state, (first, second) in counts.items():
+            self.assertEqual(first, second, f'Query count with a {state} cache grows with the data ({counts}):\n{sql}')
+        self.assertLessEqual(max(counts['cold'] + counts['warm']), ceiling,
+                             f'Over the ceiling of {ceiling} queries ({counts}):\n{sql}')
+        return queries
+
+
+@override_settings(DATABASE_REPLICAS=[], ASYNC_DB_THREADS=0)
+class QueryBudgetTestCase(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.seed(cls)
+
+    def setUp(self):
+        self.numbers = count(1)
+
+
+class PublicQueryBudgetTest(QueryBudgetTestCase):
+    def test_home(self):
+        self.assertQueryBudget(reverse('home'))
+
+    def test_home_with_location(self):
+        # Sets the signed location cookie.
+        self.client.get(reverse('home'), {'lat': '40.41', 'lng': '-3.70'})
+        self.assertQueryBudget(reverse('home'))
+
+    def test_marketplace(self):
+        self.assertQueryBudget(reverse('marketplace'))
+
+    def test_vendor_detail(self):
+        self.assertQueryBudget(reverse('vendor_detail', args=[self.vendor.vendor_slug]))
+
+    def test_search(self):
+        self.assertQueryBudget(reverse('search'), data={
+            'address': 'Madrid', 'lat': '40.41', 'lng': '-3.70', 'radius': '50', 'keyword': 'Food',
+        })
+
+    def test_account_pages(self):
+        for name in ('register_user', 'register_vendor', 'login', 'forgot_password', 'reset_password'):
+            with self.subTest(name=name):
+                self.assertQueryBudget(reverse(name))
+
+    def test_login(self):
+        self.assertQueryBudget(reverse('login'), method='post', before=self.client.logout,
+                               data={'email': self.customer.email, 'password': PASSWORD})
+
+    def test_logout(self):
+        self.assertQueryBudget(reverse('logout'), before=lambda: self.client.force_login(self.customer))
+
+    def test_invalid_token_links(self):
+        for name in ('activate', 'reset_password_validate'):
+            with self.subTest(name=name):
+                self.assertQueryBudget(reverse(name, args=['MQ', 'invalid-token']))
+
+    def test_forgot_password(self):
+        self.assertQueryBudget(reverse('forgot_password'), method='post', data={'email': self.customer.email})
+
+    def test_missing_media(self):
+        self.assertQueryBudget(reverse('media', args=['missing.jpg']))
+
+
+class CustomerQueryBudgetTest(QueryBudgetTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.customer)
+
+    def cart_item(self):
+        return Cart.objects.filter(user=self.customer).order_by('id').first()
+
+    def test_my_account(self):
+        self.assertQueryBudget(reverse('my_account'))
+
+    def test_dashboard(self):
+        self.assertQueryBudget(reverse('customer_dashboard'))
+
+    def test_profile(self):
+        self.assertQueryBudget(reverse('customer_profile'))
+
+    def test_my_orders(self):
+        self.assertQueryBudget(reverse('customer_my_orders'))
+
+    def test_order_detail(self):
+        self.assertQueryBudget(reverse('customer_order_detail', args=[self.order.order_number]))
+
+    def test_vendor_detail(self):
+        self.assertQueryBudget(reverse('vendor_detail', args=[self.vendor.vendor_slug]))
+
+    def test_cart(self):
+        self.assertQueryBudget(reverse('cart'))
+
+    def test_checkout(self):
+        self.assertQueryBudget(reverse('checkout'))
+
+    def test_add_to_cart(self):
+        self.assertQueryBudget(lambda: reverse('add_to_cart', args=[self.cart_item().product_item_id]), **AJAX)
+
+    def test_decrease_cart(self):
+        self.assertQueryBudget(lambda: reverse('decrease_cart', args=[self.cart_item().product_item_id]), **AJAX)
+
+    def test_delete_cart(self):
+        self.assertQueryBudget(lambda: reverse('delete_cart', args=[self.cart_item().id]), **AJAX)
+
+    def test_place_order_page(self):
+        self.assertQueryBudget(reverse('place_order'))
+
+    def test_place_order(self):
+        self.assertQueryBudget(reverse('place_order'), method='post', data={
+            'first_name': 'Test', 'last_name': 'Customer', 'phone': '600000000', 'email': self.customer.email,
+            'address': 'Calle 1', 'country': 'Spain', 'state': 'Madrid', 'city': 'Madrid', 'pin_code': '28001',
+            'payment_method': 'PayPal',
+        })
+
+    def test_payments(self):
+        def payment_data():
+            # An order covering every vendor currently in the cart, as place_order would have stored it.
+            cart_items = Cart.objects.filter(user=self.customer).select_related('product_item')
+            order = create_order(self.customer, [item.product_item for item in cart_items], 1000 + next(self.numbers))
+            Order.objects.filter(pk=order.pk).update(payment=None, is_ordered=False)
+            return {'order_number': order.order_number, 'transaction_id': f'PAYPAL-{order.order_number}',
+                    'payment_method': 'PayPal', 'status': 'COMPLETED'}
+
+        self.assertQueryBudget(reverse('payments'), method='post', data=payment_data, **AJAX)
+
+    def test_order_complete(self):
+        self.assertQueryBudget(reverse('order_complete'), data={
+            'order_no': self.order.order_number, 'trans_id': self.order.payment.transaction_id,
+        })
+
+
+class VendorQueryBudgetTest(QueryBudgetTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.vendor.user)
+
+    def test_dashboard(self):
+        self.assertQueryBudget(reverse('vendor_dashboard'))
+
+    def test_profile(self):
+        self.assertQueryBudget(reverse('vendor_profile'))
+
+    def test_my_orders(self):
+        self.assertQueryBudget(reverse('vendor_my_orders'))
+
+    def test_order_detail(self):
+        self.assertQueryBudget(reverse('vendor_order_detail', args=[self.order.order_number]))
+
+    def test_orders_export(self):
+        self.assertQueryBudget(reverse('vendor_orders_export'), data={'format': 'jsonl'})
+
+    def test_catalog_builder(self):
+        self.assertQueryBudget(reverse('catalog_builder'))
+
+    def test_product_items_by_category(self):
+        self.assertQueryBudget(reverse('product_items_by_category', args=[self.category.id]))
+
+    def test_opening_hours(self):
+        self.assertQueryBudget(reverse('opening_hours'))
+
+    def test_add_opening_hours(self):
+        days = iter(range(1, 8))
+        self.assertQueryBudget(reverse('add_opening_hours'), method='post', data=lambda: {
+            'day': next(days), 'from_hour': '02:00 AM', 'to_hour': '03:00 AM', 'is_closed': 'False',
+        }, **AJAX)
+
+    def test_remove_opening_hours(self):
+        days = iter(range(1, 8))
+
+        def url():
+            hour = OpeningHour.objects.create(vendor=self.vendor, day=next(days), from_hour='04:00 AM',
+                                              to_hour='05:00 AM')
+            return reverse('remove_opening_hours', args=[hour.id])
+
+        self.assertQueryBudget(url, **AJAX)
+
+    def test_category_pages(self):
+        self.assertQueryBudget(reverse('category_add'))
+        self.assertQueryBudget(reverse('category_edit', args=[self.category.id]))
+
+    def test_category_delete(self):
+        def url():
+            number = next(self.numbers)
+            category = Category.objects.create(vendor=self.vendor, category_name=f'Empty {number}',
+                                               slug=f'empty-{number}')
+            return reverse('category_delete', args=[category.id])
+
+        self.assertQueryBudget(url)
+
+    def test_product_pages(self):
+        product = FoodItem.objects.filter(vendor=self.vendor).first()
+        self.assertQueryBudget(reverse('product_add'))
+        self.assertQueryBudget(reverse('product_edit', args=[product.id]))
+
+    def test_product_delete(self):
+        def url():
+            number = next(self.numbers)
+            product = FoodItem.objects.create(vendor=self.vendor, category=self.category, food_title=f'Gone {number}',
+                                              slug=f'gone-{number}', price='1.00', image='food_images/food.jpg')
+            return reverse('product_delete', args=[product.id])
+
+        self.assertQueryBudget(url)
+
+
+class AdminQueryBudgetTest(QueryBudgetTestCase):
+    def test_admin_index(self):
+        admin = User.objects.create_superuser('Admin', 'User', 'admin', 'admin@example.com', PASSWORD)
+        self.client.force_login(admin)
+        self.assertQueryBudget(reverse('admin:index'))
+
+    def test_admin_order_changelist(self):
+        admin = User.objects.create_superuser('Admin', 'User', 'admin', 'admin@example.com', PASSWORD)
+        self.client.force_login(admin)
+        self.assertQueryBudget(reverse('admin:orders_order_changelist'))
+
+    def test_admin_order_change(self):
+        admin = User.objects.create_superuser('Admin', 'User', 'admin', 'admin@example.com', PASSWORD)
+        self.client.force_login(admin)
+        self.assertQueryBudget(reverse('admin:orders_order_change', args=[self.order.pk]))
+
+    def test_admin_ordered_product_changelist(self):
+        admin = User.objects.create_superuser('Admin', 'User', 'admin', 'admin@example.com', PASSWORD)
+        self.client.force_login(admin)
+        self.assertQueryBudget(reverse('admin:orders_orderedproduct_changelist'))
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'], ASYNC_DB_THREADS=2)
+class DeployedQueryBudgetTest(QueryBudgetMixin, TransactionTestCase):
+    """The browse and cart pages as deployed: catalog reads routed to a replica and the async views running
+    their database work on the pool. A TransactionTestCase, the replica and the pool threads use their own
+    connections and only see committed rows."""
+    databases = {'default', 'replica1'}
+
+    def setUp(self):
+        self.numbers = count(1)
+        self.seed(self)
+        self.addCleanup(cache.clear)
+
+    def cart_item(self):
+        return Cart.objects.filter(user=self.customer).order_by('id').first()
+
+    def assertReadsFromReplica(self, url, **data):
+        cache.clear()
+        response, queries = self.request('get', url, data, {})
+        self.assertIn('replica1', {alias for alias, sql in queries}, f'{url} did not read from the replica')
+
+    def test_public_pages(self):
+        urls = [reverse('home'), reverse('marketplace'), reverse('vendor_detail', args=[self.vendor.vendor_slug])]
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertQueryBudget(url)
+                self.assertReadsFromReplica(url)
+
+    def test_search(self):
+        data = {'address': 'Madrid', 'lat': '40.41', 'lng': '-3.70', 'radius': '50', 'keyword': 'Food'}
+        self.assertQueryBudget(reverse('search'), data=data)
+        self.assertReadsFromReplica(reverse('search'), **data)
+
+    def test_cart(self):
+        self.client.force_login(self.customer)
+        self.assertQueryBudget(reverse('cart'))
+
+    def test_cart_updates(self):
+        self.client.force_login(self.customer)
+
+        for name in ('add_to_cart', 'decrease_cart'):
+            with self.subTest(name=name):
+                self.assertQueryBudget(lambda: reverse(name, args=[self.cart_item().product_item_id]), **AJAX)
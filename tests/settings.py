@@ -0,0 +1,9 @@
+"""Settings for the test suite: ./manage.py test --settings=tests.settings"""
+from CoreRoot.settings import *  # noqa: F401,F403
+
+# The test run is a single process, the per process cache sees every invalidation.
+SILENCED_SYSTEM_CHECKS = ['CoreRoot.E001']
+# Templates render {% static %} without collectstatic having run.
+STATIC_MANIFEST_STRICT = False
+# A replica of the test database, tests route the catalog reads to it with DATABASE_REPLICAS=['replica1'].
+DATABASES.setdefault('replica1', {**DATABASES['default'], 'TEST': {'MIRROR': 'default'}})  # noqa: F405